@@ -18,8 +18,19 @@ class AgentConfiguration(BaseModel):
     contact: str = ""
 
     sub_task: bool = True
+    # Sub tasks that do not depend on each other run at the same time, up to this many
+    max_parallel_sub_tasks: int = 4
 
     reflection: bool = False
+    # The judge of the reflection, a cheaper model saves cost. The server default if None
+    reflection_judge_model: str = None
+    # Answers generated at the same time in every reflection iteration
+    reflection_best_of: int = 1
+    # Token and wall-clock budget of the reflection of one task
+    reflection_max_tokens: int = None
+    reflection_max_time: float = None
+    # Judge score that ends the reflection early
+    reflection_confidence: float = 0.8
 
     memory: bool = False
 
@@ -31,6 +42,12 @@ class AgentConfiguration(BaseModel):
 
     context_compress: bool = True
 
+    parallel_tool_calls: bool = False
+
+    # Budget of a whole agent run, shared by its sub-tasks. No limit if None
+    max_tokens: int = None
+    max_cost: float = None
+
 
     @property
     def retries(self):
@@ -40,6 +57,17 @@ class AgentConfiguration(BaseModel):
             return 2
 
 
+    def reflection_settings(self) -> Dict[str, Any]:
+        return {
+            "reflection": self.reflection,
+            "reflection_judge_model": self.reflection_judge_model,
+            "reflection_best_of": self.reflection_best_of,
+            "reflection_max_tokens": self.reflection_max_tokens,
+            "reflection_max_time": self.reflection_max_time,
+            "reflection_confidence": self.reflection_confidence,
+        }
+
+
     @property
     def agent_id(self):
         if self.agent_id_ is None:
@@ -20,6 +20,7 @@ class TimeoutException(Exception):
 
 class VolairClient(Call, Storage, Tools, Agent, Markdown, Others):
     def __init__(self, url: str, debug: bool = False):
+        Storage.__init__(self)
         self.debug = debug
         self.url = self._initialize_url(url, debug)
         self.default_llm_model = "openai/gpt-4o"
@@ -1,5 +1,6 @@
 from dataclasses import Field
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 
 
@@ -21,14 +22,17 @@ class KnowledgeBase(BaseModel):
         self.sources.remove(file_path)
 
 
-    def markdown(self, client):
+    def markdown(self, client, max_workers: int = 8):
         knowledge_base = KnowledgeBaseMarkdown(knowledges={})
         the_list_of_files = self.sources
-        
+        if not the_list_of_files:
+            return knowledge_base
 
-        for each in the_list_of_files:
-            markdown_content = client.markdown(each)
+        # Every source is converted by its own request, so convert them at the same time
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(the_list_of_files))) as pool:
+            markdown_contents = list(pool.map(client.markdown, the_list_of_files))
 
+        for each, markdown_content in zip(the_list_of_files, markdown_contents):
             knowledge_base.knowledges[each] = markdown_content
 
 
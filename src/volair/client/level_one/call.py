@@ -104,7 +104,10 @@ class Call:
                     "tools": tools or [],
                     "context": context,
                     "llm_model": llm_model,
-                    "system_prompt": None
+                    "system_prompt": None,
+                    "parallel_tool_calls": bool(task.parallel_tool_calls),
+                    "max_tokens": task.max_tokens,
+                    "max_cost": task.max_cost
                 }
 
 
@@ -134,6 +137,7 @@ class Call:
 
 
         task._response = deserialized_result["result"]
+        task._usage = deserialized_result["usage"]
 
 
         response_format_req = None
@@ -146,7 +150,7 @@ class Call:
 
         
 
-        return {"result": deserialized_result["result"], "llm_model": llm_model, "response_format": response_format_req, "usage": deserialized_result["usage"]}
+        return {"result": deserialized_result["result"], "llm_model": llm_model, "response_format": response_format_req, "usage": deserialized_result["usage"], "status": deserialized_result.get("status", "completed")}
 
 
 
@@ -1,76 +1,45 @@
-import copy
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import cloudpickle
 cloudpickle.DEFAULT_PROTOCOL = 2
 import dill
 import base64
 import httpx
-import hashlib
-from typing import Any, List, Dict, Optional, Type, Union
-from pydantic import BaseModel
+import json
+import os
+from typing import Any, Callable, List, Dict
 
 from ..tasks.tasks import Task
 
-from ..printing import agent_end, agent_total_cost, agent_retry
+from ..printing import agent_end, agent_total_cost, agent_retry, agent_preparation, agent_budget_exhausted
+from ..price import get_estimated_cost
 
 
 
 from ..tasks.task_response import ObjectResponse
 
 from ..agent_configuration.agent_configuration import AgentConfiguration
+from ..knowledge_base.knowledge_base import KnowledgeBase
 
-from ..level_utilized.utility import context_serializer
+from ..level_utilized.utility import context_serializer, response_format_serializer, tools_serializer, response_format_deserializer, error_handler, prepare_context
 
+# The flow and its models are shared with the server-side agent run
+from ...orchestration.flow import (
+    AgentFlow,
+    Characterization,
+    CompanyObjective,
+    HumanObjective,
+    OtherTask,
+    SearchResult,
+    SubTask,
+    SubTaskList,
+    _ancestors,
+)
+from ...orchestration.pipeline import PipelineResult
 
-from ..level_utilized.utility import context_serializer, response_format_serializer, tools_serializer, response_format_deserializer, error_handler
 
-
-
-from ...storage.caching import save_to_cache_with_expiry, get_from_cache_with_expiry
-
-
-
-class SubTask(ObjectResponse):
-    description: str
-    sources_can_be_used: List[str]
-    required_output: str
-    tools: List[str]
-class SubTaskList(ObjectResponse):
-    sub_tasks: List[SubTask]
-
-
-
-class SearchResult(ObjectResponse):
-    any_customers: bool
-    products: List[str]
-    services: List[str]
-    potential_competitors: List[str]
-class CompanyObjective(ObjectResponse):
-    objective: str
-    goals: List[str]
-    state: str
-class HumanObjective(ObjectResponse):
-    job_title: str
-    job_description: str
-    job_goals: List[str]
-    
-
-
-class Characterization(ObjectResponse):
-    website_content: Union[SearchResult, None]
-    company_objective: Union[CompanyObjective, None]
-    human_objective: Union[HumanObjective, None]
-    name_of_the_human_of_tasks: str = None
-    contact_of_the_human_of_tasks: str = None
-
-
-class OtherTask(ObjectResponse):
-    task: str
-    result: Any
-
-
-
-class Agent:
+class Agent(AgentFlow):
 
 
     def agent_(
@@ -78,6 +47,7 @@ class Agent:
         agent_configuration: AgentConfiguration,
         task: Task,
         llm_model: str = None,
+        budget: Dict[str, Any] = None,
     ) -> Any:
         
         start_time = time.time()
@@ -88,12 +58,12 @@ class Agent:
         try:
             if isinstance(task, list):
                 for each in task:
-                    the_result = self.send_agent_request(agent_configuration, each, llm_model)
+                    the_result = self.send_agent_request(agent_configuration, each, llm_model, budget)
                     the_result["time"] = time.time() - start_time
                     results.append(the_result)
                     agent_end(the_result["result"], the_result["llm_model"], the_result["response_format"], start_time, time.time(), the_result["usage"], the_result["tool_count"], the_result["context_count"], self.debug)
             else:
-                the_result = self.send_agent_request(agent_configuration, task, llm_model)
+                the_result = self.send_agent_request(agent_configuration, task, llm_model, budget)
                 the_result["time"] = time.time() - start_time
                 results.append(the_result)
                 agent_end(the_result["result"], the_result["llm_model"], the_result["response_format"], start_time, time.time(), the_result["usage"], the_result["tool_count"], the_result["context_count"], self.debug)
@@ -123,6 +93,7 @@ class Agent:
         agent_configuration: AgentConfiguration,
         task: Task,
         llm_model: str = None,
+        budget: Dict[str, Any] = None,
     ) -> Any:
         from ..trace import sentry_sdk
         from ..level_utilized.utility import CallErrorException
@@ -173,7 +144,13 @@ class Agent:
                             "system_prompt": None,
                             "retries": agent_configuration.retries,
                             "context_compress": agent_configuration.context_compress,
-                            "memory": agent_configuration.memory
+                            "memory": agent_configuration.memory,
+                            # The task setting wins over the agent default
+                            "parallel_tool_calls": task.parallel_tool_calls if task.parallel_tool_calls is not None else agent_configuration.parallel_tool_calls,
+                            **agent_configuration.reflection_settings(),
+                            # The part of the run budget this task may use
+                            "max_tokens": budget["max_tokens"] if budget else None,
+                            "max_cost": budget["max_cost"] if budget else None,
                         }
 
                     with sentry_sdk.start_span(op="send_request"):
@@ -201,7 +178,7 @@ class Agent:
 
                 len_of_context = len(task.context) if task.context is not None else 0
 
-                return {"result": deserialized_result["result"], "llm_model": llm_model, "response_format": response_format_req, "usage": deserialized_result["usage"], "tool_count": len(tools), "context_count": len_of_context}
+                return {"result": deserialized_result["result"], "llm_model": llm_model, "response_format": response_format_req, "usage": deserialized_result["usage"], "tool_count": len(tools), "context_count": len_of_context, "status": deserialized_result.get("status", "completed")}
 
             except CallErrorException as e:
                 last_error = e
@@ -212,211 +189,204 @@ class Agent:
 
 
 
-    def create_characterization(self, agent_configuration: AgentConfiguration, llm_model: str = None):
-        tools = ["google", "read_website"]
-
-        search_task = Task(description=f"Make a search for {agent_configuration.company_url}", tools=tools, response_format=SearchResult)
-        self.call(search_task, llm_model=llm_model)
-
-        company_objective_task = Task(description=f"Generate the company objective for {agent_configuration.company_url}", tools=tools, response_format=CompanyObjective, context=search_task)
-        self.call(company_objective_task, llm_model=llm_model)
-
-        human_objective_task = Task(description=f"Generate the human objective for {agent_configuration.job_title}", tools=tools, response_format=HumanObjective, context=[search_task, company_objective_task])
-        self.call(human_objective_task, llm_model=llm_model)
-
-        total_character = Characterization(website_content=search_task.response, company_objective=company_objective_task.response, human_objective=human_objective_task.response, name_of_the_human_of_tasks=agent_configuration.name, contact_of_the_human_of_tasks=agent_configuration.contact)
-
-        return total_character
-
-
-
-
-
-
-
-    def agent(self, agent_configuration: AgentConfiguration, task: Task,  llm_model: str = None):
-
-        original_task = task
-
-
-
-
-        copy_agent_configuration = copy.deepcopy(agent_configuration)
-        copy_agent_configuration_json = copy_agent_configuration.model_dump_json(include={"job_title", "company_url", "company_objective", "name", "contact"})
-
-
-        
-        the_characterization_cache_key = f"characterization_{hashlib.sha256(copy_agent_configuration_json.encode()).hexdigest()}"
-
-        if agent_configuration.caching:
-            the_characterization = get_from_cache_with_expiry(the_characterization_cache_key)
-            if the_characterization is None:
-                the_characterization = self.create_characterization(agent_configuration, llm_model)
-                save_to_cache_with_expiry(the_characterization, the_characterization_cache_key, agent_configuration.cache_expiry)
-        else:
-            the_characterization = self.create_characterization(agent_configuration, llm_model)
-
-
-
-        knowledge_base = None
-
-        if agent_configuration.knowledge_base:
-            knowledge_base = self.knowledge_base(agent_configuration, llm_model)
-            
-
-
-
-        
-        the_task = task
-
-        is_it_sub_task = False
-        shared_context = []
-
-        if agent_configuration.sub_task:
-            sub_tasks = self.multiple(task, llm_model)
-            is_it_sub_task = True
-
-
-
-
-
-
-            the_task = sub_tasks
-    
-
-
-
-        if not isinstance(the_task, list):
-            the_task = [the_task]
-
-
-        for each in the_task:
-            if not isinstance(each.context, list):
-                each.context = [each.context]
-
-
-        last_task = []
-        for each in the_task:
-            if isinstance(each.context, list):
-                last_task.append(each)
-        the_task = last_task
-
-
-        for each in the_task:
-            each.context.append(the_characterization)
-
-        # Add knowledge base to the context for each task
-        if knowledge_base:
-            if isinstance(the_task, list):
-                for each in the_task:
-                    if each.context:
-                        each.context.append(knowledge_base)
-                    else:
-                        each.context = [knowledge_base]
-
-        if task.context:
-            for each in the_task:
-                each.context.append(task.context)
-                
-
-
-        if agent_configuration.tools:
-            if isinstance(the_task, list):
-                for each in the_task:
-                    each.tools = agent_configuration.tools
-
-        
-
-
-        results = []    
-        if isinstance(the_task, list):
-            for each in the_task:
-                if is_it_sub_task:
-                    if shared_context:
-                        each.context += shared_context
-
-
-                result = self.agent_(agent_configuration, each, llm_model=llm_model)
-                results += result
-
-                if is_it_sub_task:
-                    
-                    shared_context.append(OtherTask(task=each.description, result=each.response))
-
+    def report_preparation(self, preparation: PipelineResult) -> None:
+        agent_preparation(preparation.timings, preparation.total_time)
 
+    def report_budget_exhausted(self, budget: Dict[str, Any], exhausted_tasks: int) -> None:
+        agent_budget_exhausted(budget, exhausted_tasks)
 
+    def report_total_cost(self, input_tokens: int, output_tokens: int, total_time: float, llm_model: str, critical_path_time: float) -> None:
+        agent_total_cost(input_tokens, output_tokens, total_time, llm_model, critical_path_time=critical_path_time)
 
 
+    def agent_run(self, agent_configuration: AgentConfiguration, task: Task, llm_model: str = None, on_event: Callable[[Dict[str, Any]], None] = None):
+        """
+        Runs the agent on the server instead of calling the server for every step.
 
-        original_task._response = the_task[-1].response
+        The preparation, the sub-tasks and their calls run in the server process
+        and only the progress events and the final result come back. Local
+        knowledge base files are sent with the request.
 
+        Args:
+            agent_configuration: The agent to run.
+            task: The task, its response is set when the run finished.
+            llm_model: The model, the client default if None.
+            on_event: Optional callback called with every progress event.
 
-        
-        total_time = 0
-        for each in results:
-            total_time += each["time"]
+        Returns:
+            The same usage summary as agent().
+        """
+        from ..base import TimeoutException
+        from ..level_utilized.utility import CallErrorException
 
-        total_input_tokens = 0
-        total_output_tokens = 0
-        for each in results:
+        if llm_model is None:
+            llm_model = self.default_llm_model
 
-            total_input_tokens += each["usage"]["input_tokens"]
-            total_output_tokens += each["usage"]["output_tokens"]
+        # Tools are sent by name and the agent keeps its ID, its memory is stored under it
+        agent_configuration.agent_id
+        run_configuration = agent_configuration.model_copy(update={"tools": tools_serializer(agent_configuration.tools)})
+        run_task = task.model_copy(update={"tools": tools_serializer(task.tools), "context": prepare_context(task.context, None)})
 
-        the_llm_model = llm_model
-        if the_llm_model is None:
-            the_llm_model = self.default_llm_model
+        if task.response_format is not None:
+            the_module = dill.detect.getmodule(task.response_format)
+            if the_module is not None:
+                cloudpickle.register_pickle_by_value(the_module)
 
-        agent_total_cost(total_input_tokens, total_output_tokens, total_time, the_llm_model)
+        data = {
+            "agent_configuration": base64.b64encode(cloudpickle.dumps(run_configuration)).decode("utf-8"),
+            "task": base64.b64encode(cloudpickle.dumps(run_task)).decode("utf-8"),
+            "llm_model": llm_model,
+            "files": self._knowledge_base_files(agent_configuration, task),
+        }
 
+        summary = None
+        try:
+            with httpx.Client() as client:
+                with client.stream("POST", f"{self.url}/level_two/agent_run", json=data, timeout=600.0) as response:
+                    if response.status_code == 408:
+                        raise TimeoutException("Request timed out")
+                    response.raise_for_status()
+
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if on_event is not None:
+                            on_event(event)
+
+                        if event["event"] == "preparation":
+                            agent_preparation(event["timings"], event["total_time"])
+                        elif event["event"] == "task_finished":
+                            agent_end(event["result"], event["llm_model"], event["response_format"], 0, event["time"], event["usage"], event["tool_count"], event["context_count"], self.debug)
+                        elif event["event"] == "error":
+                            error_handler(event)
+                            raise CallErrorException(event)
+                        elif event["event"] == "result":
+                            task._response = cloudpickle.loads(base64.b64decode(event["result"]))
+                            summary = event["usage"]
+        except httpx.RequestError as e:
+            raise TimeoutException(f"HTTP request failed: {str(e)}")
+
+        if summary is None:
+            raise CallErrorException({"status_code": 500, "detail": "The agent run ended without a result"})
+
+        agent_total_cost(summary["input_tokens"], summary["output_tokens"], summary["execution_time"], llm_model, critical_path_time=summary["critical_path_time"])
+
+        return summary
+
+
+    def _knowledge_base_files(self, agent_configuration: AgentConfiguration, task: Task) -> Dict[str, str]:
+        """
+        Returns the base64 encoded local files of the knowledge bases of the
+        agent and the task context, by path.
+        """
+        knowledge_bases = [agent_configuration.knowledge_base]
+        knowledge_bases += task.context if isinstance(task.context, list) else [task.context]
 
+        files = {}
+        for knowledge_base in knowledge_bases:
+            if not isinstance(knowledge_base, KnowledgeBase):
+                continue
+            for source in knowledge_base.sources:
+                if source.startswith("http") or source in files:
+                    continue
+                if not os.path.exists(source):
+                    raise FileNotFoundError(f"File not found: {source}")
+                with open(source, "rb") as file:
+                    files[source] = base64.b64encode(file.read()).decode("utf-8")
+        return files
 
 
     def multiple(self, task: Task, llm_model: str = None):
         # Generate a list of sub tasks
-
-
-        
-
+        sub_tasks, _ = self.plan_sub_tasks(task, llm_model)
+        return sub_tasks
 
 
 
 
-        prompt = "You are a helpful assistant. User have an general task. You need to generate a list of sub tasks. Each sub task should be a Actionable step of main task. You need to return a list of sub tasks. You should say to agent to make this job not making plan again and again. We need actions. If  If you have tools that can help you for the task specify them in the task. If there is an context its the user want to see so create tasks to fill them all. Create rich tasks for every user requested field. Only do user requested things. Dont make any assumptions."
 
-        sub_tasker = Task(description=prompt, response_format=SubTaskList, context=[task, task.response_format], tools=task.tools)
+    def route_tasks(self, the_agents: Dict[str, AgentConfiguration], tasks: List[Task], llm_model: str = None) -> List[str]:
+        """
+        Selects an agent for every task with one LLM call.
 
-        self.call(sub_tasker, llm_model)
+        Assignments that are missing or name an unknown agent are retried one by
+        one, a task that still has no valid agent goes to the first agent.
 
-        sub_tasks = []
+        Returns:
+            The key of the selected agent for each task, in task order.
+        """
+        the_agents_keys = list(the_agents.keys())
+        if len(the_agents_keys) == 1:
+            return [the_agents_keys[0]] * len(tasks)
 
-        for each in sub_tasker.response.sub_tasks:
 
-            new_task = Task(description=each.description+ " " + each.required_output + " " + str(each.sources_can_be_used) + " " + str(each.tools))
-            new_task.tools = task.tools
-            sub_tasks.append(new_task)
+        class TheAgents_(ObjectResponse):
+            agents: List[str]
 
+        class TasksToAssign(ObjectResponse):
+            tasks: List[str]
 
+        class TaskAssignment(ObjectResponse):
+            task_number: int
+            selected_agent: str
 
+        class TaskAssignments(ObjectResponse):
+            assignments: List[TaskAssignment]
 
-        end_task = Task(description=task.description, response_format=task.response_format)
-        sub_tasks.append(end_task)
+        class SelectedAgent(ObjectResponse):
+            selected_agent: str
 
 
+        the_agents_ = TheAgents_(agents=the_agents_keys)
+        tasks_to_assign = TasksToAssign(tasks=[f"{number}. {each.description}" for number, each in enumerate(tasks, start=1)])
 
+        routing_task = Task(description="Select the most suitable agent for every task. Return one assignment per task with the task number and the agent name exactly as listed.", response_format=TaskAssignments, context=[the_agents_, tasks_to_assign])
+        self.call(routing_task, llm_model)
 
+        selected = [None] * len(tasks)
+        for assignment in routing_task.response.assignments:
+            index = assignment.task_number - 1
+            if 0 <= index < len(tasks) and selected[index] is None and assignment.selected_agent in the_agents:
+                selected[index] = assignment.selected_agent
 
-        return sub_tasks
+        for index, each in enumerate(tasks):
+            attempts = 0
+            while selected[index] is None and attempts < 3:
+                selecting_task = Task(description="Select an agent for this task", response_format=SelectedAgent, context=[the_agents_, each])
+                self.call(selecting_task, llm_model)
+                if selecting_task.response.selected_agent in the_agents:
+                    selected[index] = selecting_task.response.selected_agent
+                attempts += 1
 
+            if selected[index] is None:
+                selected[index] = the_agents_keys[0]
 
+        return selected
 
 
+    def multi_agent(self, agent_configurations: List[AgentConfiguration], tasks: Any, llm_model: str = None, max_concurrency_per_agent: int = 1):
+        """
+        Routes the tasks to the agents and runs them.
 
-    def multi_agent(self, agent_configurations: List[AgentConfiguration], tasks: Any, llm_model: str = None):
+        Different agents work at the same time, each one on up to
+        max_concurrency_per_agent of its tasks at once.
 
+        Returns:
+            The agent configurations by agent key. Use multi_agent_with_usage
+            for the tasks, time and usage of every agent.
+        """
+        agent_results = self.multi_agent_with_usage(agent_configurations, tasks, llm_model, max_concurrency_per_agent)
+        return {agent_key: agent_result["agent"] for agent_key, agent_result in agent_results.items()}
 
-        agent_tasks = []
+    def multi_agent_with_usage(self, agent_configurations: List[AgentConfiguration], tasks: Any, llm_model: str = None, max_concurrency_per_agent: int = 1):
+        """
+        Like multi_agent, but returns what every agent did.
 
+        Returns:
+            Per agent key: the agent configuration, its tasks, the wall-clock time
+            of its work, its token usage and estimated cost.
+        """
         the_agents = {}
 
         for each in agent_configurations:
@@ -424,49 +394,44 @@ class Agent:
             the_agents[agent_key] = each
 
 
-        the_agents_keys = list(the_agents.keys())
-
-
-
-        class TheAgents_(ObjectResponse):
-            agents: List[str]
-
-
-        the_agents_ = TheAgents_(agents=the_agents_keys)
-
-
-        class SelectedAgent(ObjectResponse):
-            selected_agent: str
-
-
         if isinstance(tasks, list) != True:
             tasks = [tasks]
 
-        
-        for each in tasks:
-            is_end = False
-            while is_end == False:
-                selecting_task  = Task(description="Select an agent for this task", response_format=SelectedAgent, context=[the_agents_, each])
-
-                self.call(selecting_task, llm_model)
-
-                if selecting_task.response.selected_agent in the_agents:
-                    is_end = True
-
-
-
-                agent_tasks.append({
-                    "agent": the_agents[selecting_task.response.selected_agent],
-                    "task": each
-                })
-                    
-
-
-
-        for each in agent_tasks:
-            self.agent(each["agent"], each["task"], llm_model)
-
-
-        return the_agents
+        selected = self.route_tasks(the_agents, tasks, llm_model)
 
+        the_llm_model = llm_model
+        if the_llm_model is None:
+            the_llm_model = self.default_llm_model
 
+        semaphores = {agent_key: threading.Semaphore(max_concurrency_per_agent) for agent_key in the_agents}
+
+        def run(agent_key, each):
+            with semaphores[agent_key]:
+                start_time = time.time()
+                summary = self.agent(the_agents[agent_key], each, llm_model)
+                return agent_key, start_time, time.time(), summary
+
+        agent_results = {
+            agent_key: {"agent": agent, "tasks": [], "time": 0.0, "input_tokens": 0, "output_tokens": 0, "estimated_cost": None}
+            for agent_key, agent in the_agents.items()
+        }
+        spans = {}
+
+        max_workers = max(1, min(len(tasks), len(the_agents) * max_concurrency_per_agent))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(run, agent_key, each) for agent_key, each in zip(selected, tasks)]
+            for each, future in zip(tasks, futures):
+                agent_key, start_time, end_time, summary = future.result()
+                agent_result = agent_results[agent_key]
+                agent_result["tasks"].append(each)
+                agent_result["input_tokens"] += summary["input_tokens"]
+                agent_result["output_tokens"] += summary["output_tokens"]
+                first_start, last_end = spans.get(agent_key, (start_time, end_time))
+                spans[agent_key] = (min(first_start, start_time), max(last_end, end_time))
+
+        for agent_key, agent_result in agent_results.items():
+            if agent_key in spans:
+                agent_result["time"] = spans[agent_key][1] - spans[agent_key][0]
+            agent_result["estimated_cost"] = get_estimated_cost(agent_result["input_tokens"], agent_result["output_tokens"], the_llm_model)
+
+        return agent_results
@@ -0,0 +1,3 @@
+from ...orchestration.budget import RunBudget
+
+__all__ = ["RunBudget"]
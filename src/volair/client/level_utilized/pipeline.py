@@ -0,0 +1,3 @@
+from ...orchestration.pipeline import PipelineResult, Stage, run_pipeline
+
+__all__ = ["PipelineResult", "Stage", "run_pipeline"]
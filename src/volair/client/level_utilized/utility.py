@@ -1,47 +1,18 @@
-import copy
 import dill
 import cloudpickle
 cloudpickle.DEFAULT_PROTOCOL = 2
 import base64
 
 from pydantic import BaseModel
-from ..knowledge_base.knowledge_base import KnowledgeBase
 
+from ...orchestration.context import prepare_context, serialize_context, tools_serializer
 
-def serialize_context(context, client):
-    if isinstance(context, KnowledgeBase):
-        context = context.markdown(client)
-    
-    return context
 
 def context_serializer(context, client):
     if context is not None:
-        copy_of_context = copy.deepcopy(context)
-        
-        if isinstance(copy_of_context, list):
-            for i, each in enumerate(copy_of_context):
-                try:
-                    each.tools = []
-                except:
-                    pass
-                try:
-                    each.response_format = None
-                except:
-                    pass
-
-                copy_of_context[i] = serialize_context(each, client)
-        else:
-            try:
-                copy_of_context.tools = []
-            except:
-                pass
-            try:
-                copy_of_context.response_format = None
-            except:
-                pass
-
-            copy_of_context = serialize_context(copy_of_context, client)
+        copy_of_context = prepare_context(context, client)
 
+        if not isinstance(copy_of_context, list):
             the_module = dill.detect.getmodule(copy_of_context)
             if the_module is not None:
                 cloudpickle.register_pickle_by_value(the_module)
@@ -84,22 +55,6 @@ def response_format_deserializer(response_format_str, result):
     return result
 
 
-def tools_serializer(tools_):
-    tools = []
-    for i in tools_:
-
-
-        if isinstance(i, type):
-
-            tools.append(i.__name__+".*")
-        # If its a string, get the name of the string
-        elif isinstance(i, str):
-
-            tools.append(i)
-    return tools
-
-
-
 class NoAPIKeyException(Exception):
     pass
 
@@ -1,18 +1,27 @@
 pricing_data = {
     "openai/gpt-4o": {"input": 0.0000025, "output": 0.00001},
+    "openai/gpt-4o-mini": {"input": 0.00000015, "output": 0.0000006},
     "azure/gpt-4o": {"input": 0.0000025, "output": 0.00001},
     "claude/claude-3-5-sonnet": {"input": 0.000003, "output": 0.000015},
     "bedrock/claude-3-5-sonnet": {"input": 0.000003, "output": 0.000015},
     "deepseek/deepseek-chat": {"input": 0.00000027, "output": 0.00000028},
 }
 
-def get_estimated_cost(input_tokens: int, output_tokens: int, llm_model: str):
+def estimate_cost(input_tokens: int, output_tokens: int, llm_model: str):
+    """
+    Returns the cost in dollars, or None if the model has no known price.
+    """
     if llm_model not in pricing_data:
-        return "Unknown"
-    
+        return None
+
     input_cost = pricing_data[llm_model]["input"] * input_tokens
     output_cost = pricing_data[llm_model]["output"] * output_tokens
-    total = input_cost + output_cost
+    return input_cost + output_cost
+
+def get_estimated_cost(input_tokens: int, output_tokens: int, llm_model: str):
+    total = estimate_cost(input_tokens, output_tokens, llm_model)
+    if total is None:
+        return "Unknown"
 
     # to 2 decimal places
     return f"~{round(total, 4)}"
\ No newline at end of file
@@ -170,6 +170,11 @@ def agent_end(result: Any, llm_model: str, response_format: str, start_time: flo
     
     table.add_row("[bold]Tools:[/bold]", f"{tool_count} [bold]Context Used:[/bold]", f"{context_count}")
     table.add_row("[bold]Estimated Cost:[/bold]", f"{get_estimated_cost(usage['input_tokens'], usage['output_tokens'], llm_model)}$")
+    if usage.get("budget", {}).get("degraded"):
+        table.add_row("[bold]Budget:[/bold]", f"[yellow]{', '.join(usage['budget']['degraded'])}[/yellow]")
+    if usage.get("reflection"):
+        reflection = usage["reflection"]
+        table.add_row("[bold]Reflection:[/bold]", f"{len(reflection['iterations'])} iterations ({reflection['stop_reason'].replace('_', ' ')})")
     time_taken = end_time - start_time
     time_taken_str = f"{time_taken:.2f} seconds"
     table.add_row("[bold]Time Taken:[/bold]", f"{time_taken_str}")
@@ -185,12 +190,14 @@ def agent_end(result: Any, llm_model: str, response_format: str, start_time: flo
     spacing()
 
 
-def agent_total_cost(total_input_tokens: int, total_output_tokens: int, total_time: float, llm_model: str):
+def agent_total_cost(total_input_tokens: int, total_output_tokens: int, total_time: float, llm_model: str, critical_path_time: float = None):
     table = Table(show_header=False, expand=True, box=None)
     table.width = 60
 
     table.add_row("[bold]Estimated Cost:[/bold]", f"{get_estimated_cost(total_input_tokens, total_output_tokens, llm_model)}$")
     table.add_row("[bold]Time Taken:[/bold]", f"{total_time:.2f} seconds")
+    if critical_path_time is not None:
+        table.add_row("[bold]Critical Path:[/bold]", f"{critical_path_time:.2f} seconds")
     panel = Panel(
         table,
         title="[bold white]Volair - Agent Total Cost[/bold white]",
@@ -201,6 +208,44 @@ def agent_total_cost(total_input_tokens: int, total_output_tokens: int, total_ti
     console.print(panel)
     spacing()
 
+def agent_preparation(timings: dict, total_time: float):
+    table = Table(show_header=False, expand=True, box=None)
+    table.width = 60
+
+    for stage, timing in sorted(timings.items(), key=lambda item: item[1]["start"]):
+        table.add_row(f"[bold]{stage.replace('_', ' ').title()}:[/bold]", f"{timing['duration']:.2f} seconds")
+    table.add_row("[bold]Total:[/bold]", f"{total_time:.2f} seconds")
+    panel = Panel(
+        table,
+        title="[bold white]Volair - Agent Preparation[/bold white]",
+        border_style="white",
+        expand=True,
+        width=70
+    )
+    console.print(panel)
+    spacing()
+
+def agent_budget_exhausted(budget: dict, exhausted_tasks: int):
+    table = Table(show_header=False, expand=True, box=None)
+    table.width = 60
+
+    if budget["max_tokens"] is not None:
+        table.add_row("[bold]Tokens:[/bold]", f"{budget['spent_tokens']} of {budget['max_tokens']}")
+    if budget["max_cost"] is not None:
+        table.add_row("[bold]Cost:[/bold]", f"~{budget['spent_cost']}$ of {budget['max_cost']}$")
+    table.add_row("[bold]Stopped Tasks:[/bold]", f"[yellow]{exhausted_tasks}[/yellow]")
+
+    panel = Panel(
+        table,
+        title="[bold yellow]Volair - Budget Exhausted[/bold yellow]",
+        border_style="yellow",
+        expand=True,
+        width=70
+    )
+
+    console.print(panel)
+    spacing()
+
 def agent_retry(retry_count: int, max_retries: int):
     table = Table(show_header=False, expand=True, box=None)
     table.width = 60
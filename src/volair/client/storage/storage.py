@@ -9,8 +9,13 @@ from pydantic import BaseModel
 
 
 class Storage:
+    # Configuration values read with get_configs and the server version stamp they belong to
+    _config_cache: Dict[str, Any]
+    _config_version: Optional[str]
 
-
+    def __init__(self):
+        self._config_cache = {}
+        self._config_version = None
 
     def get_config(self, key: str) -> Any:
         """
@@ -45,4 +50,64 @@ class Storage:
             with sentry_sdk.start_span(op="send_request"):
                 data = {"key": key, "value": value}
                 response = self.send_request("/storage/config/set", data=data)
+
+            self._config_cache.clear()
+            self._config_version = None
+
+            return response.get("message")
+
+    def get_configs(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several configuration values from the server in one request.
+
+        Values are cached on the client together with the server's version
+        stamp. When every requested key is cached, the server only checks the
+        stamp and the values are not sent again unless something changed.
+
+        Args:
+            keys: The configuration keys
+
+        Returns:
+            A mapping of each key to its configuration value
+        """
+        from ..trace import sentry_sdk
+        cache = self._config_cache
+        version = self._config_version
+
+        with sentry_sdk.start_transaction(op="task", name="Storage.get_configs") as transaction:
+            with sentry_sdk.start_span(op="send_request"):
+                data = {
+                    "keys": keys,
+                    "version": version if all(key in cache for key in keys) else None,
+                }
+                response = self.send_request("/storage/config/get_many", data=data)
+
+            if not response.get("not_modified"):
+                if response.get("version") != version:
+                    cache.clear()
+                cache.update(response.get("values", {}))
+                self._config_version = response.get("version")
+
+            return {key: cache.get(key) for key in keys}
+
+    def set_configs(self, configs: Dict[str, str]) -> str:
+        """
+        Set several configuration values on the server in a single write.
+
+        Args:
+            configs: The configuration keys and values
+
+        Returns:
+            A success message
+        """
+        from ..trace import sentry_sdk
+        with sentry_sdk.start_transaction(op="task", name="Storage.set_configs") as transaction:
+            with sentry_sdk.start_span(op="send_request"):
+                data = {"configs": configs}
+                response = self.send_request("/storage/config/set_many", data=data)
+
+            # Other keys may have changed alongside ours, so revalidate on the next read
+            self._config_cache.clear()
+            self._config_version = None
+
             return response.get("message")
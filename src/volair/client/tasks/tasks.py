@@ -11,7 +11,13 @@ class Task(BaseModel):
     tools: list[Any] = []
     response_format: Union[Type[CustomTaskResponse], Type[ObjectResponse], None] = None
     _response: Any = None
+    # Token usage of the last call of the task
+    _usage: Any = None
     context: Any = None
+    parallel_tool_calls: Optional[bool] = None
+    # Budget of the task, the lower limit wins when the agent has one too
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
     
 
     @property
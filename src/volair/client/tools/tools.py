@@ -1,4 +1,5 @@
 import inspect
+import time
 import cloudpickle
 
 from ..level_utilized.utility import error_handler
@@ -18,6 +19,9 @@ class NoAPIKeyException(Exception):
 class UnsupportedLLMModelException(Exception):
     pass
 
+class LibraryInstallException(Exception):
+    pass
+
 class ComputerUse:
     pass
 
@@ -26,22 +30,56 @@ class Search:
 
 
 class Tools:
-    def tool(self, library: Optional[Union[str, List[str]]] = None):
+    def tool(
+        self,
+        library: Optional[Union[str, List[str]]] = None,
+        sandbox: bool = False,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        cacheable: bool = False,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_result_chars: Optional[int] = None,
+    ):
         """
         Decorator to register a function or class as a tool.
         Can be used as @tool(), @tool("pandas"), or @tool(["pandas", "numpy"])
 
         Args:
-            library: Optional library name or list of library names to install before registering the tool
+            library: Optional library name or list of library names to install before registering the tool,
+                libraries that are already installed are skipped
+            sandbox: Run the tool in a warm pool of worker processes with its libraries pre-imported,
+                so CPU-heavy or crashing tools do not affect other tools
+            timeout: Optional timeout of a tool call in seconds
+            max_concurrency: Optional number of calls of the tool that can run at once
+            memory_limit_mb: Optional memory limit of each sandbox worker process
+            cacheable: Reuse the result of earlier calls with the same arguments, only for pure tools
+            ttl: Optional seconds a cached result stays valid
+            max_entries: Optional number of cached results kept per tool
+            max_result_chars: Optional size limit of a result in characters, larger results reach
+                the agent as a preview that it can page through. 0 for no limit
         """
+        libraries = [library] if isinstance(library, str) else list(library or [])
+        options = {
+            "sandbox": sandbox,
+            "libraries": libraries,
+            "timeout": timeout,
+            "max_concurrency": max_concurrency,
+            "memory_limit_mb": memory_limit_mb,
+            "cacheable": cacheable,
+            "ttl": ttl,
+            "max_entries": max_entries,
+            "max_result_chars": max_result_chars,
+        }
+
         def decorator(obj: Union[Callable, Type]):
             # Install libraries first if specified
-            if library:
-                if isinstance(library, str):
-                    self.install_library(library)
-                else:
-                    for lib in library:
-                        self.install_library(lib)
+            if libraries:
+                job = self.install_libraries(libraries)
+                if job["status"] != "succeeded":
+                    logs = "\n".join(job.get("logs", [])[-20:])
+                    raise LibraryInstallException(f"Installing {', '.join(libraries)} failed:\n{logs}")
             
             # If it's a class, register each method as a tool
             if isinstance(obj, type):
@@ -62,7 +100,7 @@ class Tools:
                     
                     full_name = f"{class_name}__{name}"
                     standalone = create_standalone(method, full_name)
-                    self.add_tool(standalone)
+                    self.add_tool(standalone, **options)
                 
                 return obj
             else:
@@ -70,7 +108,7 @@ class Tools:
                 @wraps(obj)
                 def wrapper(*args, **kwargs):
                     return obj(*args, **kwargs)
-                self.add_tool(wrapper)
+                self.add_tool(wrapper, **options)
                 return wrapper
                 
         return decorator
@@ -78,6 +116,15 @@ class Tools:
     def add_tool(
         self,
         function,
+        sandbox: bool = False,
+        libraries: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        cacheable: bool = False,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_result_chars: Optional[int] = None,
     ) -> Any:
 
 
@@ -91,6 +138,15 @@ class Tools:
 
         data = {
             "function": base64.b64encode(the_dumped_function).decode("utf-8"),
+            "executor": "process" if sandbox else "thread",
+            "libraries": libraries or [],
+            "timeout": timeout,
+            "max_concurrency": max_concurrency,
+            "memory_limit_mb": memory_limit_mb,
+            "cacheable": cacheable,
+            "ttl": ttl,
+            "max_entries": max_entries,
+            "max_result_chars": max_result_chars,
         }
         
         result = self.send_request("/tools/add_tool", data)
@@ -106,9 +162,58 @@ class Tools:
         print("********* MCP TOOL ADDED *********")
         return result
 
-    def install_library(self, library: str) -> Dict[str, Any]:
-        result = self.send_request("/tools/install_library", {"library": library})
-        return result
+    def install_library(self, library: str, wait: bool = True, poll_interval: float = 1.0, timeout: Optional[float] = 600.0) -> Dict[str, Any]:
+        """
+        Installs a library on the tools server, see install_libraries.
+        """
+        return self.install_libraries([library], wait=wait, poll_interval=poll_interval, timeout=timeout)
+
+    def install_libraries(self, libraries: List[str], wait: bool = True, poll_interval: float = 1.0, timeout: Optional[float] = 600.0) -> Dict[str, Any]:
+        """
+        Installs a set of libraries on the tools server in one background job.
+
+        Args:
+            libraries: Library requirements, e.g. ["pandas>=2", "numpy"]
+            wait: Wait until the job finished, otherwise return right after it started
+            poll_interval: Seconds between status checks while waiting
+            timeout: Seconds to wait for the job, no limit if None
+
+        Returns:
+            The install job with its status ("queued", "running", "succeeded" or "failed")
+            and, when waited for, its log lines
+
+        Raises:
+            LibraryInstallException: If the job is unknown to the tools server or
+                did not finish within the timeout.
+        """
+        job = self._checked_job(self.send_request("/tools/install_libraries", {"libraries": libraries}))
+        if not wait:
+            return job
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while job["status"] not in ("succeeded", "failed"):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LibraryInstallException(f"Installing {', '.join(libraries)} did not finish within {timeout} seconds, install job {job['job_id']} is still {job['status']}")
+            time.sleep(poll_interval)
+            job = self.install_status(job["job_id"])
+        return job
+
+    def install_status(self, job_id: str, log_offset: int = 0) -> Dict[str, Any]:
+        """
+        Returns the status of an install job and its log lines from log_offset on.
+        """
+        try:
+            job = self.send_request("/tools/install_status", {"job_id": job_id, "log_offset": log_offset})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise LibraryInstallException(f"Install job {job_id} not found, the tools server may have restarted")
+            raise
+        return self._checked_job(job)
+
+    @staticmethod
+    def _checked_job(job: Dict[str, Any]) -> Dict[str, Any]:
+        if job.get("status") not in ("queued", "running", "succeeded", "failed"):
+            raise LibraryInstallException(f"Unknown install job status: {job.get('status', job.get('detail'))}")
+        return job
 
     def uninstall_library(self, library: str) -> Dict[str, Any]:
         result = self.send_request("/tools/uninstall_library", {"library": library})
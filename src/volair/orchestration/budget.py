@@ -0,0 +1,130 @@
+"""
+Token and cost budget of an agent run.
+
+The sub-tasks of a run share its budget. Each sub-task reserves an equal part
+of what is left for the sub-tasks that did not start yet, so sub-tasks running
+at the same time can not spend more than the budget together, and what a
+sub-task does not use goes to the ones after it. The server keeps every
+sub-task within its part. The preparation calls (characterization and sub-task
+planning) are charged to the same budget.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from ..client.price import estimate_cost
+
+
+class RunBudget:
+    """
+    Args:
+        max_tokens: Tokens the run may use, no limit if None.
+        max_cost: Dollars the run may cost, no limit if None.
+        tasks: Number of sub-tasks that share the budget.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None, tasks: int = 1):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.pending = tasks
+        self.spent_tokens = 0
+        self.spent_cost = 0.0
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, *sources: Any, tasks: int = 1) -> "RunBudget":
+        """
+        Returns the budget of a run, the lowest limits of the sources (agent
+        configurations or tasks) that set one.
+        """
+        def lowest(name):
+            limits = [getattr(source, name, None) for source in sources]
+            limits = [limit for limit in limits if limit is not None]
+            return min(limits) if limits else None
+
+        return cls(lowest("max_tokens"), lowest("max_cost"), tasks)
+
+    @property
+    def limited(self) -> bool:
+        return self.max_tokens is not None or self.max_cost is not None
+
+    def reserve(self) -> Optional[Dict[str, Any]]:
+        """
+        Reserves the part of the next sub-task.
+
+        Returns:
+            {"max_tokens", "max_cost"} of the sub-task, or None if nothing is left.
+        """
+        with self._lock:
+            pending = max(self.pending, 1)
+            self.pending -= 1
+            share = {"max_tokens": None, "max_cost": None}
+
+            if self.max_tokens is not None:
+                available = self.max_tokens - self.spent_tokens - self.reserved_tokens
+                if available // pending <= 0:
+                    self.exhausted = True
+                    return None
+                share["max_tokens"] = available // pending
+
+            if self.max_cost is not None:
+                available = self.max_cost - self.spent_cost - self.reserved_cost
+                if available <= 0:
+                    self.exhausted = True
+                    return None
+                share["max_cost"] = available / pending
+
+            self.reserved_tokens += share["max_tokens"] or 0
+            self.reserved_cost += share["max_cost"] or 0.0
+            return share
+
+    @property
+    def used_up(self) -> bool:
+        """
+        Whether nothing is left of the budget, e.g. after the preparation calls.
+        """
+        with self._lock:
+            return (self.max_tokens is not None and self.spent_tokens >= self.max_tokens) or \
+                (self.max_cost is not None and self.spent_cost >= self.max_cost)
+
+    def expect(self, tasks: int) -> None:
+        """
+        Sets the number of sub-tasks that share what is left, once they are planned.
+        """
+        with self._lock:
+            self.pending = tasks
+
+    def charge(self, usage: Dict[str, Any], llm_model: str) -> None:
+        """
+        Books the usage of a call made outside the sub-tasks, e.g. a preparation call.
+        """
+        with self._lock:
+            self._spend(usage, llm_model)
+
+    def release(self, share: Dict[str, Any], usage: Dict[str, Any], llm_model: str) -> None:
+        """
+        Books what a sub-task used and frees the rest of its part.
+        """
+        with self._lock:
+            self.reserved_tokens -= share["max_tokens"] or 0
+            self.reserved_cost -= share["max_cost"] or 0.0
+            self._spend(usage, llm_model)
+
+    def _spend(self, usage: Dict[str, Any], llm_model: str) -> None:
+        self.spent_tokens += usage["input_tokens"] + usage["output_tokens"]
+        # The server may have switched to a cheaper model to stay in the budget
+        used_model = usage.get("budget", {}).get("llm_model", llm_model)
+        cost = estimate_cost(usage["input_tokens"], usage["output_tokens"], used_model)
+        if cost is not None:
+            self.spent_cost += cost
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "max_cost": self.max_cost,
+            "spent_tokens": self.spent_tokens,
+            "spent_cost": round(self.spent_cost, 6),
+        }
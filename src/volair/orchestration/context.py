@@ -0,0 +1,67 @@
+"""
+Preparation of tasks before they are sent to a model, shared by the client
+and the server-side agent run.
+"""
+
+import copy
+
+from ..client.knowledge_base.knowledge_base import KnowledgeBase
+
+
+def serialize_context(context, client):
+    if isinstance(context, KnowledgeBase) and client is not None:
+        context = context.markdown(client)
+    
+    return context
+
+def prepare_context(context, client):
+    """
+    Returns a copy of the context without the tools and response formats of
+    the tasks in it, with knowledge bases converted to markdown by the client.
+    Knowledge bases are kept as they are if the client is None.
+    """
+    if context is None:
+        return None
+
+    copy_of_context = copy.deepcopy(context)
+
+    if isinstance(copy_of_context, list):
+        for i, each in enumerate(copy_of_context):
+            try:
+                each.tools = []
+            except:
+                pass
+            try:
+                each.response_format = None
+            except:
+                pass
+
+            copy_of_context[i] = serialize_context(each, client)
+    else:
+        try:
+            copy_of_context.tools = []
+        except:
+            pass
+        try:
+            copy_of_context.response_format = None
+        except:
+            pass
+
+        copy_of_context = serialize_context(copy_of_context, client)
+
+    return copy_of_context
+
+
+def tools_serializer(tools_):
+    tools = []
+    for i in tools_:
+
+
+        if isinstance(i, type):
+
+            tools.append(i.__name__+".*")
+        # If its a string, get the name of the string
+        elif isinstance(i, str):
+
+            tools.append(i)
+    return tools
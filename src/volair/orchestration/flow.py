@@ -0,0 +1,366 @@
+"""
+The agent flow shared by the client and the server-side agent run.
+
+An agent task is prepared (characterization, knowledge base, sub-task
+planning), then its sub-tasks run as soon as the ones they depend on are
+done, all within the run budget. How a model call is made and where progress
+is reported is up to the subclass: the client sends every call to the server,
+the server-side agent run makes them in process and streams the progress.
+"""
+
+import copy
+import hashlib
+from typing import Any, Dict, List, Optional, Union
+
+from ..client.agent_configuration.agent_configuration import AgentConfiguration
+from ..client.price import get_estimated_cost
+from ..client.tasks.task_response import ObjectResponse
+from ..client.tasks.tasks import Task
+from ..storage.caching import get_from_cache_with_expiry, save_to_cache_with_expiry
+from .budget import RunBudget
+from .pipeline import PipelineResult, Stage, run_pipeline
+
+
+class SubTask(ObjectResponse):
+    description: str
+    sources_can_be_used: List[str]
+    required_output: str
+    tools: List[str]
+    depends_on: List[int] = []
+
+
+class SubTaskList(ObjectResponse):
+    sub_tasks: List[SubTask]
+
+
+class SearchResult(ObjectResponse):
+    any_customers: bool
+    products: List[str]
+    services: List[str]
+    potential_competitors: List[str]
+
+
+class CompanyObjective(ObjectResponse):
+    objective: str
+    goals: List[str]
+    state: str
+
+
+class HumanObjective(ObjectResponse):
+    job_title: str
+    job_description: str
+    job_goals: List[str]
+
+
+class Characterization(ObjectResponse):
+    website_content: Union[SearchResult, None]
+    company_objective: Union[CompanyObjective, None]
+    human_objective: Union[HumanObjective, None]
+    name_of_the_human_of_tasks: str = None
+    contact_of_the_human_of_tasks: str = None
+
+
+class OtherTask(ObjectResponse):
+    task: str
+    result: Any
+
+
+def _ancestors(dependencies: Dict[int, List[int]], index: int) -> List[int]:
+    """
+    Returns the indexes of every sub task that a sub task depends on, directly or not, in order.
+    """
+    found = set()
+    pending = list(dependencies.get(index, []))
+    while pending:
+        dependency = pending.pop()
+        if dependency not in found:
+            found.add(dependency)
+            pending += dependencies.get(dependency, [])
+    return sorted(found)
+
+
+class AgentFlow:
+    """
+    Base class of the agents, subclasses make the model calls.
+
+    Subclasses set default_llm_model and implement call(task, llm_model) for
+    the preparation calls and agent_(agent_configuration, task, llm_model,
+    budget) for the sub-tasks. The report_* methods are called with the
+    progress and do nothing by default.
+    """
+
+    def report_preparation(self, preparation: PipelineResult) -> None:
+        pass
+
+    def report_budget_exhausted(self, budget: Dict[str, Any], exhausted_tasks: int) -> None:
+        pass
+
+    def report_total_cost(self, input_tokens: int, output_tokens: int, total_time: float, llm_model: str, critical_path_time: float) -> None:
+        pass
+
+    def _charge(self, budget: Optional[RunBudget], task: Task, llm_model: str = None) -> None:
+        """
+        Books the usage of a preparation call to the budget of the run.
+        """
+        if budget is not None and task._usage:
+            budget.charge(task._usage, llm_model or self.default_llm_model)
+
+    def create_characterization(self, agent_configuration: AgentConfiguration, llm_model: str = None, budget: RunBudget = None):
+        tools = ["google", "read_website"]
+
+        search_task = Task(description=f"Make a search for {agent_configuration.company_url}", tools=tools, response_format=SearchResult)
+        self.call(search_task, llm_model=llm_model)
+        self._charge(budget, search_task, llm_model)
+
+        company_objective_task = Task(description=f"Generate the company objective for {agent_configuration.company_url}", tools=tools, response_format=CompanyObjective, context=search_task)
+        self.call(company_objective_task, llm_model=llm_model)
+        self._charge(budget, company_objective_task, llm_model)
+
+        human_objective_task = Task(description=f"Generate the human objective for {agent_configuration.job_title}", tools=tools, response_format=HumanObjective, context=[search_task, company_objective_task])
+        self.call(human_objective_task, llm_model=llm_model)
+        self._charge(budget, human_objective_task, llm_model)
+
+        total_character = Characterization(website_content=search_task.response, company_objective=company_objective_task.response, human_objective=human_objective_task.response, name_of_the_human_of_tasks=agent_configuration.name, contact_of_the_human_of_tasks=agent_configuration.contact)
+
+        return total_character
+
+
+    def characterization(self, agent_configuration: AgentConfiguration, llm_model: str = None, budget: RunBudget = None):
+        """
+        Returns the characterization of the agent, from the cache when caching is enabled.
+        """
+        copy_agent_configuration = copy.deepcopy(agent_configuration)
+        copy_agent_configuration_json = copy_agent_configuration.model_dump_json(include={"job_title", "company_url", "company_objective", "name", "contact"})
+        the_characterization_cache_key = f"characterization_{hashlib.sha256(copy_agent_configuration_json.encode()).hexdigest()}"
+
+        if agent_configuration.caching:
+            the_characterization = get_from_cache_with_expiry(the_characterization_cache_key)
+            if the_characterization is None:
+                the_characterization = self.create_characterization(agent_configuration, llm_model, budget)
+                save_to_cache_with_expiry(the_characterization, the_characterization_cache_key, agent_configuration.cache_expiry)
+        else:
+            the_characterization = self.create_characterization(agent_configuration, llm_model, budget)
+
+        return the_characterization
+
+
+    def prepare_agent(self, agent_configuration: AgentConfiguration, task: Task, llm_model: str = None, budget: RunBudget = None) -> PipelineResult:
+        """
+        Runs the preparation stages of an agent. The characterization, the
+        knowledge base conversion and the sub-task planning do not depend on
+        each other, so they run at the same time.
+
+        With a limited budget the calls are charged to it, and the planning
+        waits for the characterization and is skipped (None) if nothing is left.
+        """
+        stages = [Stage("characterization", lambda: self.characterization(agent_configuration, llm_model, budget))]
+
+        if agent_configuration.knowledge_base:
+            stages.append(Stage("knowledge_base", lambda: agent_configuration.knowledge_base.markdown(self)))
+
+        if agent_configuration.sub_task:
+            def plan():
+                if budget is not None and budget.used_up:
+                    return None
+                return self.plan_sub_tasks(task, llm_model, budget)
+
+            limited = budget is not None and budget.limited
+            stages.append(Stage("sub_tasks", plan, depends_on=["characterization"] if limited else []))
+
+        return run_pipeline(stages)
+
+
+    def agent(self, agent_configuration: AgentConfiguration, task: Task,  llm_model: str = None):
+
+        original_task = task
+
+        # The preparation calls are charged to the budget too
+        budget = RunBudget.of(agent_configuration, original_task)
+        preparation = self.prepare_agent(agent_configuration, task, llm_model, budget)
+        self.report_preparation(preparation)
+
+        the_characterization = preparation.results["characterization"]
+        knowledge_base = preparation.results.get("knowledge_base")
+
+
+        the_task = task
+
+        is_it_sub_task = False
+        dependencies = {}
+
+        if preparation.results.get("sub_tasks"):
+            sub_tasks, dependencies = preparation.results["sub_tasks"]
+            is_it_sub_task = True
+
+
+            the_task = sub_tasks
+
+
+        if not isinstance(the_task, list):
+            the_task = [the_task]
+
+
+        for each in the_task:
+            if not isinstance(each.context, list):
+                each.context = [each.context]
+
+
+        last_task = []
+        for each in the_task:
+            if isinstance(each.context, list):
+                last_task.append(each)
+        the_task = last_task
+
+
+        for each in the_task:
+            each.context.append(the_characterization)
+
+        # Add knowledge base to the context for each task
+        if knowledge_base:
+            if isinstance(the_task, list):
+                for each in the_task:
+                    if each.context:
+                        each.context.append(knowledge_base)
+                    else:
+                        each.context = [knowledge_base]
+
+        if task.context:
+            for each in the_task:
+                each.context.append(task.context)
+
+
+        if agent_configuration.tools:
+            if isinstance(the_task, list):
+                for each in the_task:
+                    each.tools = agent_configuration.tools
+
+
+        the_llm_model = llm_model
+        if the_llm_model is None:
+            the_llm_model = self.default_llm_model
+
+        budget.expect(len(the_task))
+
+        # Sub-tasks run as soon as the sub-tasks they depend on are done, each
+        # with the results of its ancestors as context
+        def run_task(each, ancestors):
+            def run():
+                share = budget.reserve()
+                if share is None:
+                    # Nothing left of the budget, the sub-task is not sent
+                    return [{"result": None, "llm_model": the_llm_model, "response_format": "str" if each.response_format is None else each.response_format.__name__, "usage": {"input_tokens": 0, "output_tokens": 0}, "tool_count": 0, "context_count": 0, "time": 0.0, "status": "budget_exhausted"}]
+
+                if ancestors:
+                    each.context += [OtherTask(task=ancestor.description, result=ancestor.response) for ancestor in ancestors]
+
+                usage = {"input_tokens": 0, "output_tokens": 0}
+                try:
+                    task_results = self.agent_(agent_configuration, each, llm_model=llm_model, budget=share)
+                    usage = {
+                        "input_tokens": sum(result["usage"]["input_tokens"] for result in task_results),
+                        "output_tokens": sum(result["usage"]["output_tokens"] for result in task_results),
+                        "budget": task_results[-1]["usage"].get("budget", {}),
+                    }
+                finally:
+                    budget.release(share, usage, the_llm_model)
+                return task_results
+            return run
+
+        stages = []
+        for index, each in enumerate(the_task):
+            ancestors = [the_task[ancestor] for ancestor in _ancestors(dependencies, index)] if is_it_sub_task else []
+            stages.append(Stage(str(index), run_task(each, ancestors), depends_on=[str(dependency) for dependency in dependencies.get(index, [])]))
+
+        # Sub-tasks with memory share the agent's message history, so they run in order
+        max_workers = 1 if agent_configuration.memory else agent_configuration.max_parallel_sub_tasks
+        execution = run_pipeline(stages, max_workers=max_workers)
+
+        results = []
+        for index in range(len(the_task)):
+            results += execution.results[str(index)]
+
+
+        original_task._response = the_task[-1].response
+
+        exhausted = any(each.get("status") == "budget_exhausted" for each in results)
+
+
+        total_input_tokens = 0
+        total_output_tokens = 0
+        for each in results:
+
+            total_input_tokens += each["usage"]["input_tokens"]
+            total_output_tokens += each["usage"]["output_tokens"]
+
+        if exhausted:
+            self.report_budget_exhausted(budget.summary(), sum(1 for each in results if each.get("status") == "budget_exhausted"))
+
+        self.report_total_cost(total_input_tokens, total_output_tokens, execution.total_time, the_llm_model, execution.critical_path_time)
+
+        summary = {
+            "time": preparation.total_time + execution.total_time,
+            "preparation_time": preparation.total_time,
+            "execution_time": execution.total_time,
+            "critical_path_time": execution.critical_path_time,
+            "input_tokens": total_input_tokens,
+            "output_tokens": total_output_tokens,
+            "estimated_cost": get_estimated_cost(total_input_tokens, total_output_tokens, the_llm_model),
+        }
+
+        if budget.limited:
+            summary["status"] = "budget_exhausted" if exhausted else "completed"
+            summary["budget"] = budget.summary()
+        if exhausted:
+            # What the run got done before the budget ran out
+            summary["partial_results"] = [{"task": each.description, "result": each.response} for each, result in zip(the_task, results) if result.get("status") != "budget_exhausted"]
+
+        # The iterations of every task that was reflected on, in task order
+        reflections = [each["usage"]["reflection"] for each in results if "reflection" in each["usage"]]
+        if reflections:
+            summary["reflection"] = reflections
+
+        # Tokens the context of the tasks used per category
+        context_tokens = {}
+        for each in results:
+            for category, stats in each["usage"].get("context", {}).get("categories", {}).items():
+                context_tokens[category] = context_tokens.get(category, 0) + stats["tokens"]
+        if context_tokens:
+            summary["context_tokens"] = context_tokens
+
+        return summary
+
+
+    def plan_sub_tasks(self, task: Task, llm_model: str = None, budget: RunBudget = None):
+        """
+        Generates the sub tasks of a task and the sub tasks each one depends on.
+
+        Returns:
+            The sub tasks, ending with the original task, and a dict from the
+            index of each sub task to the indexes of the sub tasks it needs.
+        """
+        prompt = "You are a helpful assistant. User have an general task. You need to generate a list of sub tasks. Each sub task should be a Actionable step of main task. You need to return a list of sub tasks. You should say to agent to make this job not making plan again and again. We need actions. If  If you have tools that can help you for the task specify them in the task. If there is an context its the user want to see so create tasks to fill them all. Create rich tasks for every user requested field. Only do user requested things. Dont make any assumptions. Sub tasks are numbered from 1 in list order. In depends_on, list the numbers of the earlier sub tasks whose results a sub task needs, leave it empty if it can be done on its own so independent sub tasks can run at the same time."
+
+        sub_tasker = Task(description=prompt, response_format=SubTaskList, context=[task, task.response_format], tools=task.tools)
+
+        self.call(sub_tasker, llm_model)
+        self._charge(budget, sub_tasker, llm_model)
+
+        sub_tasks = []
+        dependencies = {}
+
+        for index, each in enumerate(sub_tasker.response.sub_tasks):
+
+            new_task = Task(description=each.description+ " " + each.required_output + " " + str(each.sources_can_be_used) + " " + str(each.tools))
+            new_task.tools = task.tools
+            sub_tasks.append(new_task)
+
+            # Only earlier sub tasks, so the plan can not contain a cycle
+            dependencies[index] = sorted({number - 1 for number in each.depends_on if 1 <= number <= index})
+
+
+        # The original task waits for every sub task
+        end_task = Task(description=task.description, response_format=task.response_format)
+        dependencies[len(sub_tasks)] = list(range(len(sub_tasks)))
+        sub_tasks.append(end_task)
+
+        return sub_tasks, dependencies
@@ -0,0 +1,134 @@
+"""
+Runs dependent steps concurrently.
+
+Each stage starts as soon as the stages it depends on finished, so independent
+stages overlap on a thread pool. The result reports the timing of every stage
+and the critical path, the chain of dependent stages that bounds the total time.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Stage:
+    def __init__(self, name: str, function: Callable[[], Any], depends_on: Optional[List[str]] = None):
+        self.name = name
+        self.function = function
+        self.depends_on = list(depends_on or [])
+
+
+class PipelineResult:
+    def __init__(self, results: Dict[str, Any], timings: Dict[str, Dict[str, float]], total_time: float, critical_path: List[str]):
+        self.results = results
+        self.timings = timings
+        self.total_time = total_time
+        self.critical_path = critical_path
+
+    @property
+    def critical_path_time(self) -> float:
+        return sum(self.timings[name]["duration"] for name in self.critical_path)
+
+
+def _check_graph(stages: Dict[str, Stage]) -> None:
+    for stage in stages.values():
+        for dependency in stage.depends_on:
+            if dependency not in stages:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage {dependency}")
+
+    # Depth-first search for cycles
+    state: Dict[str, int] = {}
+
+    def visit(name: str, path: List[str]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"Stages depend on each other: {' -> '.join(path + [name])}")
+        state[name] = 1
+        for dependency in stages[name].depends_on:
+            visit(dependency, path + [name])
+        state[name] = 2
+
+    for name in stages:
+        visit(name, [])
+
+
+def _critical_path(stages: Dict[str, Stage], timings: Dict[str, Dict[str, float]]) -> List[str]:
+    longest: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+
+    def length(name: str) -> float:
+        if name not in longest:
+            best, best_dependency = 0.0, None
+            for dependency in stages[name].depends_on:
+                if length(dependency) > best:
+                    best, best_dependency = length(dependency), dependency
+            longest[name] = best + timings[name]["duration"]
+            previous[name] = best_dependency
+        return longest[name]
+
+    if not stages:
+        return []
+    name = max(stages, key=length)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return list(reversed(path))
+
+
+def run_pipeline(stages: List[Stage], max_workers: Optional[int] = None) -> PipelineResult:
+    """
+    Runs the stages, each one once all of its dependencies are done.
+
+    Args:
+        stages: The stages to run.
+        max_workers: Stages that run at once, all ready stages if None.
+
+    Returns:
+        The result of every stage, their timings in seconds since the start
+        ({"start", "end", "duration"}), the total time and the critical path.
+
+    Raises:
+        ValueError: If a dependency is unknown or the stages form a cycle.
+        Exception: The first exception raised by a stage, after the running stages finished.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    _check_graph(by_name)
+
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    pipeline_start = time.time()
+
+    def run(stage: Stage) -> Any:
+        start = time.time()
+        try:
+            return stage.function()
+        finally:
+            end = time.time()
+            timings[stage.name] = {"start": start - pipeline_start, "end": end - pipeline_start, "duration": end - start}
+
+    pending = dict(by_name)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(stages), 1)) as pool:
+        while pending or running:
+            if error is None:
+                for name in [name for name, stage in pending.items() if all(dependency in results for dependency in stage.depends_on)]:
+                    running[pool.submit(run, pending.pop(name))] = name
+            elif not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # Stop starting new stages, let the running ones finish
+                    error = error or e
+
+    if error is not None:
+        raise error
+
+    return PipelineResult(results, timings, time.time() - pipeline_start, _critical_path(by_name, timings))
@@ -44,10 +44,14 @@ def is_main_server_running() -> bool:
 
 def run_dev_server(redirect_output=True):
     """Run both main and tools servers for development"""
+    from ..tools_server.transport import IN_PROCESS
+
     run_main_server(redirect_output=redirect_output)
-    run_tools_server(redirect_output=redirect_output)
+    # Co-located mode runs the tools app inside the main server
+    if not IN_PROCESS:
+        run_tools_server(redirect_output=redirect_output)
     import time
-    while not is_main_server_running() or not is_tools_server_running():
+    while not is_main_server_running() or not (IN_PROCESS or is_tools_server_running()):
         time.sleep(0.1)
 
 def stop_dev_server():
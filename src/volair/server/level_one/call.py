@@ -6,6 +6,9 @@ from typing import Any, Optional
 from ...storage.configuration import Configuration
 
 from ..level_utilized.utility import agent_creator, summarize_message_prompt
+from ..level_utilized.context import assemble_context
+from ..level_utilized.tokens import count_tokens, fits_context_window
+from ..level_utilized.budget import Budget, BudgetExhausted, exhausted_response, run_with_limits
 
 import openai
 import traceback
@@ -18,11 +21,28 @@ class CallManager:
         tools: list[str] = [],
         context: Any = None,
         llm_model: str = "openai/gpt-4o",
-        system_prompt: Optional[Any] = None 
+        system_prompt: Optional[Any] = None,
+        parallel_tool_calls: bool = False,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None
     ) -> ResultData:
 
-        
-        roulette_agent = agent_creator(response_format, tools, context, llm_model, system_prompt)
+        # Degrade the call to fit the budget, or do not make it at all
+        budget = Budget(max_tokens, max_cost)
+        assembly = assemble_context(context, llm_model)
+        plan = budget.plan(llm_model, count_tokens(prompt, llm_model) + count_tokens(system_prompt, llm_model), assembly.tokens)
+        if plan.exhausted:
+            return exhausted_response(budget, plan)
+        if plan.llm_model != llm_model or plan.max_context_tokens is not None:
+            # Less of the context fits, keep the items with the highest priority
+            assembly = assemble_context(context, plan.llm_model, plan.max_context_tokens)
+        llm_model = plan.llm_model
+
+        # Compress up front instead of waiting for the provider to reject the request
+        if not fits_context_window(llm_model, prompt, system_prompt, assembly.text):
+            prompt = summarize_message_prompt(prompt, llm_model)
+
+        roulette_agent = agent_creator(response_format, tools, assembly, llm_model, system_prompt, parallel_tool_calls=parallel_tool_calls)
         
         message = [                   {
                         "type": "text",
@@ -47,11 +67,7 @@ class CallManager:
 
 
 
-            result = roulette_agent.run_sync(message)
-
-            usage = result.usage()
-
-            return {"status_code": 200, "result": result.data, "usage": {"input_tokens": usage.request_tokens, "output_tokens": usage.response_tokens}}
+            result = run_with_limits(roulette_agent, message, budget, llm_model)
         except AttributeError:
             return roulette_agent
         except openai.BadRequestError as e:
@@ -60,15 +76,23 @@ class CallManager:
                 # Try to compress the message prompt
                 try:
                     message[0]["text"] = summarize_message_prompt(message[0]["text"], llm_model)
-                    result = roulette_agent.run_sync(message)
+                    result = run_with_limits(roulette_agent, message, budget, llm_model)
+                except BudgetExhausted as e:
+                    return exhausted_response(budget, plan, e.input_tokens, e.output_tokens)
                 except Exception as e:
                     traceback.print_exc()
                     return {"status_code": 403, "detail": "Error processing request: " + str(e)}
             else:
                 return {"status_code": 403, "detail": "Error processing request: " + str(e)}
+        except BudgetExhausted as e:
+            return exhausted_response(budget, plan, e.input_tokens, e.output_tokens)
 
         usage = result.usage()
 
-        return {"status_code": 200, "result": result.data, "usage": {"input_tokens": usage.request_tokens, "output_tokens": usage.response_tokens}}
+        the_usage = {"input_tokens": usage.request_tokens, "output_tokens": usage.response_tokens, "context": assembly.report}
+        if plan.degraded:
+            the_usage["budget"] = budget.report(plan)
+
+        return {"status_code": 200, "result": result.data, "usage": the_usage}
 
 Call = CallManager()
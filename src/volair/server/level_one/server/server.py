@@ -21,9 +21,12 @@ class GPT4ORequest(BaseModel):
     context: Optional[Any] = None
     llm_model: Optional[Any] = "openai/gpt-4o"
     system_prompt: Optional[Any] = None
+    parallel_tool_calls: Optional[Any] = False
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
 
 
-def run_sync_gpt4o(prompt, response_format, tools, context, llm_model, system_prompt):
+def run_sync_gpt4o(prompt, response_format, tools, context, llm_model, system_prompt, parallel_tool_calls=False, max_tokens=None, max_cost=None):
     # Create a new event loop for this thread
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
@@ -34,7 +37,10 @@ def run_sync_gpt4o(prompt, response_format, tools, context, llm_model, system_pr
             tools=tools,
             context=context,
             llm_model=llm_model,
-            system_prompt=system_prompt
+            system_prompt=system_prompt,
+            parallel_tool_calls=parallel_tool_calls,
+            max_tokens=max_tokens,
+            max_cost=max_cost
         )
     finally:
         loop.close()
@@ -96,7 +102,10 @@ async def call_gpt4o(request: GPT4ORequest):
                 request.tools,
                 context,
                 request.llm_model,
-                request.system_prompt
+                request.system_prompt,
+                request.parallel_tool_calls,
+                request.max_tokens,
+                request.max_cost
             )
 
         if request.response_format != "str" and result["status_code"] == 200:
@@ -1,3 +1,4 @@
+import threading
 import traceback
 import anthropic
 import openai
@@ -11,11 +12,21 @@ from ...storage.configuration import Configuration
 from ..level_utilized.memory import save_temporary_memory, get_temporary_memory
 
 from ..level_utilized.utility import agent_creator, summarize_system_prompt, summarize_message_prompt
+from ..level_utilized.context import assemble_context
+from ..level_utilized.tokens import count_tokens, fits_context_window
+from ..level_utilized.budget import Budget, BudgetExhausted, exhausted_response, run_with_limits
 
 from ...client.tasks.tasks import Task
 from ...client.tasks.task_response import ObjectResponse
 
 from ..level_one.call import Call
+from .reflection import ReflectionEngine
+
+
+class AgentRequestError(Exception):
+    """
+    Carries the error response of a failed agent run out of the reflection run.
+    """
 
 class AgentManager:
     def agent(
@@ -29,20 +40,59 @@ class AgentManager:
         system_prompt: Optional[Any] = None,
         retries: int = 1,
         context_compress: bool = False,
-        memory: bool = False
+        memory: bool = False,
+        parallel_tool_calls: bool = False,
+        reflection: Optional[bool] = None,
+        reflection_judge_model: Optional[str] = None,
+        reflection_best_of: int = 1,
+        reflection_max_tokens: Optional[int] = None,
+        reflection_max_time: Optional[float] = None,
+        reflection_confidence: float = 0.8,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None
     ) -> ResultData:
 
-        
-        roulette_agent = agent_creator(
-            response_format=response_format, 
-            tools=tools, 
-            context=context, 
-            llm_model=llm_model, 
-            system_prompt=system_prompt,
-            context_compress=context_compress
-        )
-
-        roulette_agent.retries = retries
+        # Degrade the call to fit the budget, or do not make it at all
+        budget = Budget(max_tokens, max_cost)
+        assembly = assemble_context(context, llm_model)
+        plan = budget.plan(llm_model, count_tokens(prompt, llm_model) + count_tokens(system_prompt, llm_model), assembly.tokens)
+        if plan.exhausted:
+            return exhausted_response(budget, plan)
+        if plan.llm_model != llm_model or plan.max_context_tokens is not None:
+            # Less of the context fits, keep the items with the highest priority
+            assembly = assemble_context(context, plan.llm_model, plan.max_context_tokens)
+        llm_model = plan.llm_model
+
+        # Compress up front instead of waiting for the provider to reject the request
+        if context_compress and not fits_context_window(llm_model, prompt, system_prompt, assembly.text):
+            if system_prompt is not None:
+                system_prompt = summarize_system_prompt(system_prompt, llm_model)
+            prompt = summarize_message_prompt(prompt, llm_model)
+
+        spent_lock = threading.Lock()
+        spent_tokens = 0
+
+        def create_agent(the_system_prompt, the_context_compress):
+            the_agent = agent_creator(
+                response_format=response_format,
+                tools=tools,
+                context=assembly,
+                llm_model=llm_model,
+                system_prompt=the_system_prompt,
+                context_compress=the_context_compress,
+                parallel_tool_calls=parallel_tool_calls
+            )
+            if isinstance(the_agent, dict):
+                # An error response, e.g. a missing API key
+                raise AgentRequestError(the_agent)
+            the_agent.retries = retries
+            return the_agent
+
+        try:
+            roulette_agent = create_agent(system_prompt, context_compress)
+        except AgentRequestError as e:
+            return e.args[0]
+        creating_thread = threading.get_ident()
         
 
         message_history = None
@@ -70,23 +120,22 @@ class AgentManager:
                     print("Error", e)
 
         
-        feedback = ""
-
-
-        satisfied = False
-        total_request_tokens = 0
-        total_response_tokens = 0
-        total_retries = 0
-        while not satisfied:
-            
-            #adding_feedback
-            message[0]["text"] = message[0]["text"] + "\n\n" + feedback
-
-
-            print("message: ", message)
-
+        def run(the_agent, the_message):
+            nonlocal spent_tokens
+            result = run_with_limits(the_agent, the_message, budget, llm_model, spent_tokens, message_history=message_history)
+            with spent_lock:
+                spent_tokens += (result.usage().request_tokens or 0) + (result.usage().response_tokens or 0)
+            return result
+
+        def generate(text):
+            nonlocal roulette_agent
+            # Best-of-n candidates run in their own threads and event loops, the
+            # model clients of an agent can not be shared between event loops
+            own_agent = threading.get_ident() == creating_thread
+            the_agent = roulette_agent if own_agent else create_agent(system_prompt, context_compress)
+            the_message = [{**message[0], "text": text}, *message[1:]]
             try:
-                result = roulette_agent.run_sync(message, message_history=message_history)
+                return run(the_agent, the_message)
             except (openai.BadRequestError, anthropic.BadRequestError) as e:
                 str_e = str(e)
                 if "400" in str_e and context_compress:
@@ -95,82 +144,62 @@ class AgentManager:
                         compressed_prompt = summarize_system_prompt(system_prompt, llm_model)
                         if compressed_prompt:
                             print("compressed_prompt", compressed_prompt)
-                        message[0]["text"] = summarize_message_prompt(message[0]["text"], llm_model)
-                        if message[0]["text"]:
-                            print("compressed_message", message[0]["text"])
-
-                        roulette_agent = agent_creator(
-                            response_format=response_format,
-                            tools=tools,
-                            context=context,
-                            llm_model=llm_model,
-                            system_prompt=compressed_prompt,
-                            context_compress=False  # Prevent infinite recursion
-                        )
-                        # Also compress the message prompt
-                        
-
-                        print("agent side")
-                        print("len of message", len(message))
-                        print("len of message[0]", len(message[0]["text"]))
-                        print("message", message)
-                        try:
-                            print("len of message_history", len(message_history))
-                        except:
-                            pass
-                        
-                        result = roulette_agent.run_sync(message, message_history=message_history)
-                    except (openai.BadRequestError, anthropic.BadRequestError) as e:
-                        traceback.print_exc()
-                        return {"status_code": 403, "detail": "Error processing Agent request: " + str(e)}
-                else:
-                    return {"status_code": 403, "detail": "Error processing Agent request: " + str(e)}
-                
-
-                
-            total_request_tokens += result.usage().request_tokens
-            total_response_tokens += result.usage().response_tokens
+                        the_message[0]["text"] = summarize_message_prompt(the_message[0]["text"], llm_model)
+                        if the_message[0]["text"]:
+                            print("compressed_message", the_message[0]["text"])
 
+                        # No compression in the new agent, to prevent infinite recursion
+                        the_agent = create_agent(compressed_prompt, False)
+                        if own_agent:
+                            roulette_agent = the_agent
 
-            if retries == 1:
-                satisfied = True
-            elif total_retries >= retries:
-                satisfied = True
-            else:
-                total_retries += 1
-
-                print("Retrying", total_retries)
-
-                try:
-                    class Satisfying(ObjectResponse):
-                        satisfied: bool
-                        feedback: str
-                        
-                    from ...client.level_two.agent import OtherTask
-
-                    other_task = OtherTask(task=prompt, result=result.data)
-
-
-                    satify_result = Call.gpt_4o("Check if the result is satisfied", response_format=Satisfying, context=other_task)
-                    feedback = satify_result["result"].feedback
-      
-
-                    if satify_result["result"].satisfied:
-                        satisfied = True
-                    else:
-                        satisfied = False
+                        return run(the_agent, the_message)
+                    except (openai.BadRequestError, anthropic.BadRequestError) as e:
+                        traceback.print_exc()
+                        raise AgentRequestError({"status_code": 403, "detail": "Error processing Agent request: " + str(e)})
+                raise AgentRequestError({"status_code": 403, "detail": "Error processing Agent request: " + str(e)})
+
+
+        # Without an explicit setting, reflect whenever retries are allowed as before
+        if reflection is None:
+            reflection = retries != 1
+
+        # The reflection stays within the budget of the whole request
+        token_limits = [limit for limit in (reflection_max_tokens, max_tokens) if limit is not None]
+
+        engine = ReflectionEngine(
+            generate,
+            llm_model=llm_model,
+            judge_model=reflection_judge_model,
+            # Up to `retries` reruns after the first answer
+            max_iterations=retries + 1 if reflection else 1,
+            best_of=reflection_best_of if reflection else 1,
+            max_tokens=min(token_limits) if token_limits else None,
+            max_time=reflection_max_time,
+            confidence=reflection_confidence,
+        )
 
-                    
-                except Exception as e:
-                    traceback.print_exc()
+        try:
+            reflection_run = engine.run(message[0]["text"])
+        except AgentRequestError as e:
+            return e.args[0]
+        except BudgetExhausted as e:
+            return exhausted_response(budget, plan, e.input_tokens, e.output_tokens)
 
-            
-        usage = result.usage()
+        result = reflection_run["result"]
+        total_request_tokens = reflection_run["input_tokens"]
+        total_response_tokens = reflection_run["output_tokens"]
 
         if memory:
             save_temporary_memory(result.all_messages(), agent_id)
 
-        return {"status_code": 200, "result": result.data, "usage": {"input_tokens": total_request_tokens, "output_tokens": total_response_tokens}}
+        usage = {"input_tokens": total_request_tokens, "output_tokens": total_response_tokens, "context": assembly.report}
+        if reflection:
+            usage["reflection"] = reflection_run["reflection"]
+        if plan.degraded:
+            usage["budget"] = budget.report(plan)
+
+        return {"status_code": 200, "result": result.data, "usage": usage}
 
 
 Agent = AgentManager()
\ No newline at end of file
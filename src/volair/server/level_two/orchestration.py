@@ -0,0 +1,218 @@
+"""
+Server-side agent orchestration.
+
+ServerAgent runs the shared agent flow (characterization, knowledge base,
+sub-task planning, routing of the sub-tasks) inside the server process. Its
+model calls go straight to the level one and level two managers instead of
+making a round trip to the server each, and every step is reported to an
+emit callback so the /level_two/agent_run endpoint can stream the progress.
+Once the run is cancelled, e.g. because the client went away, the next step
+raises AgentRunCancelled instead of calling a model.
+"""
+
+import base64
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import pydantic_ai
+
+from ...orchestration.budget import RunBudget
+from ...orchestration.context import prepare_context, tools_serializer
+from ...orchestration.flow import AgentFlow
+from ..level_one.server.server import run_sync_gpt4o
+
+
+# Status codes of a failed model call, the client raises its exception for each
+ERROR_STATUS_CODES = (400, 401, 402, 403, 500)
+
+
+class AgentRunError(Exception):
+    """
+    A model call of the run failed, args[0] is its status_code and detail.
+    """
+
+
+class AgentRunCancelled(Exception):
+    pass
+
+
+def _check_result(result: Dict[str, Any]) -> None:
+    if result.get("status_code") in ERROR_STATUS_CODES:
+        raise AgentRunError(result)
+
+
+def error_event(error: Exception) -> Dict[str, Any]:
+    """
+    Returns the error event of an exception, with the status code the client
+    error handler raises the matching exception for.
+    """
+    if isinstance(error, pydantic_ai.exceptions.UnexpectedModelBehavior):
+        return {"event": "error", "status_code": 500, "detail": "Change your response format to a simple format or improve your task description. Your response format is too hard for the model to understand. Try to make it more small parts."}
+    if isinstance(error, AgentRunError):
+        return {"event": "error", "status_code": error.args[0].get("status_code", 500), "detail": error.args[0].get("detail", "")}
+    return {"event": "error", "status_code": 500, "detail": f"Error processing Agent request: {str(error)}"}
+
+
+def _response_format_name(response_format: Any) -> str:
+    return "str" if response_format is None else response_format.__name__
+
+
+class ServerAgent(AgentFlow):
+    """
+    The agent flow with in-process model calls.
+
+    Args:
+        default_llm_model: The model used when a call does not name one.
+        files: The base64 encoded content of the local knowledge base files
+            of the client, by the path the client knows them under.
+        emit: Called with every progress event.
+        cancelled: Optional event that stops the run when it is set.
+    """
+
+    def __init__(self, default_llm_model: str = "openai/gpt-4o", files: Optional[Dict[str, str]] = None, emit: Optional[Callable[[Dict[str, Any]], None]] = None, cancelled: Optional[threading.Event] = None):
+        self.default_llm_model = default_llm_model
+        self.files = files or {}
+        self._emit = emit or (lambda event: None)
+        self.cancelled = cancelled or threading.Event()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise AgentRunCancelled("The agent run was cancelled")
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        self.check_cancelled()
+        self._emit(event)
+
+    def call(self, task, llm_model: str = None) -> Any:
+        for each in task if isinstance(task, list) else [task]:
+            self.call_(each, llm_model)
+        return True
+
+    def call_(self, task, llm_model: str = None) -> Dict[str, Any]:
+        if llm_model is None:
+            llm_model = self.default_llm_model
+
+        self.check_cancelled()
+        result = run_sync_gpt4o(
+            task.description,
+            task.response_format or str,
+            tools_serializer(task.tools),
+            prepare_context(task.context, self),
+            llm_model,
+            None,
+            bool(task.parallel_tool_calls),
+            task.max_tokens,
+            task.max_cost,
+        )
+        _check_result(result)
+
+        task._response = result["result"]
+        task._usage = result["usage"]
+        return {"result": result["result"], "llm_model": llm_model, "response_format": _response_format_name(task.response_format), "usage": result["usage"], "status": result.get("status", "completed")}
+
+    def agent_(self, agent_configuration, task, llm_model: str = None, budget: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        results = []
+        for each in task if isinstance(task, list) else [task]:
+            start_time = time.time()
+            self.emit({"event": "task_started", "task": each.description})
+
+            the_result = self.send_agent_request(agent_configuration, each, llm_model, budget)
+            the_result["time"] = time.time() - start_time
+            results.append(the_result)
+
+            self.emit({
+                "event": "task_finished",
+                "task": each.description,
+                "result": str(the_result["result"]),
+                "llm_model": the_result["llm_model"],
+                "response_format": the_result["response_format"],
+                "usage": the_result["usage"],
+                "tool_count": the_result["tool_count"],
+                "context_count": the_result["context_count"],
+                "time": the_result["time"],
+                "status": the_result["status"],
+            })
+        return results
+
+    def send_agent_request(self, agent_configuration, task, llm_model: str = None, budget: Dict[str, Any] = None) -> Dict[str, Any]:
+        from .server.server import run_sync_agent
+
+        if llm_model is None:
+            llm_model = self.default_llm_model
+
+        tools = tools_serializer(task.tools)
+        retry_count = 0
+        while True:
+            self.check_cancelled()
+            result = run_sync_agent(
+                agent_configuration.agent_id,
+                task.description,
+                task.response_format or str,
+                tools,
+                prepare_context(task.context, self),
+                llm_model,
+                None,
+                agent_configuration.retries,
+                agent_configuration.context_compress,
+                agent_configuration.memory,
+                # The task setting wins over the agent default
+                task.parallel_tool_calls if task.parallel_tool_calls is not None else agent_configuration.parallel_tool_calls,
+                **agent_configuration.reflection_settings(),
+                max_tokens=budget["max_tokens"] if budget else None,
+                max_cost=budget["max_cost"] if budget else None,
+            )
+            if result.get("status_code") != 500:
+                _check_result(result)
+                break
+            retry_count += 1
+            if retry_count > agent_configuration.retries:
+                raise AgentRunError(result)
+
+        task._response = result["result"]
+        context_count = len(task.context) if task.context is not None else 0
+        return {"result": result["result"], "llm_model": llm_model, "response_format": _response_format_name(task.response_format), "usage": result["usage"], "tool_count": len(tools), "context_count": context_count, "status": result.get("status", "completed")}
+
+    def markdown(self, file_path: str) -> str:
+        """
+        Converts a knowledge base source to markdown, a file sent with the
+        request or a URL.
+        """
+        from ..markdown.server.server import convert_to_markdown
+
+        directory = tempfile.mkdtemp(prefix="volair_agent_run_")
+        try:
+            if file_path in self.files:
+                filename = os.path.basename(file_path)
+                content = base64.b64decode(self.files[file_path])
+            elif file_path.startswith("http"):
+                response = httpx.get(file_path)
+                response.raise_for_status()
+                filename = "page.html"
+                content = response.content
+            else:
+                raise FileNotFoundError(f"File not found: {file_path}")
+
+            path = os.path.join(directory, filename)
+            with open(path, "wb") as file:
+                file.write(content)
+            return convert_to_markdown(path, filename)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def prepare_agent(self, agent_configuration, task, llm_model: str = None, budget: RunBudget = None):
+        preparation = super().prepare_agent(agent_configuration, task, llm_model, budget)
+        self.emit({"event": "preparation", "timings": preparation.timings, "total_time": preparation.total_time})
+
+        if preparation.results.get("sub_tasks"):
+            sub_tasks, dependencies = preparation.results["sub_tasks"]
+            self.emit({
+                "event": "sub_tasks",
+                "sub_tasks": [each.description for each in sub_tasks],
+                "dependencies": {str(index): dependency for index, dependency in dependencies.items()},
+            })
+        return preparation
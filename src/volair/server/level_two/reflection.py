@@ -0,0 +1,250 @@
+"""
+Reflection for agent runs.
+
+The agent answers, a judge model checks the answer and the agent tries again
+with the judge's feedback, until the judge passes an answer with enough
+confidence, the iterations run out or the next iteration would not fit in the
+token or time budget of the run. An answer cut off by the token budget ends
+the run with the best answer so far. With best_of above 1 every iteration
+generates that many candidates at the same time and the judge scores all of
+them in one call. The judge defaults to VOLAIR_REFLECTION_JUDGE_MODEL, or the
+agent's model if it is not set.
+"""
+
+import asyncio
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from ...orchestration.flow import OtherTask
+from ...client.price import estimate_cost
+from ...client.tasks.task_response import ObjectResponse
+from ..level_utilized.budget import BudgetExhausted
+
+
+JUDGE_MODEL = os.getenv("VOLAIR_REFLECTION_JUDGE_MODEL")
+
+
+class Judgement(ObjectResponse):
+    candidate_number: int
+    score: float
+    satisfied: bool
+    feedback: str
+
+
+class Judgements(ObjectResponse):
+    judgements: List[Judgement]
+
+
+def _in_new_event_loop(function: Callable[[], Any]) -> Any:
+    # pydantic_ai's run_sync needs an event loop in the calling thread
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return function()
+    finally:
+        loop.close()
+
+
+class ReflectionEngine:
+    """
+    Runs an agent with reflection.
+
+    Args:
+        generate: Runs the agent on a prompt and returns its pydantic_ai result.
+        llm_model: The model of the agent, for the cost estimates.
+        judge_model: The model that checks the answers, see JUDGE_MODEL.
+        max_iterations: Agent runs at most, 1 runs the agent once without a judge.
+        best_of: Candidates generated at the same time in every iteration.
+        max_tokens: Token budget of the run, agent and judge tokens together.
+        max_time: Wall-clock budget of the run in seconds.
+        confidence: Judge score an answer needs to end the run early.
+        judge: Optional replacement of the judge call, called like Call.gpt_4o.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Any],
+        llm_model: str = "openai/gpt-4o",
+        judge_model: Optional[str] = None,
+        max_iterations: int = 1,
+        best_of: int = 1,
+        max_tokens: Optional[int] = None,
+        max_time: Optional[float] = None,
+        confidence: float = 0.8,
+        judge: Optional[Callable[..., Dict[str, Any]]] = None,
+    ):
+        self.generate = generate
+        self.llm_model = llm_model
+        self.judge_model = judge_model or JUDGE_MODEL or llm_model
+        self.max_iterations = max(1, max_iterations)
+        self.best_of = max(1, best_of)
+        self.max_tokens = max_tokens
+        self.max_time = max_time
+        self.confidence = confidence
+        if judge is None:
+            from ..level_one.call import Call
+            judge = Call.gpt_4o
+        self.judge = judge
+
+    def _candidates(self, text: str) -> List[Any]:
+        if self.best_of == 1:
+            return [self.generate(text)]
+        with ThreadPoolExecutor(max_workers=self.best_of) as pool:
+            futures = [pool.submit(_in_new_event_loop, lambda: self.generate(text)) for _ in range(self.best_of)]
+            return [future.result() for future in futures]
+
+    def _judge(self, prompt: str, candidates: List[Any]) -> Optional[Dict[str, Any]]:
+        """
+        Scores the candidates in one call. Returns the call result, or None if it failed.
+        """
+        context = [OtherTask(task=f"Candidate {number}", result=candidate.data) for number, candidate in enumerate(candidates, start=1)]
+        judge_prompt = (
+            "Check if the candidate answers satisfy the task. Return one judgement per candidate with its number, "
+            "a score from 0 to 1 of how well it satisfies the task, whether it is satisfying and feedback on what "
+            f"to improve. The task is: {prompt}"
+        )
+        try:
+            result = self.judge(judge_prompt, response_format=Judgements, context=context, llm_model=self.judge_model)
+        except Exception:
+            traceback.print_exc()
+            return None
+        if not isinstance(result, dict) or result.get("status_code") != 200:
+            return None
+        return result
+
+    def _exceeded_budget(self, used_tokens: int, elapsed: float, last_iteration: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the budget another iteration like the last one would exceed, or None.
+        """
+        if self.max_tokens is not None:
+            last_tokens = last_iteration["input_tokens"] + last_iteration["output_tokens"] + last_iteration["judge_input_tokens"] + last_iteration["judge_output_tokens"]
+            if used_tokens + last_tokens > self.max_tokens:
+                return "token_budget"
+        if self.max_time is not None and elapsed + last_iteration["time"] > self.max_time:
+            return "time_budget"
+        return None
+
+    def run(self, prompt: str) -> Dict[str, Any]:
+        """
+        Runs the agent on the prompt until an answer passes or a limit is reached.
+
+        Returns:
+            The chosen pydantic_ai result under "result", the total token usage
+            of the agent and the judge, and the reflection report: the usage,
+            cost, latency and score of every iteration and why it stopped.
+        """
+        start_time = time.time()
+        iterations: List[Dict[str, Any]] = []
+        best = None
+        best_score = None
+        feedback = ""
+        stop_reason = "max_iterations"
+        used_tokens = 0
+
+        for iteration in range(1, self.max_iterations + 1):
+            iteration_start = time.time()
+            # Only the latest feedback, so the prompt does not grow with every iteration
+            text = prompt if not feedback else f"{prompt}\n\nFeedback on your previous answer: {feedback}"
+            try:
+                candidates = self._candidates(text)
+            except BudgetExhausted as e:
+                if best is None:
+                    raise BudgetExhausted(
+                        e.input_tokens + sum(each["input_tokens"] + each["judge_input_tokens"] for each in iterations),
+                        e.output_tokens + sum(each["output_tokens"] + each["judge_output_tokens"] for each in iterations),
+                    )
+                # Keep the best answer so far, the spent tokens still count
+                iterations.append({
+                    "iteration": iteration,
+                    "candidates": 0,
+                    "input_tokens": e.input_tokens,
+                    "output_tokens": e.output_tokens,
+                    "judge_input_tokens": 0,
+                    "judge_output_tokens": 0,
+                    "score": None,
+                    "satisfied": None,
+                    "time": time.time() - iteration_start,
+                    "estimated_cost": estimate_cost(e.input_tokens, e.output_tokens, self.llm_model),
+                })
+                stop_reason = "token_budget"
+                break
+
+            report = {
+                "iteration": iteration,
+                "candidates": len(candidates),
+                "input_tokens": sum(candidate.usage().request_tokens or 0 for candidate in candidates),
+                "output_tokens": sum(candidate.usage().response_tokens or 0 for candidate in candidates),
+                "judge_input_tokens": 0,
+                "judge_output_tokens": 0,
+                "score": None,
+                "satisfied": None,
+            }
+            used_tokens += report["input_tokens"] + report["output_tokens"]
+
+            # The judge is only needed to pick a candidate or to decide on another iteration
+            last_iteration = iteration == self.max_iterations
+            if not last_iteration:
+                report["time"] = time.time() - iteration_start
+                exceeded = self._exceeded_budget(used_tokens, time.time() - start_time, report)
+                last_iteration = exceeded is not None
+                if exceeded:
+                    stop_reason = exceeded
+
+            chosen = candidates[0]
+            judgement = None
+            if not last_iteration or len(candidates) > 1:
+                judged = self._judge(prompt, candidates)
+                if judged is None:
+                    stop_reason = "judge_failed"
+                    last_iteration = True
+                else:
+                    report["judge_input_tokens"] = judged["usage"]["input_tokens"] or 0
+                    report["judge_output_tokens"] = judged["usage"]["output_tokens"] or 0
+                    used_tokens += report["judge_input_tokens"] + report["judge_output_tokens"]
+
+                    scored = [each for each in judged["result"].judgements if 1 <= each.candidate_number <= len(candidates)]
+                    if scored:
+                        judgement = max(scored, key=lambda each: each.score)
+                        chosen = candidates[judgement.candidate_number - 1]
+                        report["score"] = judgement.score
+                        report["satisfied"] = judgement.satisfied
+
+            report["time"] = time.time() - iteration_start
+            generation_cost = estimate_cost(report["input_tokens"], report["output_tokens"], self.llm_model)
+            judge_cost = estimate_cost(report["judge_input_tokens"], report["judge_output_tokens"], self.judge_model)
+            report["estimated_cost"] = None if generation_cost is None or judge_cost is None else generation_cost + judge_cost
+            iterations.append(report)
+
+            if judgement is None:
+                # Not judged, the latest answer was made with all the feedback so far
+                best, best_score = chosen, None
+            elif best_score is None or judgement.score > best_score:
+                best, best_score = chosen, judgement.score
+
+            if judgement is not None and judgement.satisfied and judgement.score >= self.confidence:
+                stop_reason = "passed"
+                break
+            if last_iteration:
+                break
+
+            feedback = judgement.feedback if judgement is not None else ""
+
+            exceeded = self._exceeded_budget(used_tokens, time.time() - start_time, report)
+            if exceeded:
+                stop_reason = exceeded
+                break
+
+        return {
+            "result": best,
+            "input_tokens": sum(each["input_tokens"] + each["judge_input_tokens"] for each in iterations),
+            "output_tokens": sum(each["output_tokens"] + each["judge_output_tokens"] for each in iterations),
+            "reflection": {
+                "judge_model": self.judge_model,
+                "stop_reason": stop_reason,
+                "time": time.time() - start_time,
+                "iterations": iterations,
+            },
+        }
@@ -1,4 +1,5 @@
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional, Union
 import traceback
@@ -7,10 +8,13 @@ import pydantic_ai
 from ...api import app, timeout
 from ..agent import Agent
 import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import cloudpickle
 cloudpickle.DEFAULT_PROTOCOL = 2
 import base64
+import json
 
 
 prefix = "/level_two"
@@ -27,8 +31,24 @@ class AgentRequest(BaseModel):
     retries: Optional[Any] = 1
     context_compress: Optional[Any] = False
     memory: Optional[Any] = False
+    parallel_tool_calls: Optional[Any] = False
+    reflection: Optional[Any] = None
+    reflection_judge_model: Optional[Any] = None
+    reflection_best_of: Optional[Any] = 1
+    reflection_max_tokens: Optional[Any] = None
+    reflection_max_time: Optional[Any] = None
+    reflection_confidence: Optional[Any] = 0.8
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+
+class AgentRunRequest(BaseModel):
+    agent_configuration: str
+    task: str
+    llm_model: Optional[Any] = "openai/gpt-4o"
+    files: Optional[Dict[str, str]] = {}
+
 
-def run_sync_agent(agent_id, prompt, response_format, tools, context, llm_model, system_prompt, retries, context_compress, memory):
+def run_sync_agent(agent_id, prompt, response_format, tools, context, llm_model, system_prompt, retries, context_compress, memory, parallel_tool_calls=False, **options):
     # Create a new event loop for this thread
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
@@ -43,7 +63,9 @@ def run_sync_agent(agent_id, prompt, response_format, tools, context, llm_model,
             system_prompt=system_prompt,
             retries=retries,
             context_compress=context_compress,
-            memory=memory
+            memory=memory,
+            parallel_tool_calls=parallel_tool_calls,
+            **options
         )
     finally:
         loop.close()
@@ -94,11 +116,13 @@ async def call_agent(request: AgentRequest):
 
 
 
+        options = request.model_dump(include={"reflection", "reflection_judge_model", "reflection_best_of", "reflection_max_tokens", "reflection_max_time", "reflection_confidence", "max_tokens", "max_cost"})
+
         loop = asyncio.get_running_loop()
         with ThreadPoolExecutor() as pool:
             result = await loop.run_in_executor(
                 pool,
-                run_sync_agent,
+                partial(run_sync_agent, **options),
                 request.agent_id,
                 request.prompt,
                 response_format,
@@ -108,7 +132,8 @@ async def call_agent(request: AgentRequest):
                 request.system_prompt,
                 request.retries,
                 request.context_compress,   
-                request.memory
+                request.memory,
+                request.parallel_tool_calls
             )
 
         if request.response_format != "str" and result["status_code"] == 200:
@@ -126,3 +151,64 @@ async def call_agent(request: AgentRequest):
 
 
         return {"result": {"status_code": 500, "detail": f"Error processing Agent request: {str(e)}"}, "status_code": 500}
+
+
+
+def run_agent_run(request: AgentRunRequest, emit, cancelled: threading.Event = None):
+    from ..orchestration import AgentRunCancelled, ServerAgent, error_event
+
+    try:
+        agent_configuration = cloudpickle.loads(base64.b64decode(request.agent_configuration))
+        task = cloudpickle.loads(base64.b64decode(request.task))
+
+        server_agent = ServerAgent(default_llm_model=request.llm_model, files=request.files, emit=emit, cancelled=cancelled)
+        usage = server_agent.agent(agent_configuration, task, request.llm_model)
+
+        result = base64.b64encode(cloudpickle.dumps(task._response)).decode('utf-8')
+        server_agent.emit({"event": "result", "result": result, "usage": usage})
+    except AgentRunCancelled:
+        # Nobody is listening anymore
+        pass
+    except Exception as e:
+        traceback.print_exc()
+        emit(error_event(e))
+
+
+@app.post(f"{prefix}/agent_run")
+async def agent_run(request: AgentRunRequest):
+    """
+    Endpoint to run a whole agent task on the server.
+
+    The characterization, knowledge base, sub-task planning and sub-task calls
+    run here, the client only receives the progress as newline delimited JSON
+    events, ending with a "result" or "error" event.
+
+    Args:
+        request: AgentRunRequest with the pickled agent configuration and task
+
+    Returns:
+        A stream of progress events
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    run = loop.run_in_executor(None, run_agent_run, request, emit, cancelled)
+    # Scheduled after the events emitted by the run
+    run.add_done_callback(lambda _: events.put_nowait(None))
+
+    async def stream():
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield json.dumps(event, default=str) + "\n"
+        finally:
+            # The client went away or the run ended, stop before the next model call
+            cancelled.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,161 @@
+"""
+Token and cost budgets of model calls.
+
+Before a call its size is estimated from the prompt and the context. A call
+that would not fit in the budget is degraded first: the cheaper model of the
+same provider, then a context cut to what still fits. If even that does not
+fit, the call is not made and the caller returns a budget_exhausted response.
+During the call pydantic_ai checks the token limit after every model response,
+so tool loops stop once the budget is spent.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from pydantic_ai.usage import Usage, UsageLimits
+
+from ...client.price import estimate_cost, pricing_data
+
+
+# Output tokens assumed for a call before it is made
+ESTIMATED_OUTPUT_TOKENS = int(os.getenv("VOLAIR_ESTIMATED_OUTPUT_TOKENS", "1000"))
+
+# The model a call falls back to when it does not fit the budget
+CHEAPER_MODELS = {
+    "openai/gpt-4o": "openai/gpt-4o-mini",
+    "gpt-4o": "openai/gpt-4o-mini",
+}
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised when a call used up the budget before it finished.
+
+    Args:
+        input_tokens: Tokens used before it stopped.
+        output_tokens: Tokens used before it stopped.
+    """
+
+    def __init__(self, input_tokens: int = 0, output_tokens: int = 0):
+        super().__init__("The token budget is exhausted")
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class CallPlan:
+    def __init__(self, llm_model: str, max_context_tokens: Optional[int] = None, exhausted: bool = False, degraded: Optional[List[str]] = None):
+        self.llm_model = llm_model
+        self.max_context_tokens = max_context_tokens
+        self.exhausted = exhausted
+        self.degraded = degraded or []
+
+
+class Budget:
+    """
+    The budget of one request.
+
+    Args:
+        max_tokens: Input and output tokens at most, no limit if None.
+        max_cost: Dollars at most, no limit if None. Only enforced for models
+            with a known price.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+
+    @property
+    def limited(self) -> bool:
+        return self.max_tokens is not None or self.max_cost is not None
+
+    def fits(self, input_tokens: int, output_tokens: int, llm_model: str) -> bool:
+        if self.max_tokens is not None and input_tokens + output_tokens > self.max_tokens:
+            return False
+        cost = estimate_cost(input_tokens, output_tokens, llm_model)
+        if self.max_cost is not None and cost is not None and cost > self.max_cost:
+            return False
+        return True
+
+    def _context_room(self, prompt_tokens: int, llm_model: str) -> int:
+        """
+        Returns the context tokens that fit next to the prompt and the expected output.
+        """
+        room = None
+        if self.max_tokens is not None:
+            room = self.max_tokens - prompt_tokens - ESTIMATED_OUTPUT_TOKENS
+        if self.max_cost is not None and llm_model in pricing_data:
+            left = self.max_cost - estimate_cost(prompt_tokens, ESTIMATED_OUTPUT_TOKENS, llm_model)
+            cost_room = int(left / pricing_data[llm_model]["input"])
+            room = cost_room if room is None else min(room, cost_room)
+        return room
+
+    def plan(self, llm_model: str, prompt_tokens: int, context_tokens: int) -> CallPlan:
+        """
+        Returns the model and context size of a call that fits the budget.
+        """
+        if not self.limited or self.fits(prompt_tokens + context_tokens, ESTIMATED_OUTPUT_TOKENS, llm_model):
+            return CallPlan(llm_model)
+
+        degraded = []
+        cheaper = CHEAPER_MODELS.get(llm_model)
+        if cheaper is not None:
+            llm_model = cheaper
+            degraded.append(f"model:{cheaper}")
+            if self.fits(prompt_tokens + context_tokens, ESTIMATED_OUTPUT_TOKENS, llm_model):
+                return CallPlan(llm_model, degraded=degraded)
+
+        room = self._context_room(prompt_tokens, llm_model)
+        if room is None or room <= 0:
+            return CallPlan(llm_model, exhausted=True, degraded=degraded)
+
+        degraded.append(f"context:{room}")
+        return CallPlan(llm_model, max_context_tokens=room, degraded=degraded)
+
+    def usage_limits(self, llm_model: str, spent_tokens: int = 0) -> Optional[UsageLimits]:
+        """
+        Returns the pydantic_ai limits of a call. A cost budget is turned into
+        tokens at the input price, most tokens of an agent run are input.
+        """
+        limits = []
+        if self.max_tokens is not None:
+            limits.append(self.max_tokens - spent_tokens)
+        if self.max_cost is not None and llm_model in pricing_data:
+            limits.append(int(self.max_cost / pricing_data[llm_model]["input"]) - spent_tokens)
+        if not limits:
+            return None
+        return UsageLimits(total_tokens_limit=max(min(limits), 0))
+
+    def report(self, plan: CallPlan) -> Dict[str, Any]:
+        return {"max_tokens": self.max_tokens, "max_cost": self.max_cost, "llm_model": plan.llm_model, "degraded": plan.degraded}
+
+
+def exhausted_response(budget: Budget, plan: CallPlan, input_tokens: int = 0, output_tokens: int = 0) -> Dict[str, Any]:
+    """
+    Returns the response of a call that was stopped by its budget.
+    """
+    return {
+        "status_code": 200,
+        "status": "budget_exhausted",
+        "result": None,
+        "detail": "The call does not fit in the token or cost budget.",
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens, "budget": budget.report(plan)},
+    }
+
+
+def run_with_limits(the_agent: Any, message: Any, budget: Budget, llm_model: str, spent_tokens: int = 0, **kwargs) -> Any:
+    """
+    Runs a pydantic_ai agent within the budget.
+
+    Raises:
+        BudgetExhausted: With the tokens used, if the budget ran out during the run.
+    """
+    from pydantic_ai.exceptions import UsageLimitExceeded
+
+    if not budget.limited:
+        return the_agent.run_sync(message, **kwargs)
+
+    usage = Usage()
+    try:
+        return the_agent.run_sync(message, usage_limits=budget.usage_limits(llm_model, spent_tokens), usage=usage, **kwargs)
+    except UsageLimitExceeded:
+        raise BudgetExhausted(usage.request_tokens or 0, usage.response_tokens or 0)
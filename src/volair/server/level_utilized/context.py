@@ -0,0 +1,158 @@
+"""
+Token-aware assembly of the context of a model call.
+
+Context items are serialized as minified JSON instead of Python reprs and
+sorted into categories by priority: the inputs of the current task, the
+results of earlier tasks (most recent first), the characterization of the
+agent and the knowledge base. Items are added in that order until the
+context budget of the model is spent, the item that does not fit anymore is
+truncated and the rest is left out. The report tells how many tokens every
+category used.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .tokens import context_window, count_tokens, truncate_to_tokens
+
+
+# Part of the context window the context may fill, the rest is left for the
+# prompt, the tool calls and the answer
+CONTEXT_SHARE = float(os.getenv("VOLAIR_CONTEXT_SHARE", "0.5"))
+
+# An item is only truncated if at least this much of it fits
+MIN_ITEM_TOKENS = 50
+
+TRUNCATED = " …[truncated]"
+
+# In priority order
+CATEGORIES = ("task_inputs", "results", "characterization", "knowledge_base")
+TITLES = {
+    "task_inputs": "Inputs of the task",
+    "results": "Results of earlier tasks",
+    "characterization": "This is your character",
+    "knowledge_base": "Knowledge base",
+}
+
+
+def context_budget(llm_model: str) -> int:
+    """
+    Returns the tokens the context of a call to the model may use.
+    """
+    return int(context_window(llm_model) * CONTEXT_SHARE)
+
+
+def compact(value: Any) -> str:
+    """
+    Returns a compact text form of a value, minified JSON where possible.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        # A response format, describe the fields it needs
+        return json.dumps(value.model_json_schema(), separators=(",", ":"), ensure_ascii=False)
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json", exclude_none=True)
+    try:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _flatten(context: Any) -> List[Any]:
+    if context is None:
+        return []
+    if not isinstance(context, list):
+        return [context]
+    items = []
+    for each in context:
+        items += _flatten(each)
+    return items
+
+
+def _classify(context: Any) -> Dict[str, List[str]]:
+    from ...orchestration.flow import Characterization, OtherTask
+    from ...client.tasks.tasks import Task
+    from ...client.knowledge_base.knowledge_base import KnowledgeBaseMarkdown
+
+    items: Dict[str, List[str]] = {category: [] for category in CATEGORIES}
+    for each in _flatten(context):
+        type_string = type(each).__name__
+
+        # Compared by name, the classes may come from pickles of another copy of the package
+        if type_string == Characterization.__name__:
+            items["characterization"].append(compact(each))
+        elif type_string == OtherTask.__name__:
+            items["results"].append(f"{each.task}: {compact(each.result)}")
+        elif type_string == Task.__name__:
+            items["results"].append(f"{each.description}: {compact(each.response)}")
+        elif type_string == KnowledgeBaseMarkdown.__name__:
+            items["knowledge_base"] += [f"{source}:\n{markdown}" for source, markdown in each.knowledges.items()]
+        else:
+            items["task_inputs"].append(compact(each))
+
+    # The latest results are the most relevant
+    items["results"].reverse()
+    return items
+
+
+class ContextAssembly:
+    def __init__(self, text: str, report: Dict[str, Any]):
+        self.text = text
+        self.report = report
+
+    @property
+    def tokens(self) -> int:
+        return self.report["tokens"]
+
+
+def assemble_context(context: Any, llm_model: str, max_tokens: Optional[int] = None) -> ContextAssembly:
+    """
+    Builds the context text of a call within the context budget of the model.
+
+    Args:
+        context: A context item or a list of them.
+        llm_model: The model of the call.
+        max_tokens: A lower limit than the budget of the model, e.g. from the
+            token budget of the call.
+
+    Returns:
+        The text and the report: the budget, the total tokens and per category
+        the tokens, the items added, the items truncated and the items left out.
+    """
+    budget = context_budget(llm_model)
+    if max_tokens is not None:
+        budget = min(budget, max(max_tokens, 0))
+
+    items = _classify(context)
+    remaining = budget
+    sections: List[Tuple[str, List[str]]] = []
+    categories: Dict[str, Dict[str, int]] = {}
+
+    for category in CATEGORIES:
+        stats = {"items": 0, "tokens": 0, "truncated": 0, "dropped": 0}
+        kept = []
+        for text in items[category]:
+            tokens = count_tokens(text, llm_model)
+            if tokens > remaining:
+                if remaining < MIN_ITEM_TOKENS:
+                    stats["dropped"] += 1
+                    continue
+                text = truncate_to_tokens(text, remaining - count_tokens(TRUNCATED, llm_model) - 1, llm_model) + TRUNCATED
+                tokens = count_tokens(text, llm_model)
+                stats["truncated"] += 1
+            kept.append(text)
+            remaining -= tokens
+            stats["items"] += 1
+            stats["tokens"] += tokens
+        if kept:
+            sections.append((category, kept))
+        if items[category]:
+            categories[category] = stats
+
+    text = "\n\n".join(f"## {TITLES[category]}\n" + "\n".join(kept) for category, kept in sections)
+    report = {"budget": budget, "tokens": budget - remaining, "categories": categories}
+    return ContextAssembly(text, report)
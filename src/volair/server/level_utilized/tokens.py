@@ -0,0 +1,132 @@
+"""
+Local token counting per model family.
+
+OpenAI models are counted with tiktoken when it is installed (the `tokens`
+extra). The other providers have no local tokenizer, and neither does OpenAI
+without tiktoken, so their tokens are estimated from the characters per token
+of the family. The estimates lean high so a call that is counted as fitting
+is not rejected by the provider.
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, List, Optional
+
+
+# Context windows in tokens of the supported models
+CONTEXT_WINDOWS = {
+    "openai/gpt-4o": 128000,
+    "gpt-4o": 128000,
+    "openai/gpt-4o-mini": 128000,
+    "gpt-4o-mini": 128000,
+    "azure/gpt-4o": 128000,
+    "gpt-4o-azure": 128000,
+    "claude/claude-3-5-sonnet": 200000,
+    "claude-3-5-sonnet": 200000,
+    "bedrock/claude-3-5-sonnet": 200000,
+    "claude-3-5-sonnet-aws": 200000,
+    "deepseek/deepseek-chat": 64000,
+}
+DEFAULT_CONTEXT_WINDOW = 64000
+
+# Characters per token of the families without a local tokenizer, set below
+# the averages (about 4 for OpenAI, 3.5 for the others) so estimates lean high
+CHARACTERS_PER_TOKEN = {
+    "openai": 3.0,
+    "claude": 3.0,
+    "deepseek": 3.0,
+}
+DEFAULT_CHARACTERS_PER_TOKEN = 3.0
+
+# Tokens kept free in the window for the answer and the tool calls
+RESPONSE_RESERVE = 4096
+
+TIKTOKEN_ENCODING = "o200k_base"
+
+
+def model_family(llm_model: Optional[str]) -> str:
+    """
+    Returns the family of a model: openai, claude, deepseek or unknown.
+    """
+    name = str(llm_model or "").lower()
+    if "gpt" in name:
+        return "openai"
+    if "claude" in name:
+        return "claude"
+    if "deepseek" in name:
+        return "deepseek"
+    return "unknown"
+
+
+def context_window(llm_model: Optional[str]) -> int:
+    return CONTEXT_WINDOWS.get(llm_model, DEFAULT_CONTEXT_WINDOW)
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception:
+        # The encoding is downloaded on first use, e.g. not possible offline
+        return None
+
+
+def _tokenizer(llm_model: Optional[str]) -> Any:
+    if model_family(llm_model) != "openai":
+        return None
+    return _encoding()
+
+
+def _characters_per_token(llm_model: Optional[str]) -> float:
+    return CHARACTERS_PER_TOKEN.get(model_family(llm_model), DEFAULT_CHARACTERS_PER_TOKEN)
+
+
+def count_tokens(text: Any, llm_model: Optional[str] = None) -> int:
+    """
+    Returns the tokens of a text for the model.
+    """
+    if not text:
+        return 0
+    text = str(text)
+    tokenizer = _tokenizer(llm_model)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / _characters_per_token(llm_model))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, llm_model: Optional[str] = None) -> str:
+    """
+    Returns the start of the text that has at most max_tokens tokens.
+    """
+    if max_tokens <= 0:
+        return ""
+    tokenizer = _tokenizer(llm_model)
+    if tokenizer is not None:
+        tokens = tokenizer.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else tokenizer.decode(tokens[:max_tokens])
+    return text[:int(max_tokens * _characters_per_token(llm_model))]
+
+
+def split_by_tokens(text: str, chunk_tokens: int, llm_model: Optional[str] = None) -> List[str]:
+    """
+    Splits a text into chunks of at most chunk_tokens tokens.
+    """
+    chunk_tokens = max(chunk_tokens, 1)
+    tokenizer = _tokenizer(llm_model)
+    if tokenizer is not None:
+        tokens = tokenizer.encode(text, disallowed_special=())
+        return [tokenizer.decode(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
+    chunk_size = max(int(chunk_tokens * _characters_per_token(llm_model)), 1)
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def fits_context_window(llm_model: Optional[str], *texts: Any, reserve: int = RESPONSE_RESERVE) -> bool:
+    """
+    Returns whether the texts of a request leave room for the answer in the
+    context window of the model.
+    """
+    return sum(count_tokens(text, llm_model) for text in texts) + reserve <= context_window(llm_model)
@@ -25,9 +25,20 @@ from openai import AsyncStream
 
 from ...storage.configuration import Configuration
 
-from ...tools_server.function_client import FunctionToolManager
+from ...tools_server.function_client import FunctionToolManager, RESULT_PAGE_TOOL
+from .context import ContextAssembly, assemble_context
+from .tokens import RESPONSE_RESERVE, context_window, count_tokens, split_by_tokens, truncate_to_tokens
 
+
+# Tokens a compressed prompt or context is summarized down to
+COMPRESSED_TOKENS = 12500
+# Tokens of the text that is summarized at most, the rest is cut
+SUMMARY_INPUT_LIMIT = 500000
+
+@dataclass
 class CustomOpenAIAgentModel(OpenAIAgentModel):
+    parallel_tool_calls: bool = False
+
     async def _completions_create(
         self, messages: list[Any], stream: bool, model_settings: Any | None
     ) -> ChatCompletion | AsyncStream[ChatCompletionChunk]:
@@ -45,7 +56,8 @@ class CustomOpenAIAgentModel(OpenAIAgentModel):
             model=self.model_name,
             messages=openai_messages,
             n=1,
-            parallel_tool_calls=False if self.tools else NOT_GIVEN,  # Force parallel_tool_calls to False
+            # Off unless the task or agent asks for it, tool calls of one turn then run concurrently
+            parallel_tool_calls=self.parallel_tool_calls if self.tools else NOT_GIVEN,
             tools=self.tools or NOT_GIVEN,
             tool_choice=tool_choice or NOT_GIVEN,
             stream=stream,
@@ -57,6 +69,10 @@ class CustomOpenAIAgentModel(OpenAIAgentModel):
         )
 
 class CustomOpenAIModel(OpenAIModel):
+    def __init__(self, *args: Any, parallel_tool_calls: bool = False, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.parallel_tool_calls = parallel_tool_calls
+
     async def agent_model(
         self,
         *,
@@ -72,9 +88,21 @@ class CustomOpenAIModel(OpenAIModel):
             self.model_name,
             allow_text_result,
             tools,
+            parallel_tool_calls=self.parallel_tool_calls,
         )
 
 def tool_wrapper(func: Callable) -> Callable:
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                print("Tool call failed:", e)
+                return {"status_code": 500, "detail": f"Tool call failed: {e}"}
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
         # Log the tool call
@@ -93,7 +121,7 @@ def tool_wrapper(func: Callable) -> Callable:
     return wrapper
 
 
-def summarize_text(text: str, llm_model: Any, chunk_size: int = 100000, max_size: int = 300000) -> str:
+def summarize_text(text: str, llm_model: Any, chunk_tokens: Optional[int] = None, max_tokens: int = 75000) -> str:
     """Base function to summarize any text by splitting into chunks and summarizing each."""
     # Return early if text is None or empty
     if text is None:
@@ -108,32 +136,36 @@ def summarize_text(text: str, llm_model: Any, chunk_size: int = 100000, max_size
     if not text:
         return ""
 
-    # If text is already under max_size, return it
-    if len(text) <= max_size:
+    # If text is already under max_tokens, return it
+    if count_tokens(text, llm_model) <= max_tokens:
         return text
 
-    # Adjust chunk size based on model
-    if "gpt" in str(llm_model).lower():
-        # OpenAI has a 1M character limit, we'll use a much smaller chunk size to be safe
-        chunk_size = min(chunk_size, 100000)  # 100K per chunk for OpenAI
-    elif "claude" in str(llm_model).lower():
-        chunk_size = min(chunk_size, 200000)  # 200K per chunk for Claude
+    prompt = (
+        "Please provide an extremely concise summary of the following text. "
+        "Focus only on the most important points and key information. "
+        "Be as brief as possible while retaining critical meaning:\n\n"
+    )
+
+    # A chunk and the prompt have to fit in the context window of the model,
+    # with room for the summary
+    largest_chunk = (context_window(llm_model) - RESPONSE_RESERVE - count_tokens(prompt, llm_model)) // 2
+    chunk_tokens = min(chunk_tokens or largest_chunk, largest_chunk)
     
     try:
-        print(f"Original text length: {len(text)}")
+        print(f"Original text tokens: {count_tokens(text, llm_model)}")
         
         # If text is extremely long, do an initial aggressive truncation
-        if len(text) > 2000000:  # If over 2M characters
-            text = text[:2000000]  # Take first 2M characters
-            print("Text was extremely long, truncated to 2M characters")
+        if count_tokens(text, llm_model) > SUMMARY_INPUT_LIMIT:
+            text = truncate_to_tokens(text, SUMMARY_INPUT_LIMIT, llm_model)
+            print(f"Text was extremely long, truncated to {SUMMARY_INPUT_LIMIT} tokens")
         
-        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        chunks = split_by_tokens(text, chunk_tokens, llm_model)
         print(f"Number of chunks: {len(chunks)}")
         
         model = agent_creator(response_format=str, tools=[], context=None, llm_model=llm_model, system_prompt=None)
         if isinstance(model, dict) and "status_code" in model:
             print(f"Error creating model: {model}")
-            return text[:max_size]
+            return truncate_to_tokens(text, max_tokens, llm_model)
         
         # Process chunks in smaller batches if there are too many
         batch_size = 5
@@ -146,51 +178,44 @@ def summarize_text(text: str, llm_model: Any, chunk_size: int = 100000, max_size
             for i, chunk in enumerate(batch):
                 chunk_num = batch_start + i + 1
                 try:
-                    print(f"Processing chunk {chunk_num}/{len(chunks)}, length: {len(chunk)}")
-                    
-                    # Create a more focused prompt for better summarization
-                    prompt = (
-                        "Please provide an extremely concise summary of the following text. "
-                        "Focus only on the most important points and key information. "
-                        "Be as brief as possible while retaining critical meaning:\n\n"
-                    )
+                    print(f"Processing chunk {chunk_num}/{len(chunks)}, tokens: {count_tokens(chunk, llm_model)}")
                     
                     message = [{"type": "text", "text": prompt + chunk}]
                     result = model.run_sync(message)
                     
                     if result and hasattr(result, 'data') and result.data:
                         # Ensure the summary isn't too long
-                        summary = result.data[:max_size//len(chunks)]
+                        summary = truncate_to_tokens(result.data, max_tokens // len(chunks), llm_model)
                         summarized_chunks.append(summary)
                     else:
                         print(f"Warning: Empty or invalid result for chunk {chunk_num}")
                         # Include a shorter truncated version as fallback
-                        summarized_chunks.append(chunk[:500] + "...")
+                        summarized_chunks.append(truncate_to_tokens(chunk, 125, llm_model) + "...")
                 except Exception as e:
                     print(f"Error summarizing chunk {chunk_num}: {str(e)}")
                     # Include a shorter truncated version as fallback
-                    summarized_chunks.append(chunk[:500] + "...")
+                    summarized_chunks.append(truncate_to_tokens(chunk, 125, llm_model) + "...")
 
         # Combine all summarized chunks
         combined_summary = "\n\n".join(summarized_chunks)
         
         # If still too long, recursively summarize with smaller chunks
-        if len(combined_summary) > max_size:
-            print(f"Combined summary still too long ({len(combined_summary)} chars), recursively summarizing...")
+        if count_tokens(combined_summary, llm_model) > max_tokens:
+            print(f"Combined summary still too long ({count_tokens(combined_summary, llm_model)} tokens), recursively summarizing...")
             return summarize_text(
                 combined_summary, 
                 llm_model, 
-                chunk_size=max(5000, chunk_size//4),  # Reduce chunk size more aggressively
-                max_size=max_size
+                chunk_tokens=max(1250, chunk_tokens//4),  # Reduce chunk size more aggressively
+                max_tokens=max_tokens
             )
             
-        print(f"Final summary length: {len(combined_summary)}")
+        print(f"Final summary tokens: {count_tokens(combined_summary, llm_model)}")
         return combined_summary
     except Exception as e:
         traceback.print_exc()
         print(f"Error in summarize_text: {str(e)}")
         # If all else fails, return a truncated version
-        return text[:max_size]
+        return truncate_to_tokens(text, max_tokens, llm_model)
 
 def summarize_message_prompt(message_prompt: str, llm_model: Any) -> str:
     """Summarizes the message prompt to reduce its length while preserving key information."""
@@ -199,17 +224,15 @@ def summarize_message_prompt(message_prompt: str, llm_model: Any) -> str:
         return ""
     
     try:
-        # Use a smaller max size for message prompts
-        max_size = 50000  # 100K for messages
-        summarized_message_prompt = summarize_text(message_prompt, llm_model, max_size=max_size)
+        summarized_message_prompt = summarize_text(message_prompt, llm_model, max_tokens=COMPRESSED_TOKENS)
         if summarized_message_prompt is None:
             return ""
-        print(f"Summarized message prompt length: {len(summarized_message_prompt)}")
+        print(f"Summarized message prompt tokens: {count_tokens(summarized_message_prompt, llm_model)}")
         return summarized_message_prompt
     except Exception as e:
         print(f"Error in summarize_message_prompt: {str(e)}")
         try:
-            return str(message_prompt)[:50000] if message_prompt else ""
+            return truncate_to_tokens(str(message_prompt), COMPRESSED_TOKENS, llm_model) if message_prompt else ""
         except:
             return ""
 
@@ -220,17 +243,15 @@ def summarize_system_prompt(system_prompt: str, llm_model: Any) -> str:
         return ""
     
     try:
-        # Use a smaller max size for system prompts
-        max_size = 50000  # 100K for system prompts
-        summarized_system_prompt = summarize_text(system_prompt, llm_model, max_size=max_size)
+        summarized_system_prompt = summarize_text(system_prompt, llm_model, max_tokens=COMPRESSED_TOKENS)
         if summarized_system_prompt is None:
             return ""
-        print(f"Summarized system prompt length: {len(summarized_system_prompt)}")
+        print(f"Summarized system prompt tokens: {count_tokens(summarized_system_prompt, llm_model)}")
         return summarized_system_prompt
     except Exception as e:
         print(f"Error in summarize_system_prompt: {str(e)}")
         try:
-            return str(system_prompt)[:50000] if system_prompt else ""
+            return truncate_to_tokens(str(system_prompt), COMPRESSED_TOKENS, llm_model) if system_prompt else ""
         except:
             return ""
 
@@ -241,17 +262,15 @@ def summarize_context_string(context_string: str, llm_model: Any) -> str:
         return ""
     
     try:
-        # Use a smaller max size for context strings
-        max_size = 50000  # 50K for context strings
-        summarized_context = summarize_text(context_string, llm_model, max_size=max_size)
+        summarized_context = summarize_text(context_string, llm_model, max_tokens=COMPRESSED_TOKENS)
         if summarized_context is None:
             return ""
-        print(f"Summarized context string length: {len(summarized_context)}")
+        print(f"Summarized context string tokens: {count_tokens(summarized_context, llm_model)}")
         return summarized_context
     except Exception as e:
         print(f"Error in summarize_context_string: {str(e)}")
         try:
-            return str(context_string)[:50000] if context_string else ""
+            return truncate_to_tokens(str(context_string), COMPRESSED_TOKENS, llm_model) if context_string else ""
         except:
             return ""
 
@@ -261,7 +280,9 @@ def agent_creator(
         context: Any = None,
         llm_model: str = "openai/gpt-4o",
         system_prompt: Optional[Any] = None,
-        context_compress: bool = False
+        context_compress: bool = False,
+        parallel_tool_calls: bool = False,
+        max_context_tokens: Optional[int] = None
     ) -> ResultData:
 
         if llm_model == "openai/gpt-4o" or llm_model == "gpt-4o":
@@ -272,10 +293,20 @@ def agent_creator(
                 api_key=openai_api_key,  # This is the default and can be omitted
             )
 
-            model = CustomOpenAIModel('gpt-4o', openai_client=client)
+            model = CustomOpenAIModel('gpt-4o', openai_client=client, parallel_tool_calls=parallel_tool_calls)
 
+        elif llm_model == "openai/gpt-4o-mini" or llm_model == "gpt-4o-mini":
+            openai_api_key = Configuration.get("OPENAI_API_KEY")
+            if not openai_api_key:
+                return {"status_code": 401, "detail": "No API key provided. Please set OPENAI_API_KEY in your configuration."}
+            client = AsyncOpenAI(
+                api_key=openai_api_key,
+            )
+
+            model = CustomOpenAIModel('gpt-4o-mini', openai_client=client, parallel_tool_calls=parallel_tool_calls)
 
-        if llm_model == "deepseek/deepseek-chat":
+
+        elif llm_model == "deepseek/deepseek-chat":
             deepseek_api_key = Configuration.get("DEEPSEEK_API_KEY")
             if not deepseek_api_key:
                 return {"status_code": 401, "detail": "No API key provided. Please set DEEPSEEK_API_KEY in your configuration."}
@@ -338,42 +369,15 @@ def agent_creator(
                 }
 
             model = AsyncAzureOpenAI(api_version=azure_api_version, azure_endpoint=azure_endpoint, api_key=azure_api_key)
-            model = CustomOpenAIModel('gpt-4o', openai_client=model)
+            model = CustomOpenAIModel('gpt-4o', openai_client=model, parallel_tool_calls=parallel_tool_calls)
 
         else:
             return {"status_code": 400, "detail": f"Unsupported LLM model: {llm_model}"}
 
-        context_string = ""
-        if context is not None:
-            if not isinstance(context, list):
-                context = [context]
-
-            if isinstance(context, list):
-                for each in context:
-                    from ...client.level_two.agent import Characterization
-                    from ...client.level_two.agent import OtherTask
-                    from ...client.tasks.tasks import Task
-                    from ...client.knowledge_base.knowledge_base import KnowledgeBase
-                    type_string = type(each).__name__
-
-                    if type_string == Characterization.__name__:
-                        context_string += f"\n\nThis is your character ```character {each.model_dump()}```"
-                    elif type_string == OtherTask.__name__:
-                        context_string += f"\n\nContexts from old tasks: ```old_task {each.task} {each.result}```"
-                    elif type_string == Task.__name__:
-                        response = None
-                        description = each.description
-                        try:
-                            response = each.response.dict()
-                        except:
-                            try:
-                                response = each.response.model_dump()
-                            except:
-                                response = each.response
-                                
-                        context_string += f"\n\nContexts from old tasks: ```old_task {description} {response}```   "
-                    else:
-                        context_string += f"\n\nContexts ```context {each}```"
+        # Callers that size the call assemble the context themselves
+        if not isinstance(context, ContextAssembly):
+            context = assemble_context(context, llm_model, max_context_tokens)
+        context_string = context.text
 
         # Compress context string if enabled
         if context_compress and context_string:
@@ -402,7 +406,9 @@ def agent_creator(
         the_wrapped_tools = []
 
         with FunctionToolManager() as function_client:
-            the_list_of_tools = function_client.get_tools_by_name(tools)
+            # Oversized tool results come back as a preview, let the agent page through them
+            tool_names = [*tools, RESULT_PAGE_TOOL] if tools else []
+            the_list_of_tools = function_client.get_tools_by_name(tool_names)
 
             for each in the_list_of_tools:
                 # Wrap the tool with our wrapper
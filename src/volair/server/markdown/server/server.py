@@ -21,6 +21,14 @@ prefix = "/markdown"
 
 
 
+def convert_to_markdown(file_path: str, filename: str) -> str:
+    """
+    Converts a file to markdown with the filename as heading.
+    """
+    markdown_content = md.convert(file_path).text_content
+    return f"# {filename}\n\n{markdown_content}"
+
+
 @app.post(f"{prefix}/upload")
 async def upload_file(file: UploadFile = File(...)):
     """
@@ -43,11 +51,7 @@ async def upload_file(file: UploadFile = File(...)):
             content = await file.read()
             f.write(content)
 
-        # Convert to markdown
-        markdown_content = md.convert(file_path).text_content
-
-        # Add filename as heading
-        markdown_with_filename = f"# {file.filename}\n\n{markdown_content}"
+        markdown_with_filename = convert_to_markdown(file_path, file.filename)
 
         # Clean up
         os.remove(file_path)
@@ -23,6 +23,13 @@ class ConfigSetRequest(BaseModel):
     key: str
     value: str
 
+class ConfigGetManyRequest(BaseModel):
+    keys: List[str]
+    version: Optional[str] = None
+
+class ConfigSetManyRequest(BaseModel):
+    configs: Dict[str, str]
+
 
 @app.post(f"{prefix}/config/get")
 async def get_config(request: ConfigGetRequest):
@@ -36,7 +43,7 @@ async def get_config(request: ConfigGetRequest):
         The configuration value or a default message if not found
     """
     value = Configuration.get(request.key)
-    return {"key": request.key, "value": value}
+    return {"key": request.key, "value": value, "version": Configuration.version_stamp()}
 
 
 @app.post(f"{prefix}/config/set")
@@ -52,4 +59,40 @@ async def set_config(request: ConfigSetRequest):
         A success message
     """
     Configuration.set(request.key, request.value)
-    return {"message": "Configuration updated successfully"}
+    return {"message": "Configuration updated successfully", "version": Configuration.version_stamp()}
+
+
+@app.post(f"{prefix}/config/get_many")
+async def get_configs(request: ConfigGetManyRequest):
+    """
+    Endpoint to get several configuration values in one request.
+
+    Args:
+        keys: The configuration keys
+        version: Optional version stamp the client already has values for
+
+    Returns:
+        The configuration values and the current version stamp. If the client's
+        version is still current, only the version is returned with not_modified.
+    """
+    version = Configuration.version_stamp()
+    if request.version is not None and request.version == version:
+        return {"version": version, "not_modified": True}
+
+    values = Configuration.get_many(request.keys)
+    return {"values": values, "version": version, "not_modified": False}
+
+
+@app.post(f"{prefix}/config/set_many")
+async def set_configs(request: ConfigSetManyRequest):
+    """
+    Endpoint to set several configuration values in a single write.
+
+    Args:
+        configs: The configuration keys and values
+
+    Returns:
+        A success message and the new version stamp
+    """
+    Configuration.set_many(request.configs)
+    return {"message": "Configurations updated successfully", "version": Configuration.version_stamp()}
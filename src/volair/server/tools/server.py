@@ -9,6 +9,7 @@ from concurrent.futures import ThreadPoolExecutor
 import cloudpickle
 cloudpickle.DEFAULT_PROTOCOL = 2
 import base64
+import httpx
 
 
 prefix = "/tools"
@@ -18,6 +19,15 @@ class InstallLibraryRequest(BaseModel):
     library: str
 
 
+class InstallLibrariesRequest(BaseModel):
+    libraries: List[str]
+
+
+class InstallStatusRequest(BaseModel):
+    job_id: str
+    log_offset: int = 0
+
+
 class CustomToolRequest(BaseModel):
     function: str
 
@@ -25,17 +35,37 @@ class CustomToolRequest(BaseModel):
 @app.post(f"{prefix}/install_library")
 async def install_library(request: InstallLibraryRequest):
     """
-    Endpoint to install a library.
+    Endpoint to install a library in the background.
 
     Args:
         library: The library to install
 
     Returns:
-        A success message
+        The install job, poll it with /tools/install_status
     """
     with ToolManager() as tool_client:
-        tool_client.install_library(request.library)
-    return {"message": "Library installed successfully"}
+        return tool_client.install_library(request.library)
+
+
+@app.post(f"{prefix}/install_libraries")
+async def install_libraries(request: InstallLibrariesRequest):
+    """
+    Endpoint to install a set of libraries in one background job.
+    """
+    with ToolManager() as tool_client:
+        return tool_client.install_libraries(request.libraries)
+
+
+@app.post(f"{prefix}/install_status")
+async def install_status(request: InstallStatusRequest):
+    """
+    Endpoint to get the status and log of an install job.
+    """
+    try:
+        with ToolManager() as tool_client:
+            return tool_client.install_status(request.job_id, request.log_offset)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.json().get("detail"))
 
 
 
@@ -51,6 +81,15 @@ async def uninstall_library(request: InstallLibraryRequest):
 
 class AddToolRequest(BaseModel):
     function: Any
+    executor: str = "thread"
+    libraries: List[str] = []
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    memory_limit_mb: Optional[int] = None
+    cacheable: bool = False
+    ttl: Optional[float] = None
+    max_entries: Optional[int] = None
+    max_result_chars: Optional[int] = None
 
 @app.post(f"{prefix}/add_tool")
 async def add_tool(request: AddToolRequest):
@@ -58,7 +97,18 @@ async def add_tool(request: AddToolRequest):
     Endpoint to add a tool.
     """
     with ToolManager() as tool_client:
-        tool_client.add_tool(request.function)
+        tool_client.add_tool(
+            request.function,
+            executor=request.executor,
+            libraries=request.libraries,
+            max_concurrency=request.max_concurrency,
+            timeout=request.timeout,
+            memory_limit_mb=request.memory_limit_mb,
+            cacheable=request.cacheable,
+            ttl=request.ttl,
+            max_entries=request.max_entries,
+            max_result_chars=request.max_result_chars,
+        )
     return {"message": "Tool added successfully"}
 
 
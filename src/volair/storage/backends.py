@@ -0,0 +1,325 @@
+"""
+Storage backends used by ConfigManager.
+
+The backend is chosen with the VOLAIR_STORAGE_BACKEND environment variable:
+
+- "file" (default): a local pickledb JSON file per database.
+- "sqlite": a local SQLite database per database, safe for multiple workers.
+- "redis": a Redis-protocol server shared by every node (VOLAIR_REDIS_URL).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pickledb
+from dotenv import load_dotenv
+
+from .folder import BASE_PATH
+
+
+# (value, expires_at) where expires_at is a unix timestamp or None
+Entry = Tuple[Any, Optional[float]]
+
+
+class StorageBackend:
+    """
+    Base class for key-value storage backends.
+
+    Subclasses implement the bulk operations; the single-key helpers are built
+    on top of them so every backend gets pipelining for free.
+    """
+
+    def get_entries(self, keys: Iterable[str]) -> Dict[str, Entry]:
+        """
+        Returns (value, expires_at) for every key that exists and is not expired.
+        """
+        raise NotImplementedError
+
+    def write_many(self, items: Dict[str, Any], deletes: Iterable[str] = (), ttls: Optional[Dict[str, float]] = None) -> None:
+        """
+        Removes the deletes and stores the items in one write. ttls gives the
+        seconds after which some of the items expire.
+        """
+        raise NotImplementedError
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """
+        Stores all items in one write, optionally expiring after ttl seconds.
+        """
+        self.write_many(items, ttls={key: ttl for key in items} if ttl else None)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Removes the given keys.
+        """
+        self.write_many({}, deletes=keys)
+
+    def version(self) -> Any:
+        """
+        Returns a cheap stamp that changes whenever any process writes.
+        """
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return {key: entry[0] for key, entry in self.get_entries(keys).items()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self.delete_many([key])
+
+
+def _expires_at(ttl: Optional[float]) -> Optional[float]:
+    return time.time() + ttl if ttl else None
+
+
+class LocalFileBackend(StorageBackend):
+    """
+    Stores values in a local pickledb file.
+
+    The file is reloaded when another process rewrites it, and reloaded again
+    right before every write so concurrent writers do not drop each other's keys.
+    Writes replace the file atomically so readers never see a partial file.
+    """
+
+    EXPIRY_KEY = "__expiry__"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Writes go through _dump, so pickledb's SIGTERM dump handler is not
+        # needed, and it can only be installed from the main thread
+        self.db = pickledb.load(self.db_path, auto_dump=False, sig=False)
+        self._lock = threading.RLock()
+        self._file_stamp = self._get_file_stamp()
+
+    def _get_file_stamp(self):
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _dump(self):
+        directory = os.path.dirname(self.db_path) or "."
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(self.db.db, file)
+            os.replace(temporary_path, self.db_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+            raise
+        self._file_stamp = self._get_file_stamp()
+
+    def _reload_if_changed(self):
+        file_stamp = self._get_file_stamp()
+        if file_stamp == self._file_stamp:
+            return
+        try:
+            self.db.load(self.db_path, False)
+        except ValueError:
+            # The file is being rewritten by another process, try again later
+            return
+        self._file_stamp = file_stamp
+
+    def get_entries(self, keys):
+        now = time.time()
+        entries = {}
+        with self._lock:
+            expiry = self.db.get(self.EXPIRY_KEY) or {}
+            for key in keys:
+                if not self.db.exists(key):
+                    continue
+                expires_at = expiry.get(key)
+                if expires_at is not None and expires_at <= now:
+                    continue
+                entries[key] = (self.db.get(key), expires_at)
+        return entries
+
+    def write_many(self, items, deletes=(), ttls=None):
+        ttls = ttls or {}
+        with self._lock:
+            self._reload_if_changed()
+            expiry = self.db.get(self.EXPIRY_KEY) or {}
+            for key in deletes:
+                if self.db.exists(key):
+                    self.db.rem(key)
+                expiry.pop(key, None)
+            for key, value in items.items():
+                self.db.set(key, value)
+                expires_at = _expires_at(ttls.get(key))
+                if expires_at is None:
+                    expiry.pop(key, None)
+                else:
+                    expiry[key] = expires_at
+            self._set_expiry(expiry)
+            self._dump()
+
+    def _set_expiry(self, expiry):
+        now = time.time()
+        for key in [key for key, expires_at in expiry.items() if expires_at <= now]:
+            expiry.pop(key)
+            if self.db.exists(key):
+                self.db.rem(key)
+        if expiry:
+            self.db.set(self.EXPIRY_KEY, expiry)
+        elif self.db.exists(self.EXPIRY_KEY):
+            self.db.rem(self.EXPIRY_KEY)
+
+    def version(self):
+        with self._lock:
+            self._reload_if_changed()
+            return self._file_stamp
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores values in a local SQLite database in WAL mode.
+
+    Each thread keeps its own connection, and bulk writes run in a single
+    transaction that also bumps the version counter.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_entries(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ", ".join("?" for _ in keys)
+        rows = self._connection().execute(
+            f"SELECT key, value, expires_at FROM kv WHERE key IN ({placeholders}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            [*keys, now],
+        ).fetchall()
+        return {key: (json.loads(value), expires_at) for key, value, expires_at in rows}
+
+    def write_many(self, items, deletes=(), ttls=None):
+        ttls = ttls or {}
+        with self._connection() as connection:
+            connection.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key in deletes])
+            connection.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            connection.executemany(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), _expires_at(ttls.get(key))) for key, value in items.items()],
+            )
+            connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+
+    def version(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return row[0] if row else None
+
+
+class RedisBackend(StorageBackend):
+    """
+    Stores values on a Redis-protocol server so several nodes share state.
+
+    Uses a connection pool, pipelines every bulk operation into one round trip
+    and lets the server expire keys with a TTL. Pass an existing client (for
+    example fakeredis.FakeRedis()) to skip the connection setup.
+    """
+
+    def __init__(self, namespace: str, url: Optional[str] = None, client: Any = None, max_connections: int = 50):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError(
+                    "The redis storage backend requires the redis package. Install it with `pip install volairframework[redis]`."
+                )
+            pool = redis.ConnectionPool.from_url(url or "redis://localhost:6379/0", max_connections=max_connections)
+            client = redis.Redis(connection_pool=pool)
+
+        self.client = client
+        self.prefix = f"volair:{namespace}:"
+        self.version_key = f"volair:{namespace}:__version__"
+
+    def get_entries(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self.prefix + key)
+            pipe.pttl(self.prefix + key)
+        results = pipe.execute()
+
+        now = time.time()
+        entries = {}
+        for index, key in enumerate(keys):
+            value, pttl = results[2 * index], results[2 * index + 1]
+            if value is None:
+                continue
+            expires_at = now + pttl / 1000 if pttl is not None and pttl >= 0 else None
+            entries[key] = (json.loads(value), expires_at)
+        return entries
+
+    def write_many(self, items, deletes=(), ttls=None):
+        ttls = ttls or {}
+        deletes = [self.prefix + key for key in deletes]
+        pipe = self.client.pipeline(transaction=True)
+        if deletes:
+            pipe.delete(*deletes)
+        for key, value in items.items():
+            ttl = ttls.get(key)
+            pipe.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+        pipe.incr(self.version_key)
+        pipe.execute()
+
+    def version(self):
+        value = self.client.get(self.version_key)
+        return int(value) if value is not None else 0
+
+
+def create_backend(db_name: str) -> StorageBackend:
+    """
+    Creates the storage backend selected by VOLAIR_STORAGE_BACKEND.
+
+    Args:
+        db_name (str): Name of the database file, e.g. "config.db".
+
+    Returns:
+        StorageBackend: The backend for that database.
+    """
+    load_dotenv()
+    backend = os.getenv("VOLAIR_STORAGE_BACKEND", "file").lower()
+    namespace = os.path.splitext(db_name)[0]
+
+    if backend == "file":
+        return LocalFileBackend(os.path.join(BASE_PATH, db_name))
+    if backend == "sqlite":
+        return SQLiteBackend(os.path.join(BASE_PATH, f"{namespace}.sqlite3"))
+    if backend == "redis":
+        return RedisBackend(namespace, url=os.getenv("VOLAIR_REDIS_URL"))
+
+    raise ValueError(f"Unsupported storage backend: {backend}")
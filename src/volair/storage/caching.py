@@ -1,5 +1,5 @@
 """
-Module for handling caching of data using pickledb.
+Module for handling caching of data in the configured storage backend.
 """
 
 import cloudpickle
@@ -31,10 +31,8 @@ def save_to_cache_with_expiry(data: Any, cache_key: str, expiry_seconds: int) ->
         'expiry_time': expiry_time
     }
     serialized_data = base64.b64encode(cloudpickle.dumps(cache_data)).decode('utf-8')
-    ClientConfiguration.set(f"cache_{cache_key}", serialized_data)
+    ClientConfiguration.set(f"cache_{cache_key}", serialized_data, ttl=expiry_seconds)
 
-    # test
-    
 
 def get_from_cache_with_expiry(cache_key: str) -> Optional[Any]:
     """
@@ -59,7 +57,7 @@ def get_from_cache_with_expiry(cache_key: str) -> Optional[Any]:
         if current_time > cache_data['expiry_time']:
 
             # Clean up expired cache
-            ClientConfiguration.set(f"cache_{cache_key}", None)
+            ClientConfiguration.delete(f"cache_{cache_key}")
             return None
             
 
@@ -1,16 +1,70 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
-import pickledb
-from .folder import BASE_PATH
+from .backends import create_backend
 
 
 class ConfigManager:
-    def __init__(self, db_name="config.db"):
+    def __init__(self, db_name="config.db", refresh_interval=1.0, backend=None):
         """
-        Initializes the ConfigManager with a database file.
+        Initializes the ConfigManager with a storage backend.
+
+        Reads are served from an in-memory cache. The cache is dropped when the
+        backend reports a write from another process or node (checked at most
+        once per refresh_interval seconds), so key rotations on one worker are
+        picked up by every other worker without a restart.
+
+        Args:
+            db_name (str): Name of the database, used by the default backend.
+            refresh_interval (float): Seconds between change checks.
+            backend (StorageBackend): Optional backend, see storage/backends.py.
+        """
+        self.backend = backend if backend is not None else create_backend(db_name)
+
+        self.refresh_interval = refresh_interval
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._backend_version = self.backend.version()
+        self._last_check = time.monotonic()
+
+    def _refresh_if_changed(self, force=False):
+        """
+        Clears the cache if the backend was written by another process.
+
+        Args:
+            force (bool): Check the backend even if refresh_interval has not elapsed.
         """
-        self.db_path = os.path.join(BASE_PATH, db_name)
-        self.db = pickledb.load(self.db_path, auto_dump=False)
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return
+        self._last_check = now
+
+        backend_version = self.backend.version()
+        if backend_version == self._backend_version:
+            return
+
+        self._backend_version = backend_version
+        self._cache.clear()
+
+    def version_stamp(self):
+        """
+        Returns a string that changes whenever the stored configuration changes.
+
+        The stamp comes from the backend, so every worker sharing the same
+        backend reports the same stamp for the same data.
+        """
+        with self._lock:
+            self._refresh_if_changed()
+            return str(self._backend_version)
+
+    def invalidate(self):
+        """
+        Drops every cached value so the next read goes to the backend.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._last_check = 0.0
 
     def initialize_keys(self, keys):
         """
@@ -20,10 +74,13 @@ class ConfigManager:
             keys (list): A list of environment variable keys to initialize.
         """
         load_dotenv()
+        values = {}
         for key in keys:
             value = os.getenv(key)
             if value:
-                self.set(key, value)
+                values[key] = value
+        if values:
+            self.set_many(values)
 
     def get(self, key, default=None):
         """
@@ -36,18 +93,80 @@ class ConfigManager:
         Returns:
             The value from the database or the default value.
         """
-        return self.db.get(key) if self.db.get(key) is not False else default
+        return self.get_many([key], default).get(key, default)
+
+    def get_many(self, keys, default=None):
+        """
+        Retrieves several keys, fetching all cache misses in one backend call.
+
+        Args:
+            keys (list): The keys to retrieve.
+            default: The value used for keys that are not found.
 
-    def set(self, key, value):
+        Returns:
+            dict: A mapping of every requested key to its value or the default.
+        """
+        now = time.time()
+        values = {}
+        with self._lock:
+            self._refresh_if_changed()
+
+            missing = []
+            for key in keys:
+                entry = self._cache.get(key)
+                if entry is None or (entry[1] is not None and entry[1] <= now):
+                    missing.append(key)
+                else:
+                    values[key] = entry[0]
+
+            if missing:
+                entries = self.backend.get_entries(missing)
+                for key in missing:
+                    entry = entries.get(key, (False, None))
+                    self._cache[key] = entry
+                    values[key] = entry[0]
+
+        return {key: value if value is not False else default for key, value in values.items()}
+
+    def set(self, key, value, ttl=None):
         """
         Sets a key-value pair in the database and saves it.
 
         Args:
             key (str): The key to set.
             value: The value to associate with the key.
+            ttl (float): Optional number of seconds until the key expires.
+        """
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items, ttl=None):
+        """
+        Sets several key-value pairs with a single backend write.
+
+        Args:
+            items (dict): The key-value pairs to set.
+            ttl (float): Optional number of seconds until the keys expire.
+        """
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._refresh_if_changed(force=True)
+            self.backend.set_many(items, ttl=ttl)
+            for key, value in items.items():
+                self._cache[key] = (value, expires_at)
+            self._backend_version = self.backend.version()
+
+    def delete(self, key):
+        """
+        Removes a key from the database.
+
+        Args:
+            key (str): The key to remove.
         """
-        self.db.set(key, value)
-        self.db.dump()
+        with self._lock:
+            self._refresh_if_changed(force=True)
+            self.backend.delete(key)
+            self._cache[key] = (False, None)
+            self._backend_version = self.backend.version()
 
 
 # Utility function to create and initialize a ConfigManager
@@ -1,41 +1,61 @@
+import os
+import threading
 import httpx
+from collections import OrderedDict
 from typing import Dict, List, Any, Callable, Optional
 from functools import wraps
 import inspect
 
+from . import transport
+from .transport import RESULT_PAGE_TOOL, TOOLS_SERVER_URL, http_client
+
+
+def get_python_type(schema_type: str, format: Optional[str] = None) -> type:
+    """Convert JSON schema type to Python type."""
+    type_mapping = {
+        "string": str,
+        "integer": int,
+        "boolean": bool,
+        "number": float,
+        "array": list,
+        "object": dict,
+    }
+    return type_mapping.get(schema_type, Any)
+
+
+# Number of tool name queries whose catalogs are kept
+MAX_CATALOGS = int(os.getenv("VOLAIR_TOOLS_MAX_CATALOGS", "64"))
+
 
 class FunctionToolManager:
     """Client for interacting with the Volair Functions API."""
 
+    # Tool catalogs are shared by every manager in the process, one entry per
+    # name query, and revalidated with the ETag of the tools server so proxies
+    # are only rebuilt when the registered tools change. The least recently
+    # used queries are dropped past MAX_CATALOGS.
+    _catalog_lock = threading.Lock()
+    _catalogs: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+
     def __init__(self):
         """Initialize the Volair Function client."""
-        self.base_url = "http://localhost:8086"
+        self.base_url = TOOLS_SERVER_URL
 
     def get_tools_by_name(self, name: list[str]):
         """
         Get tools by name, supporting wildcard patterns.
-        
+
         Args:
             name: List of tool names or patterns (e.g. ["FileSystem.*", "MyTools.*"])
-            
+
         Returns:
             List of matching tools
         """
-        matching_tools = []
-        for tool in self.tools():
-            tool_name = tool.__name__
-            for pattern in name:
-                # Handle wildcard pattern
-                if pattern.endswith(".*"):
-                    prefix = pattern[:-2]  # Remove .* from the end
-                    if tool_name.startswith(prefix):
-                        matching_tools.append(tool)
-                        break
-                # Exact match
-                elif tool_name == pattern:
-                    matching_tools.append(tool)
-                    break
-        return matching_tools
+        # No tools asked for, not every tool
+        if not name:
+            return []
+        catalog = self._refresh_catalog(name)
+        return [self._get_function(catalog, tool_name) for tool_name in catalog["names"]]
 
     def __enter__(self):
         return self
@@ -49,11 +69,56 @@ class FunctionToolManager:
 
     def list_tools(self) -> Dict[str, Any]:
         """List all available tools."""
-        with httpx.Client(timeout=600.0) as session:
+        with http_client() as session:
             response = session.post(f"{self.base_url}/functions/tools")
             response.raise_for_status()
             return response.json()
 
+    def _refresh_catalog(self, patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return the cached tools matching the patterns, downloading them only if the ETag changed.
+        """
+        key = tuple(patterns) if patterns is not None else None
+        with FunctionToolManager._catalog_lock:
+            catalog = FunctionToolManager._catalogs.get(key)
+            if catalog is not None:
+                FunctionToolManager._catalogs.move_to_end(key)
+        headers = {"If-None-Match": catalog["etag"]} if catalog else {}
+        params = None
+        if patterns is not None:
+            # An empty list can not be sent as a query, "names=" selects no tools
+            params = {"names": list(patterns) or [""]}
+
+        with http_client() as session:
+            response = session.post(f"{self.base_url}/functions/tools", params=params, headers=headers)
+            if response.status_code == 304:
+                return catalog
+            response.raise_for_status()
+            tools_response = response.json()
+
+        tools = tools_response.get("available_tools", {}).get("tools", [])
+        new_catalog = {
+            "etag": response.headers.get("ETag"),
+            "tools": {tool["name"]: tool for tool in tools},
+            "names": [tool["name"] for tool in tools],
+            "functions": {},
+        }
+        with FunctionToolManager._catalog_lock:
+            FunctionToolManager._catalogs[key] = new_catalog
+            FunctionToolManager._catalogs.move_to_end(key)
+            while len(FunctionToolManager._catalogs) > MAX_CATALOGS:
+                FunctionToolManager._catalogs.popitem(last=False)
+        return new_catalog
+
+    def _get_function(self, catalog: Dict[str, Any], tool_name: str) -> Callable[..., Dict[str, Any]]:
+        """
+        Return the proxy function of a tool, building it on first use.
+        """
+        functions = catalog["functions"]
+        if tool_name not in functions:
+            functions[tool_name] = self._create_tool_function(catalog["tools"][tool_name])
+        return functions[tool_name]
+
     def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
         Call a specific tool with the given arguments.
@@ -65,7 +130,12 @@ class FunctionToolManager:
         Returns:
             Tool execution results
         """
-        with httpx.Client(timeout=600.0) as session:
+        if transport.IN_PROCESS:
+            # Co-located tools app, skip HTTP and call the registry directly
+            from .server.function_tools import _run_tool
+            return transport.run_in_tools_loop(_run_tool(tool_name, arguments))
+
+        with http_client() as session:
             response = session.post(
                 f"{self.base_url}/functions/call_tool",
                 json={"tool_name": tool_name, "arguments": arguments},
@@ -73,98 +143,112 @@ class FunctionToolManager:
             response.raise_for_status()
             return response.json()
 
-    def tools(self) -> List[Callable[..., Dict[str, Any]]]:
-        """Initialize tool-specific methods based on available tools."""
-        tools_response = self.list_tools()
+    async def call_tool_async(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call a specific tool without blocking a thread, over the shared connection pool.
 
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Dictionary of arguments to pass to the tool
 
+        Returns:
+            Tool execution results
+        """
+        if transport.IN_PROCESS:
+            from .server.function_tools import _run_tool
+            return await transport.run_in_tools_loop_async(_run_tool(tool_name, arguments))
+
+        response = await transport.post_async(
+            f"{self.base_url}/functions/call_tool",
+            json={"tool_name": tool_name, "arguments": arguments},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def call_many(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Call several tools concurrently in one request.
 
-        tools = tools_response.get("available_tools", {}).get("tools", [])
+        Args:
+            calls: List of {"tool_name": ..., "arguments": {...}} dicts
 
-        functions: List[Callable[..., Dict[str, Any]]] = []
-
-        def get_python_type(schema_type: str, format: Optional[str] = None) -> type:
-            """Convert JSON schema type to Python type."""
-            type_mapping = {
-                "string": str,
-                "integer": int,
-                "boolean": bool,
-                "number": float,
-                "array": list,
-                "object": dict,
-            }
-            return type_mapping.get(schema_type, Any)
-
-        for tool in tools:
-            tool_name: str = tool["name"]
-            tool_desc: str = tool.get("description", "")
-            input_schema: Dict[str, Any] = tool.get("inputSchema", {})
-            properties: Dict[str, Dict[str, Any]] = input_schema.get("properties", {})
-            required: List[str] = input_schema.get("required", [])
-
-            def create_tool_function(
-                tool_name: str,
-                properties: Dict[str, Dict[str, Any]],
-                required: List[str],
-            ) -> Callable[..., Dict[str, Any]]:
-                annotations = {}
-                defaults = {}
-                parameters = []
-
-                # Build parameters for both required and optional arguments
-                for param_name in required:
-                    param_info = properties[param_name]
-                    param_type = get_python_type(param_info.get("type", "any"))
-                    annotations[param_name] = param_type
-                    parameters.append(
-                        inspect.Parameter(
-                            param_name,
-                            inspect.Parameter.POSITIONAL_OR_KEYWORD,
-                            annotation=param_type
-                        )
-                    )
+        Returns:
+            One result or error dict per call, in the same order
+        """
+        if transport.IN_PROCESS:
+            from .server.function_tools import ToolCallsRequest, call_many
+            response = transport.run_in_tools_loop(call_many(ToolCallsRequest(calls=calls)))
+            return response["results"]
 
-                for param_name, param_info in properties.items():
-                    if param_name not in required:
-                        param_type = get_python_type(param_info.get("type", "any"))
-                        annotations[param_name] = param_type
-                        default_value = param_info.get("default", None)
-                        defaults[param_name] = default_value
-                        parameters.append(
-                            inspect.Parameter(
-                                param_name,
-                                inspect.Parameter.POSITIONAL_OR_KEYWORD,
-                                default=default_value,
-                                annotation=param_type
-                            )
-                        )
-
-                def tool_function(*args: Any, **kwargs: Any) -> Dict[str, Any]:
-                    all_kwargs = kwargs.copy()
-                    for i, arg in enumerate(args):
-                        if i < len(required):
-                            all_kwargs[required[i]] = arg
-
-                    for param, default in defaults.items():
-                        if param not in all_kwargs:
-                            all_kwargs[param] = default
-
-                    return self.call_tool(tool_name, all_kwargs)
-
-                # Create a signature object and apply it to the function
-                sig = inspect.Signature(parameters=parameters, return_annotation=Dict[str, Any])
-                tool_function.__signature__ = sig
-                tool_function.__name__ = tool_name
-                tool_function.__annotations__ = {
-                    **annotations,
-                    "return": Dict[str, Any],
-                }
-                tool_function.__doc__ = f"{tool_desc}\n\nReturns:\n    Tool execution results"
-
-                return tool_function
-
-
-            func = create_tool_function(tool_name, properties, required)
-            functions.append(func)
-
-        return functions
+        with http_client() as session:
+            response = session.post(f"{self.base_url}/functions/call_many", json={"calls": calls})
+            response.raise_for_status()
+            return response.json()["results"]
+
+    def tools(self) -> List[Callable[..., Dict[str, Any]]]:
+        """Initialize tool-specific methods based on available tools."""
+        catalog = self._refresh_catalog()
+        return [self._get_function(catalog, tool_name) for tool_name in catalog["names"]]
+
+    def _create_tool_function(self, tool: Dict[str, Any]) -> Callable[..., Dict[str, Any]]:
+        tool_name: str = tool["name"]
+        tool_desc: str = tool.get("description", "")
+        input_schema: Dict[str, Any] = tool.get("inputSchema", {})
+        properties: Dict[str, Dict[str, Any]] = input_schema.get("properties", {})
+        required: List[str] = input_schema.get("required", [])
+
+        annotations = {}
+        defaults = {}
+        parameters = []
+
+        # Build parameters for both required and optional arguments
+        for param_name in required:
+            param_info = properties[param_name]
+            param_type = get_python_type(param_info.get("type", "any"))
+            annotations[param_name] = param_type
+            parameters.append(
+                inspect.Parameter(
+                    param_name,
+                    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                    annotation=param_type
+                )
+            )
+
+        for param_name, param_info in properties.items():
+            if param_name not in required:
+                param_type = get_python_type(param_info.get("type", "any"))
+                annotations[param_name] = param_type
+                default_value = param_info.get("default", None)
+                defaults[param_name] = default_value
+                parameters.append(
+                    inspect.Parameter(
+                        param_name,
+                        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                        default=default_value,
+                        annotation=param_type
+                    )
+                )
+
+        async def tool_function(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            all_kwargs = kwargs.copy()
+            for i, arg in enumerate(args):
+                if i < len(required):
+                    all_kwargs[required[i]] = arg
+
+            for param, default in defaults.items():
+                if param not in all_kwargs:
+                    all_kwargs[param] = default
+
+            return await self.call_tool_async(tool_name, all_kwargs)
+
+        # Create a signature object and apply it to the function
+        sig = inspect.Signature(parameters=parameters, return_annotation=Dict[str, Any])
+        tool_function.__signature__ = sig
+        tool_function.__name__ = tool_name
+        tool_function.__annotations__ = {
+            **annotations,
+            "return": Dict[str, Any],
+        }
+        tool_function.__doc__ = f"{tool_desc}\n\nReturns:\n    Tool execution results"
+
+        return tool_function
@@ -1,8 +1,11 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
 import asyncio
 from functools import wraps
 
 app = FastAPI()
+# Tool catalogs and results can be large, compress them for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 
 class TimeoutException(Exception):
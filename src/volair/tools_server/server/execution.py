@@ -0,0 +1,321 @@
+"""
+Execution of registered tools off the tools-server event loop.
+
+Async tools run on the event loop, sync tools run in a shared thread pool and
+tools registered with executor="process" run in a warm pool of worker
+processes with their libraries pre-imported. Every tool has an optional
+concurrency cap (extra calls wait in a queue) and a timeout.
+
+The timeout of a process tool is hard: the worker is killed and replaced. The
+timeout of a thread tool is best effort. The caller gets the timeout error in
+time, but the thread is only interrupted the next time it runs Python code,
+so a tool blocked in a sleep or in C-level I/O keeps its pool thread until the
+call returns. Register tools that may block with executor="process".
+"""
+
+import asyncio
+import ctypes
+import hashlib
+import importlib
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import cloudpickle
+cloudpickle.DEFAULT_PROTOCOL = 2
+
+
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("VOLAIR_TOOL_TIMEOUT", "30"))
+
+
+class ToolTimeoutError(Exception):
+    pass
+
+
+def _import_name(library: str) -> str:
+    for separator in ("[", "=", "<", ">", "~", "!", ";", " "):
+        library = library.split(separator)[0]
+    return library.strip().replace("-", "_")
+
+
+def _initialize_worker(libraries: Tuple[str, ...], memory_limit_mb: Optional[int]) -> None:
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    # Pay the import cost once per worker instead of once per call
+    for library in libraries:
+        try:
+            importlib.import_module(_import_name(library))
+        except Exception:
+            pass
+
+
+def _warm_up() -> bool:
+    return True
+
+
+_loaded_functions: Dict[str, Any] = {}
+
+
+def _run_pickled_function(pickled_function: bytes, arguments: Dict[str, Any]) -> Any:
+    function_key = hashlib.sha256(pickled_function).hexdigest()
+    function = _loaded_functions.get(function_key)
+    if function is None:
+        function = cloudpickle.loads(pickled_function)
+        _loaded_functions[function_key] = function
+
+    # The result is pickled once by the pool and sent back through its pipe
+    return function(**arguments)
+
+
+def _raise_in_thread(thread_id: int, exception_type: Optional[type]) -> None:
+    """
+    Schedules the exception in the thread, or clears a scheduled one if None.
+    """
+    exception = ctypes.py_object(exception_type) if exception_type is not None else None
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), exception)
+
+
+class ProcessWorker:
+    """
+    A single worker process that can be killed without touching other calls.
+
+    Args:
+        libraries: Libraries imported when the worker starts.
+        memory_limit_mb: Optional address space limit of the worker.
+    """
+
+    def __init__(self, libraries: Tuple[str, ...] = (), memory_limit_mb: Optional[int] = None):
+        # The tools server is multi-threaded, so avoid plain fork for workers
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_initialize_worker,
+            initargs=(tuple(libraries), memory_limit_mb),
+        )
+        self.calls = 0
+        # Start the process now so the first call does not pay for it
+        self.executor.submit(_warm_up)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def kill(self):
+        for process in list(getattr(self.executor, "_processes", {}).values()):
+            process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ToolExecutor:
+    """
+    Runs tool functions with per-tool concurrency limits, timeouts and metrics.
+
+    Args:
+        max_threads: Size of the thread pool for sync tools.
+        max_processes: Number of worker processes per library set for process tools.
+        max_calls_per_worker: Calls after which a worker process is recycled.
+    """
+
+    def __init__(
+        self,
+        max_threads: Optional[int] = None,
+        max_processes: Optional[int] = None,
+        max_calls_per_worker: int = 100,
+    ):
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="volair-tool")
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.max_calls_per_worker = max_calls_per_worker
+        self._process_pools: Dict[Tuple, asyncio.Queue] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def _tool_metrics(self, name: str) -> Dict[str, Any]:
+        if name not in self._metrics:
+            self._metrics[name] = {
+                "calls": 0,
+                "failures": 0,
+                "timeouts": 0,
+                "in_flight": 0,
+                "queued": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+        return self._metrics[name]
+
+    def _semaphore(self, name: str, max_concurrency: Optional[int]) -> Optional[asyncio.Semaphore]:
+        if not max_concurrency:
+            return None
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(max_concurrency)
+        return self._semaphores[name]
+
+    async def run(self, name: str, info: Dict[str, Any], arguments: Dict[str, Any]) -> Any:
+        """
+        Runs a registered tool and records its metrics.
+
+        Args:
+            name: The registered tool name.
+            info: The registry entry of the tool.
+            arguments: Keyword arguments for the tool.
+
+        Returns:
+            The tool result.
+        """
+        metrics = self._tool_metrics(name)
+        semaphore = self._semaphore(name, info.get("max_concurrency"))
+
+        metrics["queued"] += 1
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+        finally:
+            metrics["queued"] -= 1
+
+        metrics["calls"] += 1
+        metrics["in_flight"] += 1
+        start_time = time.monotonic()
+        try:
+            return await self._execute(info, arguments)
+        except ToolTimeoutError:
+            metrics["timeouts"] += 1
+            raise
+        except Exception:
+            metrics["failures"] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - start_time
+            metrics["in_flight"] -= 1
+            metrics["total_seconds"] += elapsed
+            metrics["max_seconds"] = max(metrics["max_seconds"], elapsed)
+            if semaphore is not None:
+                semaphore.release()
+
+    async def _execute(self, info: Dict[str, Any], arguments: Dict[str, Any]) -> Any:
+        func = info["function"]
+        timeout = info.get("timeout") or DEFAULT_TOOL_TIMEOUT
+
+        if inspect.iscoroutinefunction(func):
+            try:
+                return await asyncio.wait_for(func(**arguments), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise ToolTimeoutError(f"Tool timed out after {timeout} seconds")
+
+        if info.get("executor") == "process":
+            return await self._run_in_process(info, arguments, timeout)
+        return await self._run_in_thread(func, arguments, timeout)
+
+    async def _run_in_thread(self, func, arguments: Dict[str, Any], timeout: float) -> Any:
+        lock = threading.Lock()
+        state = {"thread_id": None, "done": False, "interrupted": False}
+
+        def target():
+            with lock:
+                state["thread_id"] = threading.get_ident()
+            try:
+                return func(**arguments)
+            finally:
+                with lock:
+                    state["done"] = True
+                    if state["interrupted"]:
+                        # The call ended before the interrupt was raised, it must not
+                        # hit the next job of this pool thread
+                        _raise_in_thread(state["thread_id"], None)
+
+        future = asyncio.get_running_loop().run_in_executor(self.thread_pool, target)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Threads cannot be cancelled, so interrupt the tool inside its thread.
+            # Best effort, it is raised once the thread runs Python code again.
+            with lock:
+                if state["thread_id"] is not None and not state["done"]:
+                    state["interrupted"] = True
+                    _raise_in_thread(state["thread_id"], ToolTimeoutError)
+            raise ToolTimeoutError(f"Tool timed out after {timeout} seconds")
+
+    @staticmethod
+    def _pool_key(libraries: Optional[List[str]], memory_limit_mb: Optional[int]) -> Tuple:
+        return (tuple(sorted(libraries or [])), memory_limit_mb)
+
+    def _process_pool(self, key: Tuple) -> asyncio.Queue:
+        if key not in self._process_pools:
+            workers = asyncio.Queue()
+            for _ in range(self.max_processes):
+                workers.put_nowait(ProcessWorker(*key))
+            self._process_pools[key] = workers
+        return self._process_pools[key]
+
+    def warm_up(self, libraries: Optional[List[str]] = None, memory_limit_mb: Optional[int] = None) -> None:
+        """
+        Starts the worker processes for a library set before the first call.
+        """
+        self._process_pool(self._pool_key(libraries, memory_limit_mb))
+
+    async def _run_in_process(self, info: Dict[str, Any], arguments: Dict[str, Any], timeout: float) -> Any:
+        key = self._pool_key(info.get("libraries"), info.get("memory_limit_mb"))
+        workers = self._process_pool(key)
+
+        if "pickled_function" not in info:
+            info["pickled_function"] = cloudpickle.dumps(info["function"])
+
+        worker = await workers.get()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                worker.executor,
+                _run_pickled_function,
+                info["pickled_function"],
+                arguments,
+            )
+            result = await asyncio.wait_for(future, timeout=timeout)
+            worker.calls += 1
+            return result
+        except asyncio.TimeoutError:
+            worker.kill()
+            worker = ProcessWorker(*key)
+            raise ToolTimeoutError(f"Tool timed out after {timeout} seconds")
+        except BrokenProcessPool:
+            # The worker crashed, replace it so other calls are not affected
+            worker = ProcessWorker(*key)
+            raise
+        finally:
+            if worker.calls >= self.max_calls_per_worker:
+                worker.shutdown()
+                worker = ProcessWorker(*key)
+            workers.put_nowait(worker)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns call counts, in-flight/queued calls and latency per tool.
+        """
+        result = {}
+        for name, metrics in self._metrics.items():
+            finished = metrics["calls"] - metrics["in_flight"]
+            result[name] = {
+                **metrics,
+                "average_seconds": metrics["total_seconds"] / finished if finished else 0.0,
+            }
+        return result
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        for workers in self._process_pools.values():
+            while not workers.empty():
+                workers.get_nowait().kill()
+
+
+tool_executor = ToolExecutor(
+    max_threads=int(os.getenv("VOLAIR_TOOL_THREADS", "32")),
+    max_processes=int(os.getenv("VOLAIR_TOOL_PROCESSES", "0")) or None,
+    max_calls_per_worker=int(os.getenv("VOLAIR_TOOL_WORKER_MAX_CALLS", "100")),
+)
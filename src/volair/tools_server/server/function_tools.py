@@ -1,17 +1,33 @@
+import asyncio
+import bisect
+import requests
 import traceback
-from fastapi import HTTPException
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import inspect
-from typing import Any, Dict, List, Type, Callable
+import uuid
+from typing import Any, Dict, List, Optional, Type, Callable
 from functools import wraps
 
 from .api import app, timeout
+from .execution import tool_executor, ToolTimeoutError
+from .result_cache import function_version, tool_result_cache
+from .result_store import result_store
 
 prefix = "/functions"
 
 # Registry to store decorated functions
 registered_functions: Dict[str, Dict[str, Any]] = {}
 
+# Bumped on every registration so clients can cache the catalog. The boot id
+# keeps ETags from a previous tools-server process from matching after a restart.
+catalog_state: Dict[str, Any] = {"boot_id": uuid.uuid4().hex[:12], "version": 0, "tools": None, "names": None}
+
+
+def catalog_etag() -> str:
+    return f'"{catalog_state["boot_id"]}-{catalog_state["version"]}"'
+
 
 def _get_json_type(python_type: Type) -> str:
     """Convert Python type to JSON schema type."""
@@ -26,12 +42,38 @@ def _get_json_type(python_type: Type) -> str:
     return type_mapping.get(python_type, "string")
 
 
-def tool(description: str = "", custom_properties: Dict[str, Any] = None, custom_required: List[str] = None):
+def tool(
+    description: str = "",
+    custom_properties: Dict[str, Any] = None,
+    custom_required: List[str] = None,
+    executor: str = "thread",
+    max_concurrency: int = None,
+    timeout: float = None,
+    libraries: List[str] = None,
+    memory_limit_mb: int = None,
+    cacheable: bool = False,
+    ttl: float = None,
+    partial_ttl: float = None,
+    max_entries: int = None,
+    max_result_chars: int = None,
+):
     """
     Decorator to register a function as a tool.
 
     Args:
         description: Optional description of the tool. If not provided, function's docstring will be used.
+        executor: Where sync functions run, "thread" or "process" for CPU-bound tools.
+        max_concurrency: Optional number of calls that can run at once, others wait in a queue.
+        timeout: Optional timeout in seconds, defaults to VOLAIR_TOOL_TIMEOUT.
+        libraries: Libraries pre-imported by the worker processes of a process tool.
+        memory_limit_mb: Optional memory limit of the worker processes of a process tool.
+        cacheable: Serve repeated calls with the same arguments from the result cache, only for pure tools.
+        ttl: Optional seconds a cached result stays valid, forever if omitted.
+        partial_ttl: Optional seconds a result with failed parts stays cached, such
+            results are not cached if omitted.
+        max_entries: Optional number of cached results kept for the tool.
+        max_result_chars: Optional size limit of a result in JSON characters, larger results are
+            replaced by a preview and read with Results__read_page. 0 for no limit.
     """
 
     def decorator(func: Callable):
@@ -83,7 +125,22 @@ def tool(description: str = "", custom_properties: Dict[str, Any] = None, custom
             "description": tool_description,
             "properties": properties,
             "required": required,
+            "executor": executor,
+            "max_concurrency": max_concurrency,
+            "timeout": timeout,
+            "libraries": libraries or [],
+            "memory_limit_mb": memory_limit_mb,
+            "cacheable": cacheable,
+            # Part of the cache key, a replaced function does not get old results
+            "version": function_version(func) if cacheable else None,
+            "ttl": ttl,
+            "partial_ttl": partial_ttl,
+            "max_entries": max_entries,
+            "max_result_chars": max_result_chars,
         }
+        catalog_state["version"] += 1
+        catalog_state["tools"] = None
+        catalog_state["names"] = None
 
         # Check if the function is async
         is_async = inspect.iscoroutinefunction(func)
@@ -107,16 +164,13 @@ class ToolRequest(BaseModel):
     arguments: dict
 
 
-@app.post(f"{prefix}/tools")
-@timeout(30.0)
-async def list_tools():
-
+def _catalog_tools() -> Dict[str, Dict[str, Any]]:
+    """Return the tool schemas by name, rebuilt only when the catalog version changes."""
+    if catalog_state["tools"] is None:
+        tools = {}
+        for name, info in registered_functions.items():
 
-    tools = []
-    for name, info in registered_functions.items():
-
-        tools.append(
-            {
+            tools[name] = {
                 "name": name,
                 "description": info["description"],
                 "inputSchema": {
@@ -125,38 +179,166 @@ async def list_tools():
                     "required": info["required"],
                 },
             }
-        )
+        catalog_state["tools"] = tools
+        catalog_state["names"] = sorted(tools)
+    return catalog_state["tools"]
+
 
-    return {"available_tools": {"tools": tools}}
+def match_tool_names(patterns: Optional[List[str]]) -> List[str]:
+    """
+    Resolve exact names and "Prefix.*" patterns against the catalog.
 
+    Args:
+        patterns: Tool names or wildcard patterns, None for every tool.
 
-@app.post(f"{prefix}/call_tool")
+    Returns:
+        Matching tool names in pattern order without duplicates.
+    """
+    tools = _catalog_tools()
+    if patterns is None:
+        return list(tools)
+
+    names = catalog_state["names"]
+    matched = []
+    seen = set()
+    for pattern in patterns:
+        # Handle wildcard pattern
+        if pattern.endswith(".*"):
+            name_prefix = pattern[:-2]  # Remove .* from the end
+            index = bisect.bisect_left(names, name_prefix)
+            candidates = []
+            while index < len(names) and names[index].startswith(name_prefix):
+                candidates.append(names[index])
+                index += 1
+        # Exact match
+        elif pattern in tools:
+            candidates = [pattern]
+        else:
+            candidates = []
+
+        for name in candidates:
+            if name not in seen:
+                seen.add(name)
+                matched.append(name)
+    return matched
+
+
+@app.post(f"{prefix}/tools")
 @timeout(30.0)
-async def call_tool(request: ToolRequest):
+async def list_tools(
+    request: Request,
+    names: Optional[List[str]] = Query(None),
+    fields: str = "full",
+    offset: int = 0,
+    limit: Optional[int] = None,
+):
+    """
+    Endpoint to list the registered tools.
 
+    Args:
+        names: Tool names or "Prefix.*" patterns to return, all tools if omitted
+            and none if given empty ("names=").
+        fields: "full" for the complete schema, "names" for tool names only.
+        offset: Index of the first matching tool to return.
+        limit: Maximum number of tools to return, all remaining if omitted.
+    """
+    if fields not in ("full", "names"):
+        raise HTTPException(status_code=400, detail=f"Unsupported fields value: {fields}")
+
+    # The ETag covers every query of one catalog version, clients keep one entry per query
+    etag = catalog_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    tools = _catalog_tools()
+    if names is not None:
+        # A blank "names=" is the empty selection, not a missing parameter
+        names = [name for name in names if name]
+    matched = match_tool_names(names)
+    page = matched[offset:offset + limit] if limit is not None else matched[offset:]
+    next_offset = offset + len(page)
+
+    if fields == "names":
+        page_tools = [{"name": name} for name in page]
+    else:
+        page_tools = [tools[name] for name in page]
+
+    content = {
+        "available_tools": {"tools": page_tools},
+        "version": catalog_state["version"],
+        "total": len(matched),
+        "next_offset": next_offset if next_offset < len(matched) else None,
+    }
+    return JSONResponse(content=content, headers={"ETag": etag})
 
-    if request.tool_name not in registered_functions:
-        raise HTTPException(
-            status_code=404, detail=f"Tool {request.tool_name} not found"
-        )
 
+async def _run_tool(tool_name: str, arguments: dict) -> Dict[str, Any]:
+    """Run one registered tool and return its result or an error dict."""
+    if tool_name not in registered_functions:
+        return {"status_code": 404, "detail": f"Tool {tool_name} not found"}
+
+    info = registered_functions[tool_name]
     try:
-        func = registered_functions[request.tool_name]["function"]
-        # Check if the function is async
-        is_async = inspect.iscoroutinefunction(func)
-        
-        if is_async:
-            result = await func(**request.arguments)
+        # Sync tools run in the executor so they do not block the event loop
+        if info.get("cacheable"):
+            result = await tool_result_cache.get_or_run(
+                tool_name, info, arguments, lambda: tool_executor.run(tool_name, info, arguments)
+            )
         else:
-            result = func(**request.arguments)
-            
+            result = await tool_executor.run(tool_name, info, arguments)
 
-        return {"result": result}
+        # Oversized results are replaced by a preview and a handle for paging
+        return {"result": await result_store.limit_async(tool_name, result, info.get("max_result_chars"))}
+    except ToolTimeoutError as e:
+        return {"status_code": 408, "detail": str(e)}
     except Exception as e:
 
         return {"status_code": 500, "detail": f"Failed to call tool: {str(e)}"}
 
 
+@app.post(f"{prefix}/call_tool")
+async def call_tool(request: ToolRequest):
+    response = await _run_tool(request.tool_name, request.arguments)
+
+    if response.get("status_code") in (404, 408):
+        raise HTTPException(status_code=response["status_code"], detail=response["detail"])
+    return response
+
+
+class ToolCallsRequest(BaseModel):
+    calls: List[ToolRequest]
+
+
+@app.post(f"{prefix}/call_many")
+async def call_many(request: ToolCallsRequest):
+    """
+    Endpoint to run independent tool calls concurrently.
+
+    Args:
+        request: The tool calls to run.
+
+    Returns:
+        One result or error dict per call, in request order.
+    """
+    results = await asyncio.gather(
+        *(_run_tool(call.tool_name, call.arguments) for call in request.calls)
+    )
+    return {"results": list(results)}
+
+
+@app.get(f"{prefix}/metrics")
+async def tool_metrics():
+    """
+    Endpoint to get per-tool call counts, latency, in-flight calls, result cache hits and result sizes.
+    """
+    return {"tools": tool_executor.metrics(), "cache": tool_result_cache.metrics(), "result_sizes": result_store.metrics()}
+
+
+@app.on_event("shutdown")
+async def shutdown_tool_executor():
+    tool_executor.shutdown()
+
+
 # Example decorated functions
 @tool()
 async def add_numbers(a: int, b: int, c: int=0) -> int:
@@ -170,72 +352,67 @@ def concat_strings(str1: str, str2: str) -> str:
     return str1 + str2
 
 
-@tool()
+def _google_search(query: str, max_number: int) -> List[str]:
+    from googlesearch import search as gsearch
+
+    return list(gsearch(query, stop=max_number))
+
+
+@tool(cacheable=True, ttl=60 * 60)
 def Search__google(query: str, max_number: int = 20) -> list:
     """
     Search the query on Google and return the results.
     """
     try:
-        from googlesearch import search as gsearch
-
-        return list(gsearch(query, stop=max_number))
-    except:
-        return "An exception occurred"
+        return _google_search(query, max_number)
+    except Exception as e:
+        # Returned as an error dict so the failure is not cached
+        return {"error": f"An exception occurred: {e}"}
     
 
-import re
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-@tool()
-def Search__read_website(url: str, max_content_length: int = 5000) -> dict:
+from .web import web_fetcher, extract_page, fit_result_size, read_pages
+
+
+@tool(cacheable=True, ttl=60 * 60)
+def Search__read_website(url: str, max_content_length: int = 5000, max_links: int = 50) -> dict:
     """
     Read the content of a website and return the title, meta data, content, and sub-links.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        html = response.text
+        page = web_fetcher.fetch(url)
     except requests.RequestException as e:
         return {"error": f"Failed to retrieve the website content: {e}"}
 
-    soup = BeautifulSoup(html, "html.parser")
-
-    meta_properties = [
-        "og:description",
-        "og:site_name",
-        "og:title",
-        "og:type",
-        "og:url",
-        "description",
-        "keywords",
-        "author",
-    ]
-    meta = {}
-    for property_name in meta_properties:
-        tag = soup.find("meta", property=property_name) or soup.find(
-            "meta", attrs={"name": property_name}
-        )
-        if tag:
-            meta[property_name] = tag.get("content", "")
-
-    for ignore_tag in soup(["script", "style"]):
-        ignore_tag.decompose()
-
-    title = soup.title.string.strip() if soup.title else ""
-    content = soup.body.get_text(separator="\n") if soup.body else ""
-
-    links = []
-    for a in soup.find_all("a", href=True):
-        link_url = urljoin(url, a["href"])
-        links.append({"title": a.text.strip(), "link": link_url})
-
-    content = re.sub(r"[\n\r\t]+", "\n", content)
-    content = re.sub(r" +", " ", content)
-    content = re.sub(r"[\n ]{3,}", "\n\n", content)
-    content = content.strip()
-
-    if len(content) > max_content_length:
-        content = content[:max_content_length].rsplit(" ", 1)[0] + "..."
-
-    return {"meta": meta, "title": title, "content": content, "sub_links": links}
\ No newline at end of file
+    return extract_page(page.text, page.url, max_content_length=max_content_length, max_links=max_links)
+
+
+@tool(cacheable=True, ttl=60 * 60, partial_ttl=5 * 60)
+def Search__search_and_read(query: str, max_results: int = 5, max_total_characters: int = 20000) -> dict:
+    """
+    Search the query on Google and read the top results at once, returning a short summary of each page.
+    """
+    try:
+        # Ask for extra results so duplicates do not shrink the list
+        urls = _google_search(query, max_results * 2)
+    except Exception as e:
+        return {"error": f"An exception occurred: {e}"}
+
+    pages = read_pages(urls, max_total_characters=max_total_characters, max_pages=max_results)
+    result = {"query": query, "pages": pages}
+
+    # The whole answer has to stay under the result size limit, otherwise the
+    # agent only gets a preview of it
+    max_result_chars = registered_functions["Search__search_and_read"].get("max_result_chars")
+    if max_result_chars is None:
+        max_result_chars = result_store.max_result_chars
+    if max_result_chars:
+        fit_result_size(result, pages, max_result_chars)
+    return result
+
+
+@tool(max_result_chars=0)
+def Results__read_page(handle: str, offset: int = 0, length: int = 5000) -> dict:
+    """
+    Read more of a tool result that was too large to return at once, starting at offset.
+    """
+    return result_store.read_page(handle, offset, length)
@@ -0,0 +1,266 @@
+"""
+Background library installation for the tools server.
+
+Installs run as jobs next to the event loop instead of blocking it: a request
+returns a job ID right away and the job can be polled for its status and log.
+Requirements that are already satisfied are skipped, identical requests that
+are still running share one job and all installs use a persistent local wheel
+cache (VOLAIR_WHEEL_CACHE_DIR), so re-registering a tool costs nothing.
+Installs run one at a time because concurrent installers into the same
+environment corrupt each other.
+"""
+
+import asyncio
+import importlib
+import os
+import shutil
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+
+WHEEL_CACHE_DIR = os.getenv("VOLAIR_WHEEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "volair", "wheels"))
+MAX_JOBS = int(os.getenv("VOLAIR_INSTALL_MAX_JOBS", "100"))
+MAX_LOG_LINES = 2000
+
+FINISHED = ("succeeded", "failed")
+
+
+def _installer() -> List[str]:
+    """
+    Returns the command prefix of the package installer, uv when available.
+    """
+    uv = shutil.which("uv")
+    if uv is None:
+        try:
+            from uv import find_uv_bin
+            uv = find_uv_bin()
+        except Exception:
+            uv = None
+    if uv is not None:
+        return [uv, "pip"]
+    return [sys.executable, "-m", "pip"]
+
+
+def _target_arguments(command: List[str]) -> List[str]:
+    # uv looks for a virtual environment, install into the running interpreter instead
+    if os.path.basename(command[0]).startswith("uv"):
+        return ["--python", sys.executable]
+    return []
+
+
+def _normalize(requirement: str) -> str:
+    try:
+        from packaging.requirements import Requirement
+        return str(Requirement(requirement))
+    except Exception:
+        return requirement.strip()
+
+
+def is_satisfied(requirement: str) -> bool:
+    """
+    Returns True if the requirement is installed in a matching version.
+
+    Requirements with extras or URLs are never considered satisfied, their
+    dependencies can not be checked from the installed metadata alone.
+    """
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        from packaging.requirements import Requirement
+
+        parsed = Requirement(requirement)
+    except Exception:
+        return False
+
+    if parsed.marker is not None and not parsed.marker.evaluate():
+        return True
+    if parsed.extras or parsed.url:
+        return False
+    try:
+        installed = version(parsed.name)
+    except PackageNotFoundError:
+        return False
+    return parsed.specifier.contains(installed, prereleases=True)
+
+
+class InstallJob:
+    def __init__(self, requirements: List[str]):
+        self.job_id = uuid.uuid4().hex
+        self.requirements = requirements
+        self.status = "queued"
+        self.skipped: List[str] = []
+        self.logs: deque = deque(maxlen=MAX_LOG_LINES)
+        self.log_count = 0
+        self.returncode: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def log(self, line: str) -> None:
+        self.logs.append(line)
+        self.log_count += 1
+
+    def to_dict(self, log_offset: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Returns the job state, with the log lines from log_offset on if it is given.
+        """
+        result = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "requirements": self.requirements,
+            "skipped": self.skipped,
+            "returncode": self.returncode,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "log_count": self.log_count,
+        }
+        if log_offset is not None:
+            # Old lines may have been dropped from the bounded log
+            first = self.log_count - len(self.logs)
+            result["logs"] = list(self.logs)[max(log_offset - first, 0):]
+        return result
+
+
+class LibraryInstaller:
+    """
+    Runs library installs as background jobs.
+
+    Args:
+        command: Optional installer command prefix, "install"/"uninstall" and the
+            requirements are appended. Defaults to `uv pip`, or `python -m pip`.
+        cache_dir: Directory of the wheel cache.
+        max_jobs: Number of jobs kept for polling.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, cache_dir: str = WHEEL_CACHE_DIR, max_jobs: int = MAX_JOBS):
+        self._command = command
+        self.cache_dir = cache_dir
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, InstallJob]" = OrderedDict()
+        self._active: Dict[tuple, InstallJob] = {}
+        self._installed: set = set()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def command(self) -> List[str]:
+        if self._command is None:
+            self._command = _installer()
+        return self._command
+
+    def _environment(self) -> Dict[str, str]:
+        env = os.environ.copy()
+        env.setdefault("UV_CACHE_DIR", self.cache_dir)
+        env.setdefault("PIP_CACHE_DIR", self.cache_dir)
+        return env
+
+    def _remember(self, job: InstallJob) -> None:
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.max_jobs:
+            oldest = next((job_id for job_id, old in self._jobs.items() if old.status in FINISHED), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest]
+
+    def submit(self, requirements: List[str]) -> InstallJob:
+        """
+        Starts a job installing the requirements, or returns the running job
+        of the same requirements.
+        """
+        requirements = list(dict.fromkeys(_normalize(requirement) for requirement in requirements if requirement.strip()))
+        key = tuple(sorted(requirements))
+        if key in self._active:
+            return self._active[key]
+
+        job = InstallJob(requirements)
+        self._remember(job)
+        if all(self._satisfied(requirement) for requirement in requirements):
+            # Nothing to install, finish right away so clients need not poll
+            job.skipped = requirements
+            job.log("All requirements are already satisfied")
+            job.status = "succeeded"
+            job.returncode = 0
+            job.started_at = job.finished_at = time.time()
+            return job
+
+        self._active[key] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, key))
+        return job
+
+    def _satisfied(self, requirement: str) -> bool:
+        return requirement in self._installed or is_satisfied(requirement)
+
+    def get(self, job_id: str) -> Optional[InstallJob]:
+        return self._jobs.get(job_id)
+
+    async def _execute(self, job: InstallJob, arguments: List[str]) -> int:
+        verb, *requirements = arguments
+        command = [*self.command, verb, *_target_arguments(self.command), *requirements]
+        job.log("$ " + " ".join(command))
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                env=self._environment(),
+            )
+        except OSError as e:
+            job.log(f"Failed to start the installer: {e}")
+            return -1
+
+        async for line in process.stdout:
+            job.log(line.decode("utf-8", errors="replace").rstrip())
+        return await process.wait()
+
+    async def _run(self, job: InstallJob, key: tuple) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        try:
+            async with self._lock:
+                job.status = "running"
+                job.started_at = time.time()
+
+                # Checked inside the lock so a job queued behind an install of
+                # the same packages finds them installed
+                pending = []
+                for requirement in job.requirements:
+                    if self._satisfied(requirement):
+                        job.skipped.append(requirement)
+                    else:
+                        pending.append(requirement)
+
+                if not pending:
+                    job.log("All requirements are already satisfied")
+                    job.returncode = 0
+                else:
+                    job.returncode = await self._execute(job, ["install", *pending])
+                    if job.returncode == 0:
+                        self._installed.update(pending)
+                        importlib.invalidate_caches()
+
+                job.status = "succeeded" if job.returncode == 0 else "failed"
+        except Exception as e:
+            job.log(f"Install failed: {e}")
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            self._active.pop(key, None)
+
+    async def uninstall(self, requirement: str) -> bool:
+        """
+        Uninstalls a library after the queued installs finished.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        job = InstallJob([requirement])
+        async with self._lock:
+            returncode = await self._execute(job, ["uninstall", "-y", requirement])
+        self._installed.discard(_normalize(requirement))
+        importlib.invalidate_caches()
+        return returncode == 0
+
+
+library_installer = LibraryInstaller()
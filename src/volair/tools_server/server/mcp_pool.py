@@ -0,0 +1,274 @@
+"""
+Pool of long-lived MCP sessions for the tools server.
+
+Starting an MCP server (often through npx or uvx) takes seconds, so sessions
+are kept alive per (command, args, env) and reused across tool calls instead of
+being spawned for every call.
+"""
+
+import asyncio
+import os
+import time
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PooledSession:
+    """
+    An MCP session owned by a background task.
+
+    The stdio client and the session are entered and exited inside the same
+    task, which the MCP client requires, while other tasks on the same event
+    loop use the session in between.
+    """
+
+    def __init__(self, command: str, args: List[str], env: Optional[Dict[str, str]]):
+        self.command = command
+        self.args = args
+        self.env = env
+        self.session = None
+        self.loop = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.calls = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closed: Optional[asyncio.Event] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        from .tools import managed_session
+
+        self.loop = asyncio.get_running_loop()
+        self._closed = asyncio.Event()
+        ready = self.loop.create_future()
+
+        async def run():
+            try:
+                async with managed_session(command=self.command, args=self.args, env=self.env) as session:
+                    self.session = session
+                    ready.set_result(True)
+                    await self._closed.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+            finally:
+                self.session = None
+                # Cancelled or ended without a session, do not leave start() waiting
+                if not ready.done():
+                    ready.set_exception(RuntimeError(f"The MCP server {self.command} exited before its session was ready"))
+
+        self._task = asyncio.create_task(run())
+        await ready
+
+    async def ping(self) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=10.0)
+            self.last_checked = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        if self._closed is not None:
+            self._closed.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(self._task, timeout=10.0)
+            except Exception:
+                self._task.cancel()
+
+
+class _ServerPool:
+    def __init__(self, max_sessions: int):
+        self.semaphore = asyncio.Semaphore(max_sessions)
+        self.idle: List[PooledSession] = []
+        self.in_use = 0
+        self.metrics = {
+            "spawned": 0,
+            "reused": 0,
+            "restarted": 0,
+            "health_check_failures": 0,
+            "idle_closed": 0,
+            "calls": 0,
+            "failures": 0,
+        }
+
+
+class MCPSessionPool:
+    """
+    Keeps MCP sessions alive per (command, args, env).
+
+    Args:
+        max_sessions_per_server: Number of concurrent sessions per MCP server.
+        idle_timeout: Seconds an unused session is kept before it is closed.
+        health_check_interval: Idle seconds after which a session is pinged before reuse.
+    """
+
+    def __init__(self, max_sessions_per_server: int = 4, idle_timeout: float = 300.0, health_check_interval: float = 30.0):
+        self.max_sessions_per_server = max_sessions_per_server
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._servers: Dict[Tuple, _ServerPool] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(command: str, args: List[str], env: Optional[Dict[str, str]]) -> Tuple:
+        return (command, tuple(args or []), tuple(sorted((env or {}).items())))
+
+    def _server(self, key: Tuple) -> _ServerPool:
+        if key not in self._servers:
+            self._servers[key] = _ServerPool(self.max_sessions_per_server)
+        return self._servers[key]
+
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle_sessions())
+
+    async def _reap_idle_sessions(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 30.0))
+            await self.reap_idle()
+
+    async def reap_idle(self):
+        """
+        Closes the sessions that were idle for longer than idle_timeout.
+        """
+        now = time.monotonic()
+        for server in self._servers.values():
+            expired = [each for each in server.idle if now - each.last_used > self.idle_timeout]
+            for each in expired:
+                server.idle.remove(each)
+                server.metrics["idle_closed"] += 1
+                await each.close()
+
+    async def _acquire(self, server: _ServerPool, command: str, args: List[str], env: Optional[Dict[str, str]]) -> PooledSession:
+        loop = asyncio.get_running_loop()
+        while server.idle:
+            pooled = server.idle.pop()
+            if pooled.loop is not loop:
+                # Sessions of another event loop can only be closed on that loop.
+                # A loop that is not running anymore cancelled the owner task
+                # when it was shut down, which closed the session with it.
+                if pooled.loop.is_running():
+                    asyncio.run_coroutine_threadsafe(pooled.close(), pooled.loop)
+                continue
+            if not pooled.alive:
+                server.metrics["restarted"] += 1
+                continue
+            if time.monotonic() - pooled.last_checked > self.health_check_interval and not await pooled.ping():
+                server.metrics["health_check_failures"] += 1
+                server.metrics["restarted"] += 1
+                await pooled.close()
+                continue
+            server.metrics["reused"] += 1
+            return pooled
+
+        pooled = PooledSession(command, args, env)
+        await pooled.start()
+        server.metrics["spawned"] += 1
+        return pooled
+
+    async def _release(self, server: _ServerPool, pooled: PooledSession, healthy: bool):
+        pooled.last_used = time.monotonic()
+        if healthy and pooled.alive:
+            server.idle.append(pooled)
+        else:
+            await pooled.close()
+
+    async def call_tool(self, command: str, args: List[str], env: Optional[Dict[str, str]], name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Calls an MCP tool on a pooled session.
+
+        Getting a session is retried once. A call that failed is not sent
+        again, since the tool may have run already; a crashed session is
+        closed and replaced on the next call.
+        """
+        server = self._server(self._key(command, args, env))
+        self._ensure_reaper()
+
+        async with server.semaphore:
+            for attempt in range(2):
+                try:
+                    pooled = await self._acquire(server, command, args, env)
+                    break
+                except Exception:
+                    if attempt == 1:
+                        server.metrics["failures"] += 1
+                        raise
+                    server.metrics["restarted"] += 1
+
+            server.in_use += 1
+            healthy = True
+            try:
+                server.metrics["calls"] += 1
+                pooled.calls += 1
+                return await pooled.session.call_tool(name=name, arguments=arguments)
+            except Exception:
+                healthy = await pooled.ping()
+                server.metrics["failures"] += 1
+                raise
+            finally:
+                server.in_use -= 1
+                await self._release(server, pooled, healthy)
+
+    async def list_tools(self, command: str, args: List[str], env: Optional[Dict[str, str]]) -> Any:
+        """
+        Lists the tools of an MCP server, keeping the session for later calls.
+        """
+        server = self._server(self._key(command, args, env))
+        self._ensure_reaper()
+
+        async with server.semaphore:
+            pooled = await self._acquire(server, command, args, env)
+            server.in_use += 1
+            healthy = True
+            try:
+                return await pooled.session.list_tools()
+            except Exception:
+                healthy = await pooled.ping()
+                raise
+            finally:
+                server.in_use -= 1
+                await self._release(server, pooled, healthy)
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """
+        Returns reuse/spawn counters and session counts per MCP server.
+        """
+        result = []
+        for (command, args, env), server in self._servers.items():
+            result.append({
+                "command": command,
+                "args": list(args),
+                "env_keys": [key for key, _ in env],
+                "idle_sessions": len(server.idle),
+                "in_use_sessions": server.in_use,
+                **server.metrics,
+            })
+        return result
+
+    async def close(self):
+        """
+        Closes every pooled session.
+        """
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for server in self._servers.values():
+            while server.idle:
+                try:
+                    await server.idle.pop().close()
+                except Exception:
+                    traceback.print_exc()
+
+
+mcp_session_pool = MCPSessionPool(
+    max_sessions_per_server=int(os.getenv("VOLAIR_MCP_MAX_SESSIONS", "4")),
+    idle_timeout=float(os.getenv("VOLAIR_MCP_IDLE_TIMEOUT", "300")),
+    health_check_interval=float(os.getenv("VOLAIR_MCP_HEALTH_CHECK_INTERVAL", "30")),
+)
@@ -0,0 +1,112 @@
+"""
+Persistent registry of the tools added to a running tools server.
+
+Custom tools (the cloudpickled function with its schema, execution options and
+libraries) and MCP servers (the launch spec with the tool schemas it listed)
+are written to the configured storage backend when they are added and
+restored when the tools server app starts. Restored MCP tools use the stored
+schemas, so their servers are only spawned on the first call. Set
+VOLAIR_PERSIST_TOOLS=false to keep the registry in memory only.
+
+The env of an MCP server often holds API keys, so only its variable names are
+stored. On restore the values come from the environment of the tools server,
+and adding the server again from a client supplies them as well. Registry
+files are only readable by their owner.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+
+PERSIST_TOOLS = os.getenv("VOLAIR_PERSIST_TOOLS", "true").lower() not in ("0", "false", "no")
+
+
+class ToolRegistryStore:
+    """
+    Stores the runtime-added tools and MCP servers.
+
+    Args:
+        backend: Optional StorageBackend, defaults to the one selected by
+            VOLAIR_STORAGE_BACKEND for "tool_registry.db".
+    """
+
+    TOOLS_INDEX = "__tools__"
+    MCP_INDEX = "__mcp_servers__"
+
+    def __init__(self, backend: Any = None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from ...storage.backends import create_backend
+            self._backend = create_backend("tool_registry.db")
+        return self._backend
+
+    def _save(self, index_key: str, key: str, value: Dict[str, Any]) -> None:
+        index = self.backend.get(index_key) or []
+        if key not in index:
+            index.append(key)
+        # One write for the entry and the index
+        self.backend.set_many({key: value, index_key: index})
+        self._restrict_permissions()
+
+    def _restrict_permissions(self) -> None:
+        path = getattr(self.backend, "db_path", None)
+        if not path:
+            return
+        for each in (path, f"{path}-wal", f"{path}-shm", f"{path}-journal"):
+            try:
+                if os.path.exists(each):
+                    os.chmod(each, 0o600)
+            except OSError:
+                pass
+
+    def _load(self, index_key: str, prefix: str) -> Dict[str, Dict[str, Any]]:
+        index = self.backend.get(index_key) or []
+        entries = self.backend.get_many(index)
+        return {key[len(prefix):]: entries[key] for key in index if key in entries}
+
+    def save_tool(self, name: str, function: str, options: Dict[str, Any]) -> None:
+        """
+        Stores a custom tool.
+
+        Args:
+            name: The registered tool name.
+            function: The base64 encoded cloudpickled function.
+            options: The options it was added with (executor, libraries, timeout, ...).
+        """
+        self._save(self.TOOLS_INDEX, f"tool:{name}", {"function": function, "options": options})
+
+    def save_mcp_server(self, name: str, command: str, args: List[str], env: Dict[str, str], tools: List[Dict[str, Any]]) -> None:
+        """
+        Stores the launch spec of an MCP server and the schemas of its tools.
+        Only the names of the env variables are stored, not their values.
+        """
+        self._save(self.MCP_INDEX, f"mcp:{name}", {"command": command, "args": args, "env_keys": sorted(env or {}), "tools": tools})
+
+    def get_mcp_server(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get(f"mcp:{name}")
+
+    def tools(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the stored custom tools by name, in the order they were added.
+        """
+        return self._load(self.TOOLS_INDEX, "tool:")
+
+    def mcp_servers(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the stored MCP servers by name, in the order they were added.
+        """
+        return self._load(self.MCP_INDEX, "mcp:")
+
+
+def resolve_env(spec: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Returns the env of a stored MCP server, with the values taken from the
+    environment of the tools server.
+    """
+    return {key: os.environ[key] for key in spec["env_keys"] if key in os.environ}
+
+
+tool_registry_store = ToolRegistryStore()
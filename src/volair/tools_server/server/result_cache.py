@@ -0,0 +1,266 @@
+"""
+Result cache for tools registered with cacheable=True.
+
+Results are keyed by the tool name, a hash of the function and a hash of the
+canonical JSON of the arguments, so a tool registered again with other code
+does not get the results of the old one. Recent results are kept in an
+in-memory LRU per tool and written to the configured storage backend, so they
+survive tools-server restarts. Backend reads and writes run in worker threads.
+Concurrent calls with the same arguments share one execution. Errors are not
+cached, and results with failed parts, e.g. some pages of a search that could
+not be read, only for the partial_ttl of the tool.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+import types
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import cloudpickle
+cloudpickle.DEFAULT_PROTOCOL = 2
+
+
+DEFAULT_MAX_ENTRIES = 1000
+
+
+def argument_hash(arguments: Dict[str, Any]) -> str:
+    """
+    Returns a hash that is equal for equal arguments regardless of key order.
+    """
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _code_bytes(code: types.CodeType) -> bytes:
+    parts = [code.co_code, repr(code.co_names).encode("utf-8")]
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            parts.append(_code_bytes(const))
+        elif isinstance(const, (str, bytes, int, float, type(None))):
+            parts.append(repr(const).encode("utf-8"))
+    return b"".join(parts)
+
+
+def function_version(function: Callable) -> str:
+    """
+    Returns a hash of the pickled function and its code.
+    """
+    try:
+        data = cloudpickle.dumps(function)
+    except Exception:
+        data = repr(function).encode("utf-8")
+    # Module-level functions are pickled by name, the code catches edits
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        data += _code_bytes(code)
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _is_error(result: Any) -> bool:
+    if not isinstance(result, dict):
+        return False
+    return "error" in result or result.get("status_code", 200) != 200
+
+
+def _has_failed_parts(result: Any) -> bool:
+    if not isinstance(result, dict):
+        return False
+    return any(
+        isinstance(value, list) and any(_is_error(each) for each in value)
+        for value in result.values()
+    )
+
+
+class ToolResultCache:
+    """
+    Caches the results of pure tools.
+
+    Args:
+        backend: Optional StorageBackend, defaults to the one selected by
+            VOLAIR_STORAGE_BACKEND for "tool_cache.db".
+    """
+
+    INDEX_PREFIX = "__index__:"
+
+    def __init__(self, backend: Any = None):
+        self._backend = backend
+        self._entries: Dict[str, OrderedDict] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._write_lock = threading.Lock()
+        # Index snapshots per tool, so a slow write can not overwrite a newer index
+        self._index_versions: Dict[str, int] = {}
+        self._written_index_versions: Dict[str, int] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from ...storage.backends import create_backend
+            self._backend = create_backend("tool_cache.db")
+        return self._backend
+
+    def _tool_metrics(self, name: str) -> Dict[str, int]:
+        if name not in self._metrics:
+            self._metrics[name] = {"hits": 0, "misses": 0, "evictions": 0}
+        return self._metrics[name]
+
+    def _tool_entries(self, name: str) -> OrderedDict:
+        """
+        Returns the LRU index of a tool, loading the persisted one on first use.
+
+        Values are (result, expires_at), or None for entries that are only on
+        the backend so far.
+        """
+        if name not in self._entries:
+            index = self.backend.get(self.INDEX_PREFIX + name) or []
+            self._entries[name] = OrderedDict((key, None) for key in index)
+        return self._entries[name]
+
+    def _read_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        stored = self.backend.get_entries([key]).get(key)
+        if stored is None:
+            return None
+        try:
+            return cloudpickle.loads(base64.b64decode(stored[0])), stored[1]
+        except Exception:
+            return None
+
+    async def _lookup(self, name: str, key: str) -> Tuple[bool, Any]:
+        loop = asyncio.get_running_loop()
+        if name not in self._entries:
+            index = await loop.run_in_executor(None, self.backend.get, self.INDEX_PREFIX + name)
+            self._entries.setdefault(name, OrderedDict((key, None) for key in index or []))
+        entries = self._entries[name]
+        if key not in entries:
+            return False, None
+
+        entry = entries[key]
+        if entry is None:
+            # Written before a restart or by another node
+            entry = await loop.run_in_executor(None, self._read_entry, key)
+            if key not in entries:
+                return False, None
+            if entry is None:
+                entries.pop(key)
+                return False, None
+            entries[key] = entry
+
+        result, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            entries.pop(key)
+            return False, None
+
+        entries.move_to_end(key)
+        return True, result
+
+    def _write(self, name: str, key: str, result: Any, ttl: Optional[float], index: list, index_version: int, evicted: list) -> None:
+        items = {}
+        try:
+            items[key] = base64.b64encode(cloudpickle.dumps(result)).decode("utf-8")
+        except Exception:
+            # Keep unpicklable results in memory only
+            pass
+        with self._write_lock:
+            if index_version > self._written_index_versions.get(name, 0):
+                items[self.INDEX_PREFIX + name] = index
+                self._written_index_versions[name] = index_version
+            # The entry, the index and the evictions in one write
+            self.backend.write_many(items, deletes=evicted, ttls={key: ttl} if ttl else None)
+
+    async def _store(self, name: str, prefix: str, key: str, result: Any, ttl: Optional[float], max_entries: int) -> None:
+        entries = self._tool_entries(name)
+        entries[key] = (result, time.time() + ttl if ttl else None)
+        entries.move_to_end(key)
+
+        # Results of an earlier version of the tool are never served again
+        evicted = [each for each in entries if not each.startswith(prefix)]
+        for each in evicted:
+            entries.pop(each)
+        while len(entries) > max_entries:
+            evicted.append(entries.popitem(last=False)[0])
+        self._tool_metrics(name)["evictions"] += len(evicted)
+
+        self._index_versions[name] = self._index_versions.get(name, 0) + 1
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write, name, key, result, ttl, list(entries), self._index_versions[name], evicted
+        )
+
+    async def get_or_run(self, name: str, info: Dict[str, Any], arguments: Dict[str, Any], run: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached result of a call, or runs it and caches the result.
+
+        Args:
+            name: The registered tool name.
+            info: The registry entry of the tool, with version, ttl and max_entries.
+            arguments: Keyword arguments of the call.
+            run: Coroutine function that executes the call on a miss.
+
+        Returns:
+            The tool result.
+        """
+        metrics = self._tool_metrics(name)
+        prefix = f"{name}:{info.get('version') or ''}:"
+        key = prefix + argument_hash(arguments)
+
+        hit, result = await self._lookup(name, key)
+        if hit:
+            metrics["hits"] += 1
+            return result
+
+        if key in self._pending:
+            # The same call is already running, wait for its result
+            metrics["hits"] += 1
+            return await asyncio.shield(self._pending[key])
+
+        metrics["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await run()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        future.set_result(result)
+        if _is_error(result):
+            return result
+        ttl = info.get("ttl")
+        if _has_failed_parts(result):
+            # A later call may succeed where this one failed
+            ttl = info.get("partial_ttl")
+            if not ttl:
+                return result
+        await self._store(name, prefix, key, result, ttl, info.get("max_entries") or DEFAULT_MAX_ENTRIES)
+        return result
+
+    def clear(self, name: str) -> None:
+        """
+        Drops every cached result of a tool.
+        """
+        entries = self._tool_entries(name)
+        self.backend.delete_many([*entries, self.INDEX_PREFIX + name])
+        entries.clear()
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Returns hits, misses, evictions and cached entries per tool.
+        """
+        result = {}
+        for name, metrics in self._metrics.items():
+            result[name] = {**metrics, "entries": len(self._entries.get(name, {}))}
+        return result
+
+
+tool_result_cache = ToolResultCache()
@@ -0,0 +1,179 @@
+"""
+Size policy for tool results.
+
+A result whose JSON is longer than the tool's max_result_chars (default
+VOLAIR_TOOL_MAX_RESULT_CHARS) is written to a local blob area and replaced by
+a short preview with a handle. The built-in Results__read_page tool returns
+further slices on demand, so a huge result never travels to the main server or
+into the prompt in one piece. Blobs expire after VOLAIR_TOOL_RESULT_TTL seconds.
+"""
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from ..transport import RESULT_PAGE_TOOL
+
+
+MAX_RESULT_CHARS = int(os.getenv("VOLAIR_TOOL_MAX_RESULT_CHARS", "20000"))
+PREVIEW_CHARS = int(os.getenv("VOLAIR_TOOL_RESULT_PREVIEW_CHARS", "2000"))
+RESULT_TTL = float(os.getenv("VOLAIR_TOOL_RESULT_TTL", "3600"))
+RESULTS_DIR = os.getenv("VOLAIR_TOOL_RESULTS_DIR", os.path.join(tempfile.gettempdir(), "volair_tool_results"))
+
+# Upper bounds in characters of the result size histogram
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000)
+
+_HANDLE = re.compile(r"[0-9a-f]{32}")
+
+
+def _bucket(size: int) -> str:
+    for bound in SIZE_BUCKETS:
+        if size <= bound:
+            return f"<={bound}"
+    return f">{SIZE_BUCKETS[-1]}"
+
+
+class ResultStore:
+    """
+    Spills oversized tool results to files and serves them in slices.
+
+    Args:
+        directory: Where the spilled results are written.
+        max_result_chars: Default size limit, 0 for no limit.
+        preview_chars: Characters of a spilled result returned right away.
+        ttl: Seconds a spilled result can be read.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESULTS_DIR,
+        max_result_chars: int = MAX_RESULT_CHARS,
+        preview_chars: int = PREVIEW_CHARS,
+        ttl: float = RESULT_TTL,
+    ):
+        self.directory = directory
+        self.max_result_chars = max_result_chars
+        self.preview_chars = preview_chars
+        self.ttl = ttl
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, f"{handle}.txt")
+
+    def _record(self, name: str, size: int, spilled: bool) -> None:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = {
+                    "count": 0,
+                    "total_characters": 0,
+                    "max_characters": 0,
+                    "spilled": 0,
+                    "sizes": {**{f"<={bound}": 0 for bound in SIZE_BUCKETS}, f">{SIZE_BUCKETS[-1]}": 0},
+                }
+            metrics = self._metrics[name]
+            metrics["count"] += 1
+            metrics["total_characters"] += size
+            metrics["max_characters"] = max(metrics["max_characters"], size)
+            metrics["spilled"] += int(spilled)
+            metrics["sizes"][_bucket(size)] += 1
+
+    def _cleanup(self) -> None:
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime + self.ttl < now:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def limit(self, name: str, result: Any, max_result_chars: Optional[int] = None) -> Any:
+        """
+        Returns the result, or a preview with a handle if it is over the size limit.
+
+        Args:
+            name: The tool name, for the size metrics.
+            result: The tool result.
+            max_result_chars: The tool's limit, the store default if None, no limit if 0.
+        """
+        text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+        limit = self.max_result_chars if max_result_chars is None else max_result_chars
+        spilled = bool(limit) and len(text) > limit
+        self._record(name, len(text), spilled)
+        if not spilled:
+            return result
+        return self._spill(text, limit)
+
+    async def limit_async(self, name: str, result: Any, max_result_chars: Optional[int] = None) -> Any:
+        """
+        Same as limit, but runs in a worker thread so the event loop is not
+        blocked by serializing or writing a large result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.limit, name, result, max_result_chars)
+
+    def _spill(self, text: str, limit: int) -> Dict[str, Any]:
+        self._cleanup()
+        os.makedirs(self.directory, exist_ok=True)
+        handle = uuid.uuid4().hex
+        with open(self._path(handle), "w", encoding="utf-8") as file:
+            file.write(text)
+
+        preview_chars = min(self.preview_chars, limit)
+        return {
+            "truncated": True,
+            "handle": handle,
+            "total_characters": len(text),
+            "preview": text[:preview_chars],
+            "next_offset": preview_chars,
+            "note": f"The result is too large to return at once. Call {RESULT_PAGE_TOOL} with the handle and next_offset to read more of it.",
+        }
+
+    def read_page(self, handle: str, offset: int = 0, length: int = 5000) -> Dict[str, Any]:
+        """
+        Returns a slice of a spilled result.
+        """
+        path = self._path(handle)
+        if not _HANDLE.fullmatch(handle) or not os.path.exists(path):
+            return {"error": f"Unknown or expired result handle: {handle}"}
+
+        length = max(1, min(length, self.max_result_chars or length))
+        with open(path, "r", encoding="utf-8") as file:
+            # Read up to the offset in chunks instead of loading the whole result
+            remaining = max(offset, 0)
+            while remaining:
+                skipped = len(file.read(min(remaining, 1 << 20)))
+                if not skipped:
+                    break
+                remaining -= skipped
+            content = file.read(length)
+            more = bool(file.read(1))
+
+        next_offset = max(offset, 0) + len(content)
+        return {"handle": handle, "offset": offset, "content": content, "next_offset": next_offset if more else None}
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the result size distribution per tool.
+        """
+        with self._lock:
+            return {
+                name: {**metrics, "sizes": dict(metrics["sizes"])}
+                for name, metrics in self._metrics.items()
+            }
+
+
+result_store = ResultStore()
@@ -1,6 +1,5 @@
 import base64
 import inspect
-import subprocess
 import traceback
 import asyncio
 from typing import List, Dict, Any, Optional, Union, Callable
@@ -57,47 +56,20 @@ async def managed_session(command: str, args: list, env: dict | None = None):
                 pass
 
 
-def install_library_(library):
-    try:
-        result = subprocess.run(
-            ["uv", "pip", "install", library],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        return result.returncode == 0
-    except subprocess.CalledProcessError:
-
-        return False
-
-
-def uninstall_library_(library):
-    try:
-        result = subprocess.run(
-            ["uv", "pip", "uninstall", "-y", library],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        return result.returncode == 0
-    except subprocess.CalledProcessError:
-
-        return False
-    
-
-def add_tool_(function, description: str = "", properties: Dict[str, Any] = None, required: List[str] = None):
+def add_tool_(function, description: str = "", properties: Dict[str, Any] = None, required: List[str] = None, **options):
     """
     Add a tool to the registered functions.
     
     Args:
         function: The function to be registered as a tool
+        options: Execution and caching options passed to the tool decorator
     """
     from ..server.function_tools import tool
     # Apply the tool decorator with empty description
 
 
     
-    decorated_function = tool(description=description, custom_properties=properties, custom_required=required)(function)
+    decorated_function = tool(description=description, custom_properties=properties, custom_required=required, **options)(function)
     return decorated_function
 
     
@@ -118,6 +90,9 @@ from contextlib import asynccontextmanager
 # Create server parameters for stdio connection
 
 from .api import app, timeout
+from .mcp_pool import mcp_session_pool
+from .installs import library_installer
+from .registry_store import PERSIST_TOOLS, resolve_env, tool_registry_store
 
 
 prefix = "/tools"
@@ -127,34 +102,61 @@ class InstallLibraryRequest(BaseModel):
     library: str
 
 
+class InstallLibrariesRequest(BaseModel):
+    libraries: List[str]
+
+
+class InstallStatusRequest(BaseModel):
+    job_id: str
+    log_offset: int = 0
+
+
 
 @app.post(f"{prefix}/install_library")
-@timeout(30.0)
 async def install_library(request: InstallLibraryRequest):
     """
-    Endpoint to install a library.
+    Endpoint to install a library in the background.
 
     Args:
         library: The library to install
 
     Returns:
-        A success message
+        The install job, poll it with /tools/install_status
+    """
+    job = library_installer.submit([request.library])
+    return {"message": "Library install started", **job.to_dict()}
+
+
+@app.post(f"{prefix}/install_libraries")
+async def install_libraries(request: InstallLibrariesRequest):
     """
+    Endpoint to install a set of libraries in one background job.
 
+    Libraries that are already installed are skipped and a running job with the
+    same libraries is returned instead of starting a new one.
+    """
+    job = library_installer.submit(request.libraries)
+    return {"message": "Library install started", **job.to_dict()}
 
-    install_library_(request.library)
 
-    return {"message": "Library installed successfully"}
+@app.post(f"{prefix}/install_status")
+async def install_status(request: InstallStatusRequest):
+    """
+    Endpoint to get the status of an install job and its log lines from log_offset on.
+    """
+    job = library_installer.get(request.job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Install job {request.job_id} not found")
+    return job.to_dict(log_offset=request.log_offset)
 
 
 
 @app.post(f"{prefix}/uninstall_library")
-@timeout(30.0)
 async def uninstall_library(request: InstallLibraryRequest):
     """
     Endpoint to uninstall a library.
     """
-    uninstall_library_(request.library)
+    await library_installer.uninstall(request.library)
     return {"message": "Library uninstalled successfully"}
 
 
@@ -163,20 +165,39 @@ async def uninstall_library(request: InstallLibraryRequest):
 
 class AddToolRequest(BaseModel):
     function: str
+    executor: str = "thread"
+    libraries: List[str] = []
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    memory_limit_mb: Optional[int] = None
+    cacheable: bool = False
+    ttl: Optional[float] = None
+    max_entries: Optional[int] = None
+    max_result_chars: Optional[int] = None
 
 @app.post(f"{prefix}/add_tool")
 @timeout(30.0)
 async def add_tool(request: AddToolRequest):
     """
     Endpoint to add a tool.
+
+    With executor="process" the tool runs in a warm pool of worker processes
+    that have its libraries pre-imported.
     """
     # Cloudpickle the function
     decoded_function = base64.b64decode(request.function)
     deserialized_function = cloudpickle.loads(decoded_function)
 
+    options = request.model_dump(exclude={"function"})
+    add_tool_(deserialized_function, **options)
+
+    if PERSIST_TOOLS:
+        tool_registry_store.save_tool(deserialized_function.__name__, request.function, options)
 
+    if request.executor == "process":
+        from .execution import tool_executor
+        tool_executor.warm_up(request.libraries, request.memory_limit_mb)
 
-    add_tool_(deserialized_function)
     return {"message": "Tool added successfully"}
 
 
@@ -186,11 +207,36 @@ class AddMCPToolRequest(BaseModel):
     command: str
     args: List[str]
     env: Dict[str, str]
+    refresh: bool = False
+
+
+async def add_mcp_tool_(name: str, command: str, args: List[str], env: Dict[str, str], refresh: bool = False):
+    """
+    Add the tools of an MCP server.
+
+    The tool schemas stored for the same launch spec are reused, so the server
+    is not spawned just to list its tools again. Pass refresh=True to list them anyway.
+    """
+    stored = tool_registry_store.get_mcp_server(name) if PERSIST_TOOLS and not refresh else None
+    # The stored spec has the env names only, the values come with this request
+    if stored is not None and (stored["command"], stored["args"], stored["env_keys"]) == (command, args, sorted(env or {})):
+        _register_mcp_tools(name, command, args, env, stored["tools"])
+        return
+
+    listed = await mcp_session_pool.list_tools(command=command, args=args, env=env)
+    tools = [
+        {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+        for tool in listed.tools
+    ]
+    _register_mcp_tools(name, command, args, env, tools)
+
+    if PERSIST_TOOLS:
+        tool_registry_store.save_mcp_server(name, command, args, env, tools)
 
 
-async def add_mcp_tool_(name: str, command: str, args: List[str], env: Dict[str, str]):
+def _register_mcp_tools(name: str, command: str, args: List[str], env: Dict[str, str], tools: List[Dict[str, Any]]):
     """
-    Add a tool.
+    Register proxy functions for the listed tools of an MCP server.
     """
     def get_python_type(schema_type: str, format: Optional[str] = None) -> type:
         """Convert JSON schema type to Python type."""
@@ -204,127 +250,127 @@ async def add_mcp_tool_(name: str, command: str, args: List[str], env: Dict[str,
         }
         return type_mapping.get(schema_type, Any)
 
-    async with managed_session(command=command, args=args, env=env) as session:
-        tools = await session.list_tools()
-
-
-        tools = tools.tools
-        for tool in tools:
-
-            tool_name: str = tool.name
-            tool_desc: str = tool.description
-            input_schema: Dict[str, Any] = tool.inputSchema
-            properties: Dict[str, Dict[str, Any]] = input_schema.get("properties", {})
-            required: List[str] = input_schema.get("required", [])
-
-            def create_tool_function(
-                tool_name: str,
-                properties: Dict[str, Dict[str, Any]],
-                required: List[str],
-            ) -> Callable[..., Dict[str, Any]]:
-                # Create function parameters type annotations
-                annotations = {}
-                defaults = {}
-
-                # First add required parameters
-                for param_name in required:
-                    param_info = properties[param_name]
+    for tool in tools:
+
+        tool_name: str = tool["name"]
+        tool_desc: str = tool["description"]
+        input_schema: Dict[str, Any] = tool["inputSchema"]
+        properties: Dict[str, Dict[str, Any]] = input_schema.get("properties", {})
+        required: List[str] = input_schema.get("required", [])
+
+        def create_tool_function(
+            tool_name: str,
+            properties: Dict[str, Dict[str, Any]],
+            required: List[str],
+        ) -> Callable[..., Dict[str, Any]]:
+            # Create function parameters type annotations
+            annotations = {}
+            defaults = {}
+
+            # First add required parameters
+            for param_name in required:
+                param_info = properties[param_name]
+                param_type = get_python_type(param_info.get("type", "any"))
+                annotations[param_name] = param_type
+
+            # Then add optional parameters
+            for param_name, param_info in properties.items():
+                if param_name not in required:
                     param_type = get_python_type(param_info.get("type", "any"))
                     annotations[param_name] = param_type
-
-                # Then add optional parameters
-                for param_name, param_info in properties.items():
-                    if param_name not in required:
-                        param_type = get_python_type(param_info.get("type", "any"))
-                        annotations[param_name] = param_type
-                        defaults[param_name] = param_info.get("default", None)
-
-                # Create the signature parameters
-                from inspect import Parameter, Signature
-                
-                parameters = []
-                # Add required parameters first
-                for param_name in required:
-                    param_type = annotations[param_name]
+                    defaults[param_name] = param_info.get("default", None)
+
+            # Create the signature parameters
+            from inspect import Parameter, Signature
+            
+            parameters = []
+            # Add required parameters first
+            for param_name in required:
+                param_type = annotations[param_name]
+                parameters.append(
+                    Parameter(
+                        name=param_name,
+                        kind=Parameter.POSITIONAL_OR_KEYWORD,
+                        annotation=param_type
+                    )
+                )
+            
+            # Add optional parameters
+            for param_name, param_type in annotations.items():
+                if param_name not in required:
                     parameters.append(
                         Parameter(
                             name=param_name,
                             kind=Parameter.POSITIONAL_OR_KEYWORD,
-                            annotation=param_type
+                            annotation=param_type,
+                            default=defaults[param_name]
                         )
                     )
-                
-                # Add optional parameters
-                for param_name, param_type in annotations.items():
-                    if param_name not in required:
-                        parameters.append(
-                            Parameter(
-                                name=param_name,
-                                kind=Parameter.POSITIONAL_OR_KEYWORD,
-                                annotation=param_type,
-                                default=defaults[param_name]
-                            )
-                        )
 
-                async def tool_function(*args: Any, **kwargs: Any) -> Dict[str, Any]:
-                    # Convert positional args to kwargs
-                    if len(args) > len(required):
-                        raise TypeError(
-                            f"{tool_name}() takes {len(required)} positional arguments but {len(args)} were given"
-                        )
+            async def tool_function(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+                # Convert positional args to kwargs
+                if len(args) > len(required):
+                    raise TypeError(
+                        f"{tool_name}() takes {len(required)} positional arguments but {len(args)} were given"
+                    )
 
-                    # Combine positional args with kwargs
-                    all_kwargs = kwargs.copy()
-                    for i, arg in enumerate(args):
-                        if i < len(required):
-                            all_kwargs[required[i]] = arg
-
-                    # Validate required parameters
-                    for req in required:
-                        if req not in all_kwargs:
-                            raise ValueError(f"Missing required parameter: {req}")
-
-                    # Add defaults for optional parameters
-                    for param, default in defaults.items():
-                        if param not in all_kwargs:
-                            all_kwargs[param] = default
-
-                    async with managed_session(command=tool_function.command, args=tool_function.args, env=tool_function.env) as new_session:
-                        # Remove None kwargs
-                        all_kwargs = {k: v for k, v in all_kwargs.items() if v is not None}
-                        result = await new_session.call_tool(name=tool_name, arguments=all_kwargs)
-                        return {"result": result}
-
-                # Set function name and annotations
-                tool_function.__name__ = tool_name
-                tool_function.__annotations__ = {
-                    **annotations,
-                    "return": Dict[str, Any],
-                }
-                tool_function.__doc__ = f"{tool_desc}\n\nReturns:\n    Tool execution results"
-
-                # Create and set the signature
-                tool_function.__signature__ = Signature(
-                    parameters=parameters,
-                    return_annotation=Dict[str, Any]
+                # Combine positional args with kwargs
+                all_kwargs = kwargs.copy()
+                for i, arg in enumerate(args):
+                    if i < len(required):
+                        all_kwargs[required[i]] = arg
+
+                # Validate required parameters
+                for req in required:
+                    if req not in all_kwargs:
+                        raise ValueError(f"Missing required parameter: {req}")
+
+                # Add defaults for optional parameters
+                for param, default in defaults.items():
+                    if param not in all_kwargs:
+                        all_kwargs[param] = default
+
+                # Remove None kwargs
+                all_kwargs = {k: v for k, v in all_kwargs.items() if v is not None}
+                result = await mcp_session_pool.call_tool(
+                    command=tool_function.command,
+                    args=tool_function.args,
+                    env=tool_function.env,
+                    name=tool_name,
+                    arguments=all_kwargs,
                 )
+                return {"result": result}
 
-                # Store session parameters as attributes of the function
-                tool_function.command = command
-                tool_function.args = args
-                tool_function.env = env
+            # Set function name and annotations
+            tool_function.__name__ = tool_name
+            tool_function.__annotations__ = {
+                **annotations,
+                "return": Dict[str, Any],
+            }
+            tool_function.__doc__ = f"{tool_desc}\n\nReturns:\n    Tool execution results"
 
-                return tool_function
+            # Create and set the signature
+            tool_function.__signature__ = Signature(
+                parameters=parameters,
+                return_annotation=Dict[str, Any]
+            )
 
-            # Create function with proper annotations
-            func = create_tool_function(tool_name, properties, required)
-            #name should be name__function_name
-            full_name = f"{name}__{tool_name}"
-            func.__name__ = full_name
+            # Store session parameters as attributes of the function
+            tool_function.command = command
+            tool_function.args = args
+            tool_function.env = env
 
+            return tool_function
 
+        # Create function with proper annotations
+        func = create_tool_function(tool_name, properties, required)
+        #name should be name__function_name
+        full_name = f"{name}__{tool_name}"
+        func.__name__ = full_name
 
-            add_tool_(func, description=tool_desc, properties=properties, required=required)
+
+
+        add_tool_(func, description=tool_desc, properties=properties, required=required)
 
 
 @app.post(f"{prefix}/add_mcp_tool")
@@ -333,5 +379,58 @@ async def add_mcp_tool(request: AddMCPToolRequest):
     """
     Endpoint to add a tool.
     """
-    await add_mcp_tool_(request.name, request.command, request.args, request.env)
-    return {"message": "Tool added successfully"}
\ No newline at end of file
+    await add_mcp_tool_(request.name, request.command, request.args, request.env, refresh=request.refresh)
+    return {"message": "Tool added successfully"}
+
+
+@app.get(f"{prefix}/mcp_sessions")
+async def mcp_sessions():
+    """
+    Endpoint to get the MCP session pool metrics (spawned vs reused sessions).
+    """
+    return {"servers": mcp_session_pool.metrics()}
+
+
+@app.on_event("shutdown")
+async def close_mcp_sessions():
+    await mcp_session_pool.close()
+
+
+def restore_tools(store=None) -> Dict[str, Any]:
+    """
+    Re-registers the tools and MCP servers added to earlier runs of the tools server.
+
+    Tools whose function can not be loaded anymore, e.g. because a library is
+    missing, are skipped and kept in the store for the next start.
+
+    Returns:
+        {"tools": ..., "mcp_servers": ..., "failed": [...]}
+    """
+    store = store or tool_registry_store
+    restored = {"tools": 0, "mcp_servers": 0, "failed": []}
+
+    for name, entry in store.tools().items():
+        try:
+            function = cloudpickle.loads(base64.b64decode(entry["function"]))
+            add_tool_(function, **entry["options"])
+            restored["tools"] += 1
+        except Exception:
+            traceback.print_exc()
+            restored["failed"].append(name)
+
+    for name, spec in store.mcp_servers().items():
+        try:
+            _register_mcp_tools(name, spec["command"], spec["args"], resolve_env(spec), spec["tools"])
+            restored["mcp_servers"] += 1
+        except Exception:
+            traceback.print_exc()
+            restored["failed"].append(name)
+
+    return restored
+
+
+@app.on_event("startup")
+async def restore_persisted_tools():
+    # On startup rather than on import, so importing the module registers nothing
+    if PERSIST_TOOLS:
+        restore_tools()
@@ -0,0 +1,351 @@
+"""
+Bounded website fetching and content extraction for the Search tools.
+
+Pages are downloaded through a pooled requests session with connect/read
+timeouts and a byte cap, so a huge page costs at most VOLAIR_WEB_MAX_BYTES.
+Responses are kept in a small local cache and revalidated with conditional
+GET (ETag / Last-Modified). HTML is parsed with selectolax or lxml when one of
+them is installed (`pip install volairframework[web]`), html.parser otherwise.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+CONNECT_TIMEOUT = float(os.getenv("VOLAIR_WEB_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("VOLAIR_WEB_READ_TIMEOUT", "15"))
+MAX_BYTES = int(os.getenv("VOLAIR_WEB_MAX_BYTES", str(2 * 1024 * 1024)))
+RESPONSE_CACHE_SIZE = int(os.getenv("VOLAIR_WEB_CACHE_SIZE", "256"))
+
+META_PROPERTIES = [
+    "og:description",
+    "og:site_name",
+    "og:title",
+    "og:type",
+    "og:url",
+    "description",
+    "keywords",
+    "author",
+]
+
+USER_AGENT = "Mozilla/5.0 (compatible; VolairFramework/1.0)"
+
+
+class FetchedPage:
+    def __init__(self, url: str, body: bytes, encoding: Optional[str], truncated: bool, headers: Dict[str, str]):
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.truncated = truncated
+        self.headers = headers
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+
+class WebFetcher:
+    """
+    Fetches pages with a shared connection pool, timeouts, a byte cap and a
+    conditional-GET response cache.
+
+    Args:
+        pool_size: Connections kept per host.
+        connect_timeout: Seconds to wait for a connection.
+        read_timeout: Seconds to wait between bytes of the response.
+        max_bytes: Bytes of the body downloaded at most.
+        cache_size: Number of responses kept for revalidation.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 32,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        max_bytes: int = MAX_BYTES,
+        cache_size: int = RESPONSE_CACHE_SIZE,
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, FetchedPage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, url: str) -> Optional[FetchedPage]:
+        with self._lock:
+            page = self._cache.get(url)
+            if page is not None:
+                self._cache.move_to_end(url)
+            return page
+
+    def _remember(self, url: str, page: FetchedPage) -> None:
+        if not (page.headers.get("ETag") or page.headers.get("Last-Modified")):
+            return
+        with self._lock:
+            self._cache[url] = page
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def fetch(self, url: str, max_bytes: Optional[int] = None) -> FetchedPage:
+        """
+        Downloads a page, stopping after max_bytes of body.
+
+        Raises:
+            requests.RequestException: If the request fails or times out.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        cached = self._cached(url)
+
+        headers = {}
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached is not None:
+                return cached
+            response.raise_for_status()
+
+            chunks = []
+            size = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    truncated = True
+                    break
+
+            body = b"".join(chunks)[:max_bytes]
+            page = FetchedPage(
+                url=response.url,
+                body=body,
+                encoding=response.encoding,
+                truncated=truncated,
+                headers={name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers},
+            )
+
+        if not truncated:
+            self._remember(url, page)
+        return page
+
+
+def _clean_text(content: str, max_content_length: int) -> str:
+    content = re.sub(r"[\n\r\t]+", "\n", content)
+    content = re.sub(r" +", " ", content)
+    content = re.sub(r"[\n ]{3,}", "\n\n", content)
+    content = content.strip()
+
+    if len(content) > max_content_length:
+        content = content[:max_content_length].rsplit(" ", 1)[0] + "..."
+    return content
+
+
+def _extract_with_selectolax(html: str, url: str, max_links: int) -> Tuple[Dict[str, str], str, str, List[Dict[str, str]]]:
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+
+    meta = {}
+    for tag in tree.css("meta"):
+        attributes = tag.attributes
+        name = attributes.get("property") or attributes.get("name")
+        if name in META_PROPERTIES and name not in meta:
+            meta[name] = attributes.get("content") or ""
+
+    for tag in tree.css("script, style"):
+        tag.decompose()
+
+    title_tag = tree.css_first("title")
+    title = title_tag.text(strip=True) if title_tag else ""
+    content = tree.body.text(separator="\n") if tree.body else ""
+
+    links = []
+    for tag in tree.css("a[href]") if max_links else []:
+        if len(links) >= max_links:
+            break
+        links.append({"title": tag.text(strip=True), "link": urljoin(url, tag.attributes.get("href") or "")})
+
+    return meta, title, content, links
+
+
+def _extract_with_soup(html: str, url: str, max_links: int) -> Tuple[Dict[str, str], str, str, List[Dict[str, str]]]:
+    from bs4 import BeautifulSoup
+
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except Exception:
+        soup = BeautifulSoup(html, "html.parser")
+
+    meta = {}
+    for property_name in META_PROPERTIES:
+        tag = soup.find("meta", property=property_name) or soup.find(
+            "meta", attrs={"name": property_name}
+        )
+        if tag:
+            meta[property_name] = tag.get("content", "")
+
+    for ignore_tag in soup(["script", "style"]):
+        ignore_tag.decompose()
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else ""
+    content = soup.body.get_text(separator="\n") if soup.body else ""
+
+    links = []
+    for a in soup.find_all("a", href=True, limit=max_links) if max_links else []:
+        links.append({"title": a.text.strip(), "link": urljoin(url, a["href"])})
+
+    return meta, title, content, links
+
+
+def extract_page(html: str, url: str, max_content_length: int = 5000, max_links: int = 50) -> Dict[str, Any]:
+    """
+    Extracts the meta data, title, text and links of an HTML page.
+
+    Args:
+        html: The page source.
+        url: The page URL, used to resolve relative links.
+        max_content_length: Characters of text returned at most.
+        max_links: Links returned at most.
+
+    Returns:
+        {"meta": ..., "title": ..., "content": ..., "sub_links": [...]}
+    """
+    try:
+        meta, title, content, links = _extract_with_selectolax(html, url, max_links)
+    except ImportError:
+        meta, title, content, links = _extract_with_soup(html, url, max_links)
+
+    return {"meta": meta, "title": title, "content": _clean_text(content, max_content_length), "sub_links": links}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes a URL so the same page found through different links compares equal.
+
+    Lowercases the scheme and host, drops the fragment, default ports, tracking
+    parameters and a trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in ("gclid", "fbclid")
+    ]
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower() or "http", host, path, urlencode(sorted(query)), ""))
+
+
+def _fit_to_budget(lengths: List[int], budget: int) -> List[int]:
+    """
+    Splits a character budget over pages, giving short pages all they need and
+    sharing the rest equally among the long ones.
+    """
+    limits = [0] * len(lengths)
+    remaining = budget
+    pending = sorted(range(len(lengths)), key=lambda index: lengths[index])
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        limits[index] = min(lengths[index], share)
+        remaining -= limits[index]
+    return limits
+
+
+def read_pages(
+    urls: List[str],
+    max_total_characters: int = 20000,
+    max_workers: int = 8,
+    max_pages: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches and extracts pages concurrently and returns compact summaries.
+
+    Args:
+        urls: Page URLs, duplicates by canonical URL are read once.
+        max_total_characters: Characters of content returned over all pages.
+        max_workers: Pages fetched at once.
+        max_pages: Unique pages read at most.
+
+    Returns:
+        One {"url", "title", "description", "content"} or {"url", "error"} dict per unique page, in input order.
+    """
+    unique_urls = []
+    seen = set()
+    for url in urls:
+        key = canonical_url(url)
+        if key not in seen:
+            seen.add(key)
+            unique_urls.append(url)
+    unique_urls = unique_urls[:max_pages]
+
+    def read(url: str) -> Dict[str, Any]:
+        try:
+            page = web_fetcher.fetch(url)
+            extracted = extract_page(page.text, page.url, max_content_length=max_total_characters, max_links=0)
+        except Exception as e:
+            return {"url": url, "error": f"Failed to retrieve the website content: {e}"}
+        return {
+            "url": url,
+            "title": extracted["title"],
+            "description": extracted["meta"].get("description") or extracted["meta"].get("og:description", ""),
+            "content": extracted["content"],
+        }
+
+    if not unique_urls:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_urls)))) as pool:
+        pages = list(pool.map(read, unique_urls))
+
+    readable = [page for page in pages if "content" in page]
+    limits = _fit_to_budget([len(page["content"]) for page in readable], max_total_characters)
+    for page, limit in zip(readable, limits):
+        if len(page["content"]) > limit:
+            page["content"] = page["content"][:limit].rsplit(" ", 1)[0] + "..."
+    return pages
+
+
+def fit_result_size(result: Any, pages: List[Dict[str, Any]], max_characters: int) -> None:
+    """
+    Shortens the page contents until the JSON of the whole result, titles,
+    descriptions and URLs included, is at most max_characters long.
+    """
+    for _ in range(5):
+        excess = len(json.dumps(result, ensure_ascii=False, default=str)) - max_characters
+        readable = [page for page in pages if page.get("content")]
+        if excess <= 0 or not readable:
+            return
+        lengths = [len(page["content"]) for page in readable]
+        # Room for the "..." of every cut page and the escaping of the JSON
+        budget = max(sum(lengths) - excess - 4 * len(readable), 0)
+        for page, limit in zip(readable, _fit_to_budget(lengths, budget)):
+            if len(page["content"]) > limit:
+                page["content"] = page["content"][:limit].rsplit(" ", 1)[0] + "..."
+        if not budget:
+            return
+
+
+web_fetcher = WebFetcher()
@@ -2,13 +2,15 @@ import base64
 import httpx
 from typing import Dict, List, Any, Callable, Optional
 
+from .transport import TOOLS_SERVER_URL, http_client
+
 
 class ToolManager:
     """Client for interacting with the Volair Functions API."""
 
     def __init__(self):
         """Initialize the Volair Function client."""
-        self.base_url = "http://localhost:8086"
+        self.base_url = TOOLS_SERVER_URL
 
 
     def __enter__(self):
@@ -25,28 +27,51 @@ class ToolManager:
 
     def install_library(self, library: str) -> Dict[str, Any]:
         """
-        Call a specific tool with the given arguments.
+        Start a background install of a library.
+
+        Args:
+            library: The library requirement, e.g. "pandas>=2"
+
+        Returns:
+            The install job
+        """
+        return self.install_libraries([library])
+
+    def install_libraries(self, libraries: List[str]) -> Dict[str, Any]:
+        """
+        Start a background install of a set of libraries in one batch.
 
         Args:
-            tool_name: Name of the tool to call
-            arguments: Dictionary of arguments to pass to the tool
+            libraries: The library requirements
 
         Returns:
-            Tool execution results
+            The install job
         """
-        with httpx.Client(timeout=600.0) as session:
+        with http_client() as session:
             response = session.post(
-                f"{self.base_url}/tools/install_library",
-                json={"library": library},
+                f"{self.base_url}/tools/install_libraries",
+                json={"libraries": libraries},
             )
             response.raise_for_status()
             return response.json()
-        
+
+    def install_status(self, job_id: str, log_offset: int = 0) -> Dict[str, Any]:
+        """
+        Get the status of an install job and its log lines from log_offset on.
+        """
+        with http_client() as session:
+            response = session.post(
+                f"{self.base_url}/tools/install_status",
+                json={"job_id": job_id, "log_offset": log_offset},
+            )
+            response.raise_for_status()
+            return response.json()
+
     def uninstall_library(self, library: str) -> Dict[str, Any]:
         """
         Uninstall a library.
         """
-        with httpx.Client(timeout=600.0) as session:
+        with http_client() as session:
             response = session.post(
                 f"{self.base_url}/tools/uninstall_library",
                 json={"library": library},
@@ -57,14 +82,19 @@ class ToolManager:
 
 
 
-    def add_tool(self, function) -> Dict[str, Any]:
+    def add_tool(self, function, **options) -> Dict[str, Any]:
         """
         Add a tool.
+
+        Args:
+            function: The base64 encoded cloudpickled function
+            options: Execution and caching options (executor, libraries, max_concurrency, timeout,
+                memory_limit_mb, cacheable, ttl, max_entries, max_result_chars)
         """
-        with httpx.Client(timeout=600.0) as session:
+        with http_client() as session:
             response = session.post(
                 f"{self.base_url}/tools/add_tool",
-                json={"function": function},
+                json={"function": function, **options},
             )
             response.raise_for_status()
             return response.json()
@@ -74,7 +104,7 @@ class ToolManager:
         """
         Add a tool.
         """
-        with httpx.Client(timeout=600.0) as session:
+        with http_client() as session:
             response = session.post(
                 f"{self.base_url}/tools/add_mcp_tool",
                 json={"name": name, "command": command, "args": args, "env": env},
@@ -0,0 +1,131 @@
+"""
+How the main server reaches the tools server.
+
+By default the tools server is a separate process at VOLAIR_TOOLS_SERVER_URL
+(http://localhost:8086). With VOLAIR_TOOLS_SERVER_MODE=inprocess the tools app
+runs inside the main server process instead: it gets its own event loop thread,
+tool calls go straight to the registry and the remaining endpoints are served
+through an ASGI transport, so no TCP connection or JSON round trip is involved.
+
+Agent tool calls are async and share one keep-alive connection pool.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOOLS_SERVER_URL = os.getenv("VOLAIR_TOOLS_SERVER_URL", "http://localhost:8086").rstrip("/")
+IN_PROCESS = os.getenv("VOLAIR_TOOLS_SERVER_MODE", "http").lower() == "inprocess"
+
+
+MAX_CONNECTIONS = int(os.getenv("VOLAIR_TOOLS_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("VOLAIR_TOOLS_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("VOLAIR_TOOLS_KEEPALIVE_EXPIRY", "30"))
+
+# Built-in tool that pages through results too large to return at once
+RESULT_PAGE_TOOL = "Results__read_page"
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="volair-tools-loop", daemon=True)
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def tools_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop that talks to the tools server, starting it on first use.
+
+    Agents run on short-lived event loops of their own, so the shared
+    keep-alive client lives here. In-process, the tools app runs here too:
+    tool executor semaphores and pooled MCP sessions are bound to one loop.
+    """
+    if IN_PROCESS:
+        # Register the tool endpoints and built-in tools
+        from . import server  # noqa: F401
+    return _background_loop()
+
+
+def run_in_tools_loop(coroutine: Awaitable[Any]) -> Any:
+    """
+    Runs a coroutine on the tools loop and waits for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, tools_loop()).result()
+
+
+async def run_in_tools_loop_async(coroutine: Awaitable[Any]) -> Any:
+    """
+    Awaits a coroutine on the tools loop from another event loop.
+    """
+    loop = tools_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coroutine
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+
+async def post_async(url: str, timeout: float = 600.0, **kwargs: Any) -> httpx.Response:
+    """
+    Sends a POST to the tools server over the shared keep-alive connection pool.
+
+    The pool size is set with VOLAIR_TOOLS_MAX_CONNECTIONS,
+    VOLAIR_TOOLS_MAX_KEEPALIVE_CONNECTIONS and VOLAIR_TOOLS_KEEPALIVE_EXPIRY.
+    """
+    async def send():
+        global _async_client
+        if _async_client is None:
+            limits = httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            )
+            _async_client = httpx.AsyncClient(limits=limits)
+        response = await _async_client.post(url, timeout=timeout, **kwargs)
+        await response.aread()
+        return response
+
+    return await run_in_tools_loop_async(send())
+
+
+class InProcessTransport(httpx.BaseTransport):
+    """
+    Sync httpx transport that serves requests with the in-process tools app.
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        from .server.api import app
+
+        # Compressing a body that never leaves the process is wasted work
+        request.headers["Accept-Encoding"] = "identity"
+
+        async def send():
+            response = await httpx.ASGITransport(app=app).handle_async_request(request)
+            body = b"".join([part async for part in response.stream])
+            return response.status_code, response.headers, body
+
+        status_code, headers, body = run_in_tools_loop(send())
+        return httpx.Response(status_code, headers=headers, content=body, request=request)
+
+
+def http_client(timeout: float = 600.0) -> httpx.Client:
+    """
+    Returns a client for the tools server, in-process when co-located.
+    """
+    if IN_PROCESS:
+        return httpx.Client(timeout=timeout, transport=InProcessTransport())
+    return httpx.Client(timeout=timeout)
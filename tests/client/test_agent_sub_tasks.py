@@ -0,0 +1,25 @@
+from volairframework.client.level_two.agent import Agent, SubTask, SubTaskList, _ancestors
+from volairframework.client.tasks.tasks import Task
+
+
+class PlanningAgent(Agent):
+    def call(self, task, llm_model=None):
+        task._response = SubTaskList(sub_tasks=[
+            SubTask(description="Research A", sources_can_be_used=[], required_output="", tools=[]),
+            SubTask(description="Research B", sources_can_be_used=[], required_output="", tools=[]),
+            # Forward, self and unknown references are dropped
+            SubTask(description="Compare", sources_can_be_used=[], required_output="", tools=[], depends_on=[1, 2, 3, 7]),
+        ])
+
+
+def test_plan_sub_tasks_dependencies():
+    sub_tasks, dependencies = PlanningAgent().plan_sub_tasks(Task(description="Compare A and B"))
+
+    assert [task.description for task in sub_tasks][-1] == "Compare A and B"
+    assert dependencies == {0: [], 1: [], 2: [0, 1], 3: [0, 1, 2]}
+
+
+def test_ancestors():
+    dependencies = {0: [], 1: [0], 2: [1], 3: [2], 4: []}
+    assert _ancestors(dependencies, 3) == [0, 1, 2]
+    assert _ancestors(dependencies, 4) == []
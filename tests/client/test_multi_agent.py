@@ -0,0 +1,77 @@
+import threading
+import time
+
+from volairframework.client.agent_configuration.agent_configuration import AgentConfiguration
+from volairframework.client.level_two.agent import Agent
+from volairframework.client.tasks.tasks import Task
+
+
+class RoutingAgent(Agent):
+    default_llm_model = "openai/gpt-4o"
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.routing_calls = 0
+        self.running = {}
+        self.max_running = {}
+        self.lock = threading.Lock()
+
+    def call(self, task, llm_model=None):
+        self.routing_calls += 1
+        response_format = task.response_format
+        if response_format.__name__ == "TaskAssignments":
+            task._response = response_format(assignments=[
+                {"task_number": 1, "selected_agent": self.keys[0]},
+                {"task_number": 2, "selected_agent": self.keys[1]},
+                {"task_number": 3, "selected_agent": "Unknown agent"},
+                {"task_number": 4, "selected_agent": self.keys[1]},
+            ])
+        else:
+            task._response = response_format(selected_agent=self.keys[0])
+
+    def agent(self, agent_configuration, task, llm_model=None):
+        key = agent_configuration.job_title
+        with self.lock:
+            self.running[key] = self.running.get(key, 0) + 1
+            self.max_running[key] = max(self.max_running.get(key, 0), self.running[key])
+        time.sleep(0.1)
+        with self.lock:
+            self.running[key] -= 1
+        return {"input_tokens": 100, "output_tokens": 10}
+
+
+def test_multi_agent_routes_in_one_call_and_runs_agents_concurrently():
+    agents = [
+        AgentConfiguration(job_title="Researcher", company_url="u", company_objective="o"),
+        AgentConfiguration(job_title="Writer", company_url="u", company_objective="o"),
+    ]
+    keys = [agent.agent_id[:5] + "_" + agent.job_title for agent in agents]
+    client = RoutingAgent(keys)
+    tasks = [Task(description=f"Task {number}") for number in range(1, 5)]
+
+    start = time.time()
+    results = client.multi_agent_with_usage(agents, tasks)
+    elapsed = time.time() - start
+
+    # One batched routing call plus one retry for the invalid assignment
+    assert client.routing_calls == 2
+    assert [task.description for task in results[keys[0]]["tasks"]] == ["Task 1", "Task 3"]
+    assert [task.description for task in results[keys[1]]["tasks"]] == ["Task 2", "Task 4"]
+    assert results[keys[0]]["input_tokens"] == 200
+    assert results[keys[0]]["time"] >= 0.2
+    assert client.max_running == {"Researcher": 1, "Writer": 1}
+    assert elapsed < 0.35
+
+
+def test_multi_agent_returns_the_agent_configurations():
+    agents = [
+        AgentConfiguration(job_title="Researcher", company_url="u", company_objective="o"),
+        AgentConfiguration(job_title="Writer", company_url="u", company_objective="o"),
+    ]
+    keys = [agent.agent_id[:5] + "_" + agent.job_title for agent in agents]
+    tasks = [Task(description=f"Task {number}") for number in range(1, 5)]
+
+    results = RoutingAgent(keys).multi_agent(agents, tasks)
+
+    assert results == dict(zip(keys, agents))
+    assert results[keys[1]].job_title == "Writer"
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from volairframework.client.level_utilized.pipeline import Stage, run_pipeline
+
+
+def sleeper(seconds, value):
+    def run():
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def test_independent_stages_overlap():
+    result = run_pipeline([
+        Stage("characterization", sleeper(0.3, "c")),
+        Stage("knowledge_base", sleeper(0.2, "k")),
+        Stage("sub_tasks", sleeper(0.2, "s")),
+    ])
+
+    assert result.results == {"characterization": "c", "knowledge_base": "k", "sub_tasks": "s"}
+    assert result.total_time < 0.5
+    assert result.critical_path == ["characterization"]
+    assert set(result.timings["sub_tasks"]) == {"start", "end", "duration"}
+
+
+def test_dependencies_and_critical_path():
+    order = []
+
+    def step(name, seconds):
+        def run():
+            time.sleep(seconds)
+            order.append(name)
+            return name
+        return run
+
+    result = run_pipeline([
+        Stage("search", step("search", 0.1)),
+        Stage("read", step("read", 0.2), depends_on=["search"]),
+        Stage("notes", step("notes", 0.05)),
+        Stage("report", step("report", 0.05), depends_on=["read", "notes"]),
+    ], max_workers=2)
+
+    assert order.index("search") < order.index("read") < order.index("report")
+    assert result.critical_path == ["search", "read", "report"]
+    assert result.critical_path_time == pytest.approx(0.35, abs=0.1)
+
+
+def test_failure_stops_dependent_stages():
+    ran = []
+
+    def fail():
+        raise RuntimeError("planning failed")
+
+    with pytest.raises(RuntimeError):
+        run_pipeline([Stage("plan", fail), Stage("run", lambda: ran.append(True), depends_on=["plan"])])
+    assert ran == []
+
+
+def test_invalid_graphs():
+    with pytest.raises(ValueError):
+        run_pipeline([Stage("a", lambda: 1, depends_on=["missing"])])
+    with pytest.raises(ValueError):
+        run_pipeline([Stage("a", lambda: 1, depends_on=["b"]), Stage("b", lambda: 2, depends_on=["a"])])
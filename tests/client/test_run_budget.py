@@ -0,0 +1,112 @@
+from volairframework.client.agent_configuration.agent_configuration import AgentConfiguration
+from volairframework.client.level_two.agent import Agent, Characterization, CompanyObjective, HumanObjective, SearchResult, SubTask, SubTaskList
+from volairframework.client.level_utilized.budget import RunBudget
+from volairframework.client.level_utilized.pipeline import Stage, run_pipeline
+from volairframework.client.tasks.tasks import Task
+
+
+def test_shares_split_what_is_left():
+    budget = RunBudget(max_tokens=900, tasks=3)
+
+    first = budget.reserve()
+    assert first["max_tokens"] == 300
+    budget.release(first, {"input_tokens": 100, "output_tokens": 0}, "openai/gpt-4o")
+
+    # The unused part of the first share goes to the others
+    assert budget.reserve()["max_tokens"] == 400
+
+
+def test_concurrent_shares_stay_within_the_budget():
+    budget = RunBudget(max_tokens=100, tasks=2)
+    assert budget.reserve()["max_tokens"] + budget.reserve()["max_tokens"] <= 100
+    assert budget.reserve() is None
+    assert budget.exhausted
+
+
+def test_lowest_limits_win():
+    budget = RunBudget.of(AgentConfiguration(job_title="t", company_url="u", company_objective="o", max_tokens=500), Task(description="d", max_tokens=200, max_cost=0.5))
+    assert (budget.max_tokens, budget.max_cost) == (200, 0.5)
+
+
+class BudgetAgent(Agent):
+    default_llm_model = "openai/gpt-4o"
+
+    def __init__(self):
+        self.sent = []
+
+    def prepare_agent(self, agent_configuration, task, llm_model=None, budget=None):
+        characterization = Characterization(website_content=None, company_objective=None, human_objective=None)
+        sub_tasks = [Task(description="Research"), Task(description="Write")]
+        return run_pipeline([
+            Stage("characterization", lambda: characterization),
+            Stage("sub_tasks", lambda: (sub_tasks, {0: [], 1: [0]})),
+        ])
+
+    def agent_(self, agent_configuration, task, llm_model=None, budget=None):
+        self.sent.append((task.description, budget))
+        task._response = "done"
+        return [{"result": "done", "llm_model": "openai/gpt-4o", "response_format": "str", "usage": {"input_tokens": 1000, "output_tokens": 0}, "tool_count": 0, "context_count": 0, "time": 0.0, "status": "completed"}]
+
+
+def test_agent_stops_sending_sub_tasks_when_the_budget_is_spent():
+    agent_configuration = AgentConfiguration(job_title="t", company_url="u", company_objective="o", max_tokens=1000)
+    client = BudgetAgent()
+    task = Task(description="Write")
+
+    summary = client.agent(agent_configuration, task)
+
+    assert client.sent == [("Research", {"max_tokens": 500, "max_cost": None})]
+    assert task.response is None
+    assert summary["status"] == "budget_exhausted"
+    assert summary["budget"]["spent_tokens"] == 1000
+    assert summary["partial_results"] == [{"task": "Research", "result": "done"}]
+
+
+class PreparingAgent(BudgetAgent):
+    """
+    Runs the real preparation stages with fake model calls.
+    """
+
+    prepare_agent = Agent.prepare_agent
+
+    def __init__(self, preparation_tokens):
+        super().__init__()
+        self.preparation_tokens = preparation_tokens
+        self.calls = []
+
+    def call(self, task, llm_model=None):
+        self.calls.append(task.response_format.__name__)
+        responses = {
+            SearchResult: lambda: SearchResult(any_customers=True, products=[], services=[], potential_competitors=[]),
+            CompanyObjective: lambda: CompanyObjective(objective="o", goals=[], state="s"),
+            HumanObjective: lambda: HumanObjective(job_title="t", job_description="d", job_goals=[]),
+            SubTaskList: lambda: SubTaskList(sub_tasks=[SubTask(description="Research", sources_can_be_used=[], required_output="", tools=[])]),
+        }
+        task._response = responses[task.response_format]()
+        task._usage = {"input_tokens": self.preparation_tokens, "output_tokens": 0}
+
+
+def test_preparation_calls_are_charged_to_the_budget():
+    agent_configuration = AgentConfiguration(job_title="t", company_url="u", company_objective="o", caching=False, max_tokens=10000)
+    client = PreparingAgent(preparation_tokens=1000)
+
+    summary = client.agent(agent_configuration, Task(description="Write"))
+
+    # Three characterization calls and the planning call come first
+    assert client.calls == ["SearchResult", "CompanyObjective", "HumanObjective", "SubTaskList"]
+    # The two sub-tasks share what the preparation left, the second one also
+    # gets what the first one did not use
+    assert [budget["max_tokens"] for _, budget in client.sent] == [3000, 5000]
+    assert summary["budget"]["spent_tokens"] == 4000 + 2000
+
+
+def test_planning_is_skipped_when_the_preparation_spent_the_budget():
+    agent_configuration = AgentConfiguration(job_title="t", company_url="u", company_objective="o", caching=False, max_tokens=2500)
+    client = PreparingAgent(preparation_tokens=1000)
+
+    summary = client.agent(agent_configuration, Task(description="Write"))
+
+    assert "SubTaskList" not in client.calls
+    assert client.sent == []
+    assert summary["status"] == "budget_exhausted"
+    assert summary["budget"]["spent_tokens"] == 3000
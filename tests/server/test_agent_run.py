@@ -0,0 +1,116 @@
+import base64
+import json
+import threading
+
+import cloudpickle
+import pytest
+from fastapi.testclient import TestClient
+
+from volairframework.client.agent_configuration.agent_configuration import AgentConfiguration
+from volairframework.client.knowledge_base.knowledge_base import KnowledgeBase, KnowledgeBaseMarkdown
+from volairframework.client.level_two import agent as client_agent
+from volairframework.client.tasks.tasks import Task
+from volairframework.server.api import app
+from volairframework.server.level_two import orchestration
+from volairframework.server.level_two.server import server as level_two_server
+
+client = TestClient(app)
+
+USAGE = {"input_tokens": 10, "output_tokens": 5}
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    calls = {"call": [], "agent": []}
+
+    def fake_gpt4o(prompt, response_format, tools, context, llm_model, system_prompt, *options):
+        calls["call"].append(prompt)
+        responses = {
+            client_agent.SearchResult: client_agent.SearchResult(any_customers=True, products=[], services=[], potential_competitors=[]),
+            client_agent.CompanyObjective: client_agent.CompanyObjective(objective="o", goals=[], state="s"),
+            client_agent.HumanObjective: client_agent.HumanObjective(job_title="t", job_description="d", job_goals=[]),
+        }
+        return {"status_code": 200, "result": responses[response_format], "usage": USAGE}
+
+    def fake_agent(agent_id, prompt, response_format, tools, context, llm_model, system_prompt, retries, context_compress, memory, parallel_tool_calls=False, **options):
+        calls["agent"].append({"prompt": prompt, "context": context})
+        return {"status_code": 200, "result": f"done: {prompt}", "usage": USAGE}
+
+    monkeypatch.setattr(orchestration, "run_sync_gpt4o", fake_gpt4o)
+    monkeypatch.setattr(level_two_server, "run_sync_agent", fake_agent)
+    return calls
+
+
+def run(agent_configuration, task, files=None):
+    data = {
+        "agent_configuration": base64.b64encode(cloudpickle.dumps(agent_configuration)).decode("utf-8"),
+        "task": base64.b64encode(cloudpickle.dumps(task)).decode("utf-8"),
+        "llm_model": "openai/gpt-4o",
+        "files": files or {},
+    }
+    with client.stream("POST", "/level_two/agent_run", json=data) as response:
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_agent_run_streams_progress_and_result(model_calls):
+    agent_configuration = AgentConfiguration(
+        job_title="Writer",
+        company_url="https://example.com",
+        company_objective="Write",
+        sub_task=False,
+        caching=False,
+        knowledge_base=KnowledgeBase(sources=["/client/notes.txt"]),
+    )
+    files = {"/client/notes.txt": base64.b64encode(b"Remember the milk").decode("utf-8")}
+
+    events = run(agent_configuration, Task(description="Write a note"), files)
+
+    assert [event["event"] for event in events] == ["preparation", "task_started", "task_finished", "result"]
+    assert set(events[0]["timings"]) == {"characterization", "knowledge_base"}
+    assert cloudpickle.loads(base64.b64decode(events[-1]["result"])) == "done: Write a note"
+    assert events[-1]["usage"]["input_tokens"] == 10
+    assert len(model_calls["call"]) == 3
+
+    # The uploaded file was converted on the server and given as context
+    knowledge_bases = [each for each in model_calls["agent"][0]["context"] if isinstance(each, KnowledgeBaseMarkdown)]
+    assert "Remember the milk" in knowledge_bases[0].knowledges["/client/notes.txt"]
+
+
+def test_agent_run_reports_errors(model_calls, monkeypatch):
+    monkeypatch.setattr(level_two_server, "run_sync_agent", lambda *args, **kwargs: {"status_code": 401, "detail": "No API key"})
+    agent_configuration = AgentConfiguration(job_title="Writer", company_url="https://example.com", company_objective="Write", sub_task=False, caching=False)
+
+    events = run(agent_configuration, Task(description="Write a note"))
+
+    assert events[-1] == {"event": "error", "status_code": 401, "detail": "No API key"}
+
+
+def test_cancelled_run_stops_before_the_next_model_call(model_calls, monkeypatch):
+    cancelled = threading.Event()
+    fake_gpt4o = orchestration.run_sync_gpt4o
+
+    def cancelling_gpt4o(*args, **kwargs):
+        # The client disconnects during the first call
+        cancelled.set()
+        return fake_gpt4o(*args, **kwargs)
+
+    monkeypatch.setattr(orchestration, "run_sync_gpt4o", cancelling_gpt4o)
+    agent_configuration = AgentConfiguration(job_title="Writer", company_url="https://example.com", company_objective="Write", sub_task=False, caching=False)
+    request = level_two_server.AgentRunRequest(
+        agent_configuration=base64.b64encode(cloudpickle.dumps(agent_configuration)).decode("utf-8"),
+        task=base64.b64encode(cloudpickle.dumps(Task(description="Write a note"))).decode("utf-8"),
+        llm_model="openai/gpt-4o",
+        files={},
+    )
+    events = []
+
+    level_two_server.run_agent_run(request, events.append, cancelled)
+
+    assert len(model_calls["call"]) == 1
+    assert model_calls["agent"] == []
+    assert events == []
+
+
+def test_server_agent_does_not_build_on_the_client_agent():
+    assert not issubclass(orchestration.ServerAgent, client_agent.Agent)
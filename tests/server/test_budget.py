@@ -0,0 +1,46 @@
+import pytest
+from pydantic_ai.exceptions import UsageLimitExceeded
+
+from volairframework.server.level_two import agent as agent_module
+from volairframework.server.level_utilized.budget import Budget, BudgetExhausted, ESTIMATED_OUTPUT_TOKENS, run_with_limits
+
+
+def test_calls_within_the_budget_are_unchanged():
+    plan = Budget(max_tokens=100000).plan("openai/gpt-4o", 100, 1000)
+    assert (plan.llm_model, plan.max_context_tokens, plan.exhausted) == ("openai/gpt-4o", None, False)
+
+
+def test_cheaper_model_first_then_a_tighter_context():
+    budget = Budget(max_cost=0.01)
+    plan = budget.plan("openai/gpt-4o", 100, 10000)
+    assert plan.llm_model == "openai/gpt-4o-mini"
+    assert plan.max_context_tokens is None
+
+    plan = Budget(max_tokens=ESTIMATED_OUTPUT_TOKENS + 600).plan("openai/gpt-4o", 100, 10000)
+    assert plan.llm_model == "openai/gpt-4o-mini"
+    assert plan.max_context_tokens == 500
+    assert plan.degraded == ["model:openai/gpt-4o-mini", "context:500"]
+
+
+def test_call_that_can_not_fit_is_exhausted():
+    assert Budget(max_tokens=50).plan("claude/claude-3-5-sonnet", 100, 0).exhausted
+
+
+def test_run_with_limits_reports_the_spent_tokens():
+    class LimitedAgent:
+        def run_sync(self, message, usage_limits=None, usage=None):
+            usage.request_tokens, usage.response_tokens = 900, 200
+            raise UsageLimitExceeded("limit")
+
+    with pytest.raises(BudgetExhausted) as error:
+        run_with_limits(LimitedAgent(), "task", Budget(max_tokens=1000), "openai/gpt-4o")
+    assert (error.value.input_tokens, error.value.output_tokens) == (900, 200)
+
+
+def test_agent_returns_budget_exhausted_without_calling_the_model(monkeypatch):
+    monkeypatch.setattr(agent_module, "agent_creator", lambda **kwargs: pytest.fail("The model must not be called"))
+
+    result = agent_module.Agent.agent("agent", "task " * 1000, llm_model="claude/claude-3-5-sonnet", max_tokens=100)
+
+    assert result["status"] == "budget_exhausted"
+    assert result["result"] is None
@@ -21,6 +21,23 @@ def test_get_with_default():
     assert config.get("non_existent_key", "default_value") == "default_value"
 
 
+def test_get_is_served_from_cache():
+    config = ConfigManager(db_name="test_config.db")
+    config.set("cached_key", "value1")
+    config.backend.db.db["cached_key"] = "changed_behind_the_cache"
+    assert config.get("cached_key") == "value1"
+
+
+def test_set_from_other_process_invalidates_cache():
+    config = ConfigManager(db_name="test_config.db", refresh_interval=0)
+    other = ConfigManager(db_name="test_config.db", refresh_interval=0)
+    config.set("rotated_key", "old")
+    assert other.get("rotated_key") == "old"
+
+    config.set("rotated_key", "new")
+    assert other.get("rotated_key") == "new"
+
+
 def teardown_module(module):
     # Clean up the test database file
     if os.path.exists("test_config.db"):
@@ -0,0 +1,48 @@
+from volairframework.client.knowledge_base.knowledge_base import KnowledgeBaseMarkdown
+from volairframework.client.level_two.agent import Characterization, OtherTask
+from volairframework.server.level_utilized.context import assemble_context, compact, context_budget
+
+
+def test_items_are_serialized_as_minified_json():
+    assert compact({"a": [1, 2], "b": None}) == '{"a":[1,2],"b":null}'
+    assert compact(OtherTask(task="t", result=None)) == '{"task":"t"}'
+    assert compact("plain text") == "plain text"
+
+
+def test_categories_are_reported_in_priority_order():
+    context = [
+        KnowledgeBaseMarkdown(knowledges={"notes": "Remember the milk"}),
+        Characterization(website_content=None, company_objective=None, human_objective=None),
+        OtherTask(task="first", result="one"),
+        OtherTask(task="second", result="two"),
+        {"input": "value"},
+    ]
+
+    assembly = assemble_context(context, "openai/gpt-4o")
+
+    text = assembly.text
+    assert text.index('{"input":"value"}') < text.index("second: two") < text.index("first: one") < text.index("Remember the milk")
+    assert list(assembly.report["categories"]) == ["task_inputs", "results", "characterization", "knowledge_base"]
+    assert assembly.report["categories"]["results"]["items"] == 2
+    assert assembly.tokens == sum(each["tokens"] for each in assembly.report["categories"].values())
+    assert assembly.report["budget"] == context_budget("openai/gpt-4o")
+
+
+def test_the_overflowing_item_is_truncated_and_the_rest_dropped():
+    context = [
+        {"input": "x" * 400},
+        KnowledgeBaseMarkdown(knowledges={"a": "y" * 2000, "b": "z" * 2000}),
+    ]
+
+    assembly = assemble_context(context, "openai/gpt-4o", max_tokens=300)
+
+    knowledge_base = assembly.report["categories"]["knowledge_base"]
+    assert (knowledge_base["items"], knowledge_base["truncated"], knowledge_base["dropped"]) == (1, 1, 1)
+    assert assembly.report["categories"]["task_inputs"]["truncated"] == 0
+    assert assembly.tokens <= 300
+    assert "z" not in assembly.text
+
+
+def test_empty_context():
+    assembly = assemble_context(None, "deepseek/deepseek-chat")
+    assert (assembly.text, assembly.tokens, assembly.report["categories"]) == ("", 0, {})
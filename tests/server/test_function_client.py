@@ -1,3 +1,4 @@
+import asyncio
 from volairframework.tools_server.function_client import FunctionToolManager
 
 
@@ -20,7 +21,7 @@ def test_function_client_basic():
     assert hasattr(first_tool, "__annotations__")
 
     # Test tool execution
-    result = first_tool(1, 2)
+    result = asyncio.run(first_tool(1, 2))
     assert isinstance(result, dict)
     assert "result" in result
 
@@ -36,7 +37,7 @@ def test_get_tools_by_name():
     assert tools[0].__name__ == "add_numbers"
 
     # Test the tool
-    result = tools[0](5, 3)
+    result = asyncio.run(tools[0](5, 3))
     assert isinstance(result, dict)
     assert "result" in result
     assert result["result"] == 8
@@ -0,0 +1,101 @@
+import asyncio
+import sys
+
+import httpx
+
+from volairframework.tools_server.server.installs import LibraryInstaller, is_satisfied
+
+
+# Stands in for the package installer, "broken" fails to install
+FAKE_INSTALLER = [
+    sys.executable,
+    "-c",
+    "import sys, time; time.sleep(0.2); print('installing', *sys.argv[2:]); sys.exit('broken' in sys.argv)",
+]
+
+
+def test_is_satisfied():
+    assert is_satisfied("pytest")
+    assert is_satisfied("pytest>=1.0")
+    assert not is_satisfied("pytest<1.0")
+    assert not is_satisfied("volair-package-that-does-not-exist")
+    assert is_satisfied("volair-package-that-does-not-exist; python_version < '3'")
+
+
+def test_install_jobs(tmp_path):
+    installer = LibraryInstaller(command=FAKE_INSTALLER, cache_dir=str(tmp_path))
+
+    async def run():
+        satisfied = installer.submit(["pytest"])
+        assert satisfied.status == "succeeded" and satisfied.skipped == ["pytest"]
+
+        first = installer.submit(["missing-package", "pytest"])
+        duplicate = installer.submit(["pytest", "missing-package"])
+        broken = installer.submit(["broken"])
+        assert duplicate is first
+        assert first.status == "queued"
+
+        await asyncio.gather(first.task, broken.task)
+
+        # Installed by the first job, so a later request is skipped
+        again = installer.submit(["missing-package"])
+        return first, broken, again
+
+    first, broken, again = asyncio.run(run())
+
+    assert first.status == "succeeded"
+    assert first.skipped == ["pytest"]
+    assert first.to_dict(log_offset=1)["logs"] == ["installing missing-package"]
+    assert broken.status == "failed" and broken.returncode == 1
+    assert again.status == "succeeded" and again.skipped == ["missing-package"]
+    assert installer.get(first.job_id) is first
+
+
+def test_install_endpoints():
+    from fastapi.testclient import TestClient
+    from volairframework.tools_server.server.api import app
+
+    client = TestClient(app)
+    job = client.post("/tools/install_libraries", json={"libraries": ["pytest", "httpx"]}).json()
+    assert job["status"] == "succeeded"
+    assert job["skipped"] == ["pytest", "httpx"]
+
+    status = client.post("/tools/install_status", json={"job_id": job["job_id"]}).json()
+    assert status["logs"] == ["All requirements are already satisfied"]
+    assert client.post("/tools/install_status", json={"job_id": "unknown"}).status_code == 404
+
+
+class InstallClient:
+    def __init__(self, client):
+        self.client = client
+
+    def send_request(self, endpoint, data):
+        response = self.client.post(endpoint, json=data)
+        if response.status_code >= 400:
+            # Raised like httpx.Client.raise_for_status in the real client
+            request = httpx.Request("POST", endpoint)
+            raise httpx.HTTPStatusError(response.text, request=request, response=httpx.Response(response.status_code, request=request))
+        return response.json()
+
+
+def test_install_wait_reports_missing_and_stuck_jobs(monkeypatch):
+    import pytest
+    from fastapi.testclient import TestClient
+    from volairframework.client.tools.tools import LibraryInstallException, Tools
+    from volairframework.tools_server.server.api import app
+
+    class Client(InstallClient, Tools):
+        pass
+
+    tools = Client(TestClient(app))
+    with pytest.raises(LibraryInstallException, match="not found"):
+        tools.install_status("unknown")
+
+    # The job stays queued, so waiting gives up at the deadline
+    monkeypatch.setattr(Client, "send_request", lambda self, endpoint, data: {"job_id": "stuck", "status": "queued"})
+    with pytest.raises(LibraryInstallException, match="within 0.05 seconds"):
+        tools.install_libraries(["missing-package"], poll_interval=0.01, timeout=0.05)
+
+    monkeypatch.setattr(Client, "send_request", lambda self, endpoint, data: {"job_id": "odd", "status": "lost"})
+    with pytest.raises(LibraryInstallException, match="Unknown install job status"):
+        tools.install_libraries(["missing-package"])
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+
+from volairframework.tools_server.server import tools
+from volairframework.tools_server.server.mcp_pool import MCPSessionPool
+
+
+class FakeSession:
+    def __init__(self, number):
+        self.number = number
+        self.crashed = False
+        self.closed = False
+        self.pings = 0
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        if self.crashed:
+            raise ConnectionError("The MCP server crashed")
+        if name == "crash":
+            self.crashed = True
+            raise ConnectionError("The MCP server crashed")
+        return {"session": self.number, "arguments": arguments}
+
+    async def list_tools(self):
+        return ["echo"]
+
+    async def send_ping(self):
+        self.pings += 1
+        if self.crashed:
+            raise ConnectionError("The MCP server crashed")
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    started = []
+    attempts = []
+
+    @asynccontextmanager
+    async def fake_managed_session(command, args, env=None):
+        attempts.append(command)
+        if command == "fails" or (command == "flaky" and attempts.count(command) == 1):
+            raise FileNotFoundError(command)
+        if command == "cancelled":
+            raise asyncio.CancelledError()
+        session = FakeSession(len(started))
+        started.append(session)
+        try:
+            yield session
+        finally:
+            session.closed = True
+
+    monkeypatch.setattr(tools, "managed_session", fake_managed_session)
+    return started
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_reused(sessions):
+    pool = MCPSessionPool()
+
+    first = await pool.call_tool("server", [], None, "echo", {"a": 1})
+    second = await pool.call_tool("server", [], None, "echo", {"a": 2})
+
+    assert first["session"] == second["session"] == 0
+    assert len(sessions) == 1
+    assert pool.metrics()[0]["spawned"] == 1
+    assert pool.metrics()[0]["reused"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_crashed_session_is_replaced_without_replaying_the_call(sessions):
+    pool = MCPSessionPool()
+    await pool.call_tool("server", [], None, "echo", {})
+
+    with pytest.raises(ConnectionError):
+        await pool.call_tool("server", [], None, "crash", {})
+    result = await pool.call_tool("server", [], None, "echo", {})
+
+    # The call may have had effects, so it is not sent to a fresh session
+    assert [session.calls.count("crash") for session in sessions] == [1, 0]
+    assert sessions[0].closed
+    assert result["session"] == 1
+    assert pool.metrics()[0]["failures"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_session_start_is_retried(sessions):
+    pool = MCPSessionPool()
+
+    result = await pool.call_tool("flaky", [], None, "echo", {})
+    assert result["session"] == 0
+    assert pool.metrics()[0]["restarted"] == 1
+    await pool.close()
+
+
+def test_sessions_of_another_running_loop_are_closed_on_it(sessions):
+    pool = MCPSessionPool()
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(pool.call_tool("server", [], None, "echo", {}), other_loop).result(timeout=5)
+
+        async def call_from_this_loop():
+            result = await pool.call_tool("server", [], None, "echo", {})
+            await pool.close()
+            return result
+
+        assert asyncio.run(call_from_this_loop())["session"] == 1
+        for _ in range(100):
+            if sessions[0].closed:
+                break
+            threading.Event().wait(0.01)
+        assert sessions[0].closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_health_checked_and_reaped(sessions):
+    pool = MCPSessionPool(idle_timeout=60.0, health_check_interval=0.0)
+    await pool.call_tool("server", [], None, "echo", {})
+
+    # A session that died while idle fails its ping and is replaced
+    sessions[0].crashed = True
+    result = await pool.call_tool("server", [], None, "echo", {})
+    assert result["session"] == 1
+    assert pool.metrics()[0]["health_check_failures"] == 1
+
+    pool.idle_timeout = 0.0
+    await asyncio.sleep(0.01)
+    await pool.reap_idle()
+    assert pool.metrics()[0]["idle_sessions"] == 0
+    assert pool.metrics()[0]["idle_closed"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_startup_failures_are_raised_instead_of_hanging(sessions):
+    pool = MCPSessionPool()
+
+    with pytest.raises(FileNotFoundError):
+        await asyncio.wait_for(pool.list_tools("fails", [], None), timeout=5)
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(pool.list_tools("cancelled", [], None), timeout=5)
+    await pool.close()
@@ -0,0 +1,119 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from volairframework.server.level_one import call as call_module
+from volairframework.server.level_two import agent as agent_module
+from volairframework.server.level_two.reflection import Judgement, Judgements, ReflectionEngine
+
+
+class FakeResult:
+    def __init__(self, data, tokens=10):
+        self.data = data
+        self.tokens = tokens
+
+    def usage(self):
+        return SimpleNamespace(request_tokens=self.tokens, response_tokens=0)
+
+    def all_messages(self):
+        return []
+
+
+class FakeJudge:
+    def __init__(self, *verdicts):
+        self.verdicts = list(verdicts)
+        self.calls = []
+
+    def __call__(self, prompt, response_format=None, context=None, llm_model=None):
+        self.calls.append({"prompt": prompt, "context": context, "llm_model": llm_model})
+        judgements = [Judgement(candidate_number=number, score=score, satisfied=satisfied, feedback=feedback) for number, score, satisfied, feedback in self.verdicts.pop(0)]
+        return {"status_code": 200, "result": Judgements(judgements=judgements), "usage": {"input_tokens": 5, "output_tokens": 0}}
+
+
+def test_single_iteration_skips_the_judge():
+    judge = FakeJudge()
+    run = ReflectionEngine(lambda text: FakeResult(text), judge=judge).run("task")
+
+    assert run["result"].data == "task"
+    assert judge.calls == []
+    assert len(run["reflection"]["iterations"]) == 1
+
+
+def test_confident_pass_ends_early_with_the_judge_model():
+    judge = FakeJudge([(1, 0.9, True, "")])
+    engine = ReflectionEngine(lambda text: FakeResult(text), judge_model="openai/gpt-4o-mini", max_iterations=5, judge=judge)
+
+    run = engine.run("task")
+
+    assert run["reflection"]["stop_reason"] == "passed"
+    assert [call["llm_model"] for call in judge.calls] == ["openai/gpt-4o-mini"]
+    assert run["input_tokens"] == 15
+    assert run["reflection"]["iterations"][0]["judge_input_tokens"] == 5
+
+
+def test_only_the_latest_feedback_is_added():
+    prompts = []
+
+    def generate(text):
+        prompts.append(text)
+        return FakeResult(text)
+
+    judge = FakeJudge([(1, 0.2, False, "first")], [(1, 0.9, True, "second")])
+    run = ReflectionEngine(generate, max_iterations=3, confidence=0.95, judge=judge).run("task")
+
+    assert prompts == ["task", "task\n\nFeedback on your previous answer: first", "task\n\nFeedback on your previous answer: second"]
+    # The last answer is not judged, it was made with all the feedback
+    assert len(judge.calls) == 2
+    assert run["result"].data == prompts[-1]
+    assert run["reflection"]["stop_reason"] == "max_iterations"
+
+
+def test_best_of_candidates_are_generated_concurrently_and_judged_at_once():
+    counter = iter(range(100))
+    lock = threading.Lock()
+
+    def generate(text):
+        time.sleep(0.2)
+        with lock:
+            return FakeResult(next(counter))
+
+    judge = FakeJudge([(1, 0.3, False, "a"), (2, 0.9, True, "b"), (3, 0.5, False, "c")])
+    run = ReflectionEngine(generate, max_iterations=3, best_of=3, judge=judge).run("task")
+
+    assert len(judge.calls) == 1
+    assert len(judge.calls[0]["context"]) == 3
+    assert run["result"].data == 1
+    assert run["reflection"]["iterations"][0]["candidates"] == 3
+    assert run["reflection"]["iterations"][0]["time"] < 0.5
+
+
+def test_token_budget_stops_before_an_iteration_that_would_exceed_it():
+    judge = FakeJudge([(1, 0.2, False, "more")])
+    run = ReflectionEngine(lambda text: FakeResult(text), max_iterations=5, max_tokens=25, judge=judge).run("task")
+
+    assert run["reflection"]["stop_reason"] == "token_budget"
+    assert len(run["reflection"]["iterations"]) == 1
+
+
+def test_agent_manager_reports_reflection_usage(monkeypatch):
+    class FakeAgent:
+        def run_sync(self, message, message_history=None):
+            return FakeResult(message[0]["text"])
+
+    monkeypatch.setattr(agent_module, "agent_creator", lambda **kwargs: FakeAgent())
+    monkeypatch.setattr(call_module.Call, "gpt_4o", FakeJudge([(1, 0.5, False, "x"), (2, 0.9, True, "")]), raising=False)
+
+    result = agent_module.Agent.agent("agent", "task", retries=2, reflection=True, reflection_best_of=2)
+
+    assert result["status_code"] == 200
+    assert result["usage"]["reflection"]["stop_reason"] == "passed"
+    assert result["usage"]["input_tokens"] == 25
+
+    single = agent_module.Agent.agent("agent", "task", retries=2, reflection=False)
+    assert "reflection" not in single["usage"]
+
+
+def test_agent_manager_returns_model_errors(monkeypatch):
+    monkeypatch.setattr(agent_module, "agent_creator", lambda **kwargs: {"status_code": 401, "detail": "No API key"})
+
+    assert agent_module.Agent.agent("agent", "task") == {"status_code": 401, "detail": "No API key"}
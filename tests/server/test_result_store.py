@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+
+from fastapi.testclient import TestClient
+from volairframework.storage.backends import SQLiteBackend
+from volairframework.tools_server.server.api import app
+from volairframework.tools_server.server.result_cache import ToolResultCache
+from volairframework.tools_server.server.result_store import ResultStore, result_store
+
+
+client = TestClient(app)
+
+
+def test_small_results_pass_through(tmp_path):
+    store = ResultStore(directory=str(tmp_path), max_result_chars=100)
+    assert store.limit("small", {"a": 1}) == {"a": 1}
+    assert store.limit("small", "x" * 500, max_result_chars=0) == "x" * 500
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_large_results_spill_and_page(tmp_path):
+    store = ResultStore(directory=str(tmp_path), max_result_chars=100, preview_chars=40)
+    result = [f"row {i}" for i in range(100)]
+    text = '["' + '", "'.join(result) + '"]'
+
+    preview = store.limit("big", result)
+    assert preview["truncated"] is True
+    assert preview["total_characters"] == len(text)
+    assert preview["preview"] == text[:40]
+
+    pages = [preview["preview"]]
+    offset = preview["next_offset"]
+    while offset is not None:
+        page = store.read_page(preview["handle"], offset, length=1000)
+        assert len(page["content"]) <= 100
+        pages.append(page["content"])
+        offset = page["next_offset"]
+    assert "".join(pages) == text
+
+    assert "error" in store.read_page("../../etc/passwd")
+    metrics = store.metrics()["big"]
+    assert metrics["count"] == 1 and metrics["spilled"] == 1
+    assert metrics["sizes"]["<=1000"] == 1
+
+
+def test_results_are_measured_and_spilled_off_the_event_loop(tmp_path, monkeypatch):
+    store = ResultStore(directory=str(tmp_path), max_result_chars=10)
+    threads = []
+    record, spill = store._record, store._spill
+
+    def recording_record(name, size, spilled):
+        threads.append(threading.current_thread())
+        record(name, size, spilled)
+
+    def recording_spill(text, limit):
+        threads.append(threading.current_thread())
+        return spill(text, limit)
+
+    monkeypatch.setattr(store, "_record", recording_record)
+    monkeypatch.setattr(store, "_spill", recording_spill)
+
+    async def limit():
+        return await store.limit_async("big", "z" * 100), threading.current_thread()
+
+    preview, loop_thread = asyncio.run(limit())
+    assert preview["truncated"] is True
+    assert len(threads) == 2 and loop_thread not in threads
+    assert store.read_page(preview["handle"], 0, 10)["content"] == "z" * 10
+    assert asyncio.run(store.limit_async("small", "z")) == "z"
+
+
+def test_paging_tool():
+    preview = result_store.limit("endpoint", "y" * (result_store.max_result_chars + 10))
+    response = client.post(
+        "/functions/call_tool",
+        json={"tool_name": "Results__read_page", "arguments": {"handle": preview["handle"], "offset": preview["next_offset"]}},
+    )
+    page = response.json()["result"]
+    assert page["content"] == "y" * len(page["content"])
+    assert page["offset"] == preview["next_offset"]
+
+
+def test_search_and_read_fits_under_the_result_size_limit(tmp_path, monkeypatch):
+    from volairframework.tools_server.server import function_tools
+
+    def fake_read_pages(urls, max_total_characters, max_pages):
+        # A default sized answer, the contents alone use the whole content budget
+        share = max_total_characters // max_pages
+        return [
+            {"url": url, "title": "t" * 200, "description": "d" * 300, "content": "word " * (share // 5)}
+            for url in urls[:max_pages]
+        ]
+
+    monkeypatch.setattr(function_tools, "_google_search", lambda query, number: [f"https://example.com/{i}" for i in range(number)])
+    monkeypatch.setattr(function_tools, "read_pages", fake_read_pages)
+    # The tool is cacheable, keep the fake pages out of the real result cache
+    monkeypatch.setattr(function_tools, "tool_result_cache", ToolResultCache(SQLiteBackend(str(tmp_path / "tool_cache.sqlite3"))))
+
+    response = client.post("/functions/call_tool", json={"tool_name": "Search__search_and_read", "arguments": {"query": "fits under the limit"}})
+    result = response.json()["result"]
+
+    assert "truncated" not in result
+    assert len(result["pages"]) == 5
+    assert all(page["content"] for page in result["pages"])
+    assert len(json.dumps(result, ensure_ascii=False)) <= result_store.max_result_chars
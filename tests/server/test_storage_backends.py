@@ -0,0 +1,57 @@
+import time
+import pytest
+from volairframework.storage.backends import LocalFileBackend, SQLiteBackend, RedisBackend
+from volairframework.storage.configuration import ConfigManager
+
+
+@pytest.fixture(params=["file", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "file":
+        return LocalFileBackend(str(tmp_path / "test.db"))
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "test.sqlite3"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisBackend("test", client=fakeredis.FakeRedis())
+
+
+def test_set_many_and_get_many(backend):
+    backend.set_many({"key1": "value1", "key2": {"nested": [1, 2]}})
+    assert backend.get_many(["key1", "key2", "missing"]) == {"key1": "value1", "key2": {"nested": [1, 2]}}
+
+
+def test_delete(backend):
+    backend.set("key1", "value1")
+    backend.delete("key1")
+    assert backend.get("key1", "default") == "default"
+
+
+def test_ttl_expires(backend):
+    backend.set("short_lived", "value", ttl=0.2)
+    assert backend.get("short_lived") == "value"
+    time.sleep(0.3)
+    assert backend.get("short_lived") is None
+
+
+def test_version_changes_on_write(backend):
+    before = backend.version()
+    backend.set("key1", "value1")
+    assert backend.version() != before
+
+
+def test_config_manager_sees_writes_from_other_manager(backend):
+    config = ConfigManager(backend=backend, refresh_interval=0)
+    other = ConfigManager(backend=backend, refresh_interval=0)
+    config.set("shared_key", "old")
+    assert other.get("shared_key") == "old"
+
+    config.set("shared_key", "new")
+    assert other.get("shared_key") == "new"
+
+
+def test_write_many_sets_and_deletes_at_once(backend):
+    backend.set_many({"old": 1, "kept": 2})
+    backend.write_many({"new": 3, "short_lived": 4}, deletes=["old"], ttls={"short_lived": 0.2})
+    assert backend.get_many(["old", "kept", "new", "short_lived"]) == {"kept": 2, "new": 3, "short_lived": 4}
+    time.sleep(0.3)
+    assert backend.get("short_lived") is None
+    assert backend.get("new") == 3
@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+
+from volairframework.client.storage.storage import Storage
+from volairframework.server.api import app
+
+
+client = TestClient(app)
+
+
+class StorageClient(Storage):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def send_request(self, endpoint, data):
+        self.requests.append((endpoint, data))
+        response = client.post(endpoint, json=data)
+        assert response.status_code == 200
+        return response.json()
+
+
+def test_batch_set_and_get():
+    response = client.post("/storage/config/set_many", json={"configs": {"batch_a": "1", "batch_b": "2"}})
+    assert response.status_code == 200
+    version = response.json()["version"]
+
+    response = client.post("/storage/config/get_many", json={"keys": ["batch_a", "batch_b", "batch_missing"]})
+    body = response.json()
+    assert body["values"]["batch_a"] == "1"
+    assert body["values"]["batch_b"] == "2"
+    assert body["values"].get("batch_missing") is None
+    assert body["version"] == version
+    assert body["not_modified"] is False
+
+
+def test_batch_get_with_a_current_version_is_not_modified():
+    version = client.post("/storage/config/set_many", json={"configs": {"batch_c": "3"}}).json()["version"]
+
+    body = client.post("/storage/config/get_many", json={"keys": ["batch_c"], "version": version}).json()
+    assert body == {"version": version, "not_modified": True}
+
+    client.post("/storage/config/set", json={"key": "batch_c", "value": "4"})
+    body = client.post("/storage/config/get_many", json={"keys": ["batch_c"], "version": version}).json()
+    assert body["not_modified"] is False
+    assert body["values"]["batch_c"] == "4"
+
+
+def test_client_cache_is_revalidated_and_invalidated_after_set():
+    storage = StorageClient()
+    assert storage._config_cache == {} and storage._config_version is None
+
+    storage.set_configs({"cache_a": "1", "cache_b": "2"})
+    assert storage.get_configs(["cache_a", "cache_b", "cache_missing"]) == {"cache_a": "1", "cache_b": "2", "cache_missing": None}
+
+    # Every key is cached, the second read only sends the version stamp
+    assert storage.get_configs(["cache_a", "cache_b"]) == {"cache_a": "1", "cache_b": "2"}
+    assert storage.requests[-1][1]["version"] == storage._config_version
+
+    storage.set_config("cache_a", "changed")
+    assert storage._config_cache == {} and storage._config_version is None
+    assert storage.get_configs(["cache_a"]) == {"cache_a": "changed"}
+    assert storage.requests[-1][1]["version"] is None
+
+    # A change made by someone else is seen through the version stamp
+    client.post("/storage/config/set", json={"key": "cache_b", "value": "elsewhere"})
+    assert storage.get_configs(["cache_b"]) == {"cache_b": "elsewhere"}
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+from volairframework.server.level_two import agent as agent_module
+from volairframework.server.level_utilized import tokens, utility
+from volairframework.server.level_utilized.tokens import context_window, count_tokens, fits_context_window, split_by_tokens, truncate_to_tokens
+
+
+@pytest.fixture
+def no_tiktoken(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", lambda: None)
+
+
+def test_tokens_are_estimated_per_model_family(no_tiktoken):
+    text = "x" * 700
+    assert count_tokens(text, "openai/gpt-4o") == 234
+    assert count_tokens(text, "claude/claude-3-5-sonnet") == 234
+    assert count_tokens("", "openai/gpt-4o") == 0
+
+
+def test_split_and_truncate_by_tokens(no_tiktoken):
+    chunks = split_by_tokens("x" * 1000, 100, "openai/gpt-4o")
+    assert [len(each) for each in chunks] == [300, 300, 300, 100]
+    assert count_tokens(truncate_to_tokens("x" * 1000, 10, "claude/claude-3-5-sonnet"), "claude/claude-3-5-sonnet") == 10
+
+
+def test_requests_are_checked_against_the_context_window(no_tiktoken):
+    assert fits_context_window("deepseek/deepseek-chat", "x" * 1000, None)
+    assert not fits_context_window("deepseek/deepseek-chat", "x" * 4 * context_window("deepseek/deepseek-chat"))
+
+
+def test_summarize_text_chunks_by_the_model_window(no_tiktoken, monkeypatch):
+    chunks = []
+
+    class FakeModel:
+        def run_sync(self, message):
+            chunks.append(message[0]["text"])
+            return SimpleNamespace(data="short")
+
+    monkeypatch.setattr(utility, "agent_creator", lambda **kwargs: FakeModel())
+
+    text = "x" * 4 * context_window("deepseek/deepseek-chat")
+    summary = utility.summarize_text(text, "deepseek/deepseek-chat", max_tokens=1000)
+
+    assert len(chunks) > 1
+    assert all(fits_context_window("deepseek/deepseek-chat", each) for each in chunks)
+    assert count_tokens(summary, "deepseek/deepseek-chat") <= 1000
+
+
+def test_oversized_prompt_is_compressed_before_dispatch(no_tiktoken, monkeypatch):
+    messages = []
+
+    class FakeAgent:
+        def run_sync(self, message, message_history=None):
+            messages.append(message[0]["text"])
+            return SimpleNamespace(data="done", usage=lambda: SimpleNamespace(request_tokens=1, response_tokens=1), all_messages=lambda: [])
+
+    monkeypatch.setattr(agent_module, "agent_creator", lambda **kwargs: FakeAgent())
+    monkeypatch.setattr(agent_module, "summarize_message_prompt", lambda text, llm_model: "compressed")
+
+    result = agent_module.Agent.agent("agent", "x" * 4 * context_window("openai/gpt-4o"), context_compress=True)
+    assert result["status_code"] == 200
+    assert messages == ["compressed"]
+
+    agent_module.Agent.agent("agent", "small task", context_compress=True)
+    assert messages[-1] == "small task"
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import pytest
+from volairframework.tools_server.server.execution import ToolExecutor, ToolTimeoutError
+
+
+def slow_sync(seconds: float) -> str:
+    time.sleep(seconds)
+    return "done"
+
+
+def cpu_bound(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+@pytest.mark.asyncio
+async def test_sync_tools_do_not_block_event_loop():
+    executor = ToolExecutor(max_threads=4)
+    info = {"function": slow_sync}
+
+    start = time.monotonic()
+    results = await asyncio.gather(*[executor.run("slow_sync", info, {"seconds": 0.5}) for _ in range(4)])
+    assert results == ["done"] * 4
+    assert time.monotonic() - start < 1.5
+    assert executor.metrics()["slow_sync"]["calls"] == 4
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_queues_calls():
+    executor = ToolExecutor(max_threads=4)
+    info = {"function": slow_sync, "max_concurrency": 1}
+
+    start = time.monotonic()
+    await asyncio.gather(*[executor.run("slow_sync", info, {"seconds": 0.3}) for _ in range(3)])
+    assert time.monotonic() - start >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_timeout_stops_sync_tool():
+    executor = ToolExecutor(max_threads=1)
+    info = {"function": slow_sync, "timeout": 0.2}
+
+    with pytest.raises(ToolTimeoutError):
+        await executor.run("slow_sync", info, {"seconds": 5})
+    assert executor.metrics()["slow_sync"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_process_executor():
+    executor = ToolExecutor(max_processes=2)
+    info = {"function": cpu_bound, "executor": "process"}
+
+    result = await executor.run("cpu_bound", info, {"n": 1000})
+    assert result == sum(i * i for i in range(1000))
+    executor.shutdown()
+
+
+def large_result(size: int) -> bytes:
+    return b"x" * size
+
+
+def worker_pid() -> int:
+    import os
+    return os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_large_process_results_come_back_through_the_pool():
+    executor = ToolExecutor(max_processes=1)
+    info = {"function": large_result, "executor": "process"}
+
+    result = await executor.run("large_result", info, {"size": 1024 * 1024})
+    assert result == b"x" * 1024 * 1024
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_workers_are_recycled():
+    executor = ToolExecutor(max_processes=1, max_calls_per_worker=2)
+    info = {"function": worker_pid, "executor": "process", "libraries": ["json"]}
+
+    pids = [await executor.run("worker_pid", info, {}) for _ in range(4)]
+    assert pids[0] == pids[1]
+    assert pids[1] != pids[2]
+    assert pids[2] == pids[3]
+    executor.shutdown()
+
+
+def blocked_in_io(seconds: float) -> str:
+    import socket
+
+    # Waits in recv, a C call the timeout interrupt can not reach
+    reader, writer = socket.socketpair()
+    reader.settimeout(seconds)
+    try:
+        reader.recv(1)
+    except socket.timeout:
+        pass
+    finally:
+        reader.close()
+        writer.close()
+    return "unblocked"
+
+
+def quick() -> str:
+    return "quick"
+
+
+@pytest.mark.asyncio
+async def test_timeout_of_a_thread_tool_blocked_in_io():
+    executor = ToolExecutor(max_threads=1)
+
+    start = time.monotonic()
+    with pytest.raises(ToolTimeoutError):
+        await executor.run("blocked_in_io", {"function": blocked_in_io, "timeout": 0.2}, {"seconds": 1.0})
+    # The caller is not kept waiting for the blocked thread
+    assert time.monotonic() - start < 0.8
+
+    # The next job on the same pool thread runs once the blocked call is over,
+    # and the interrupt of the timed out call does not hit it
+    results = [await executor.run("quick", {"function": quick}, {}) for _ in range(20)]
+    assert results == ["quick"] * 20
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timeout_of_a_process_tool_blocked_in_io_is_hard():
+    executor = ToolExecutor(max_processes=1)
+    info = {"function": blocked_in_io, "executor": "process", "timeout": 0.5}
+
+    start = time.monotonic()
+    with pytest.raises(ToolTimeoutError):
+        await executor.run("blocked_in_io", info, {"seconds": 30.0})
+    # The worker was killed and replaced, the next call does not wait for it
+    assert await executor.run("quick", {"function": quick, "executor": "process"}, {}) == "quick"
+    assert time.monotonic() - start < 15
+    executor.shutdown()
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import os
+
+import cloudpickle
+import pytest
+from fastapi.testclient import TestClient
+from volairframework.storage.backends import SQLiteBackend
+from volairframework.tools_server.server import function_tools, tools
+from volairframework.tools_server.server.api import app
+from volairframework.tools_server.server.registry_store import ToolRegistryStore
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ToolRegistryStore(SQLiteBackend(str(tmp_path / "tool_registry.sqlite3")))
+    monkeypatch.setattr(tools, "tool_registry_store", store)
+    monkeypatch.setattr(tools, "PERSIST_TOOLS", True)
+
+    registered = dict(function_tools.registered_functions)
+    yield store
+    function_tools.registered_functions.clear()
+    function_tools.registered_functions.update(registered)
+    function_tools.catalog_state.update(version=function_tools.catalog_state["version"] + 1, tools=None, names=None)
+
+
+def multiply_numbers(a: int, b: int) -> int:
+    return a * b
+
+
+def test_added_tools_survive_a_restart(store):
+    function = base64.b64encode(cloudpickle.dumps(multiply_numbers)).decode("utf-8")
+    response = client.post("/tools/add_tool", json={"function": function, "timeout": 5})
+    assert response.status_code == 200
+    assert store.tools()["multiply_numbers"]["options"]["timeout"] == 5
+
+    # A new tools-server process starts with only the built-in tools
+    function_tools.registered_functions.pop("multiply_numbers")
+    assert tools.restore_tools(store) == {"tools": 1, "mcp_servers": 0, "failed": []}
+
+    assert function_tools.registered_functions["multiply_numbers"]["timeout"] == 5
+    response = client.post("/functions/call_tool", json={"tool_name": "multiply_numbers", "arguments": {"a": 3, "b": 4}})
+    assert response.json() == {"result": 12}
+
+
+def test_mcp_tools_restore_without_spawning_the_server(store, monkeypatch):
+    async def list_tools(**kwargs):
+        raise AssertionError("the MCP server should not be spawned")
+
+    monkeypatch.setattr(tools.mcp_session_pool, "list_tools", list_tools)
+    schema = {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}
+    store.save_mcp_server("Docs", "docs-mcp", ["--stdio"], {}, [{"name": "search", "description": "Search the docs", "inputSchema": schema}])
+
+    assert tools.restore_tools(store) == {"tools": 0, "mcp_servers": 1, "failed": []}
+    restored = function_tools.registered_functions["Docs__search"]
+    assert restored["description"] == "Search the docs"
+    assert restored["function"].command == "docs-mcp"
+
+    # Adding the same server again reuses the stored schemas
+    asyncio.run(tools.add_mcp_tool_("Docs", "docs-mcp", ["--stdio"], {}))
+    with pytest.raises(AssertionError):
+        asyncio.run(tools.add_mcp_tool_("Docs", "docs-mcp", ["--stdio"], {}, refresh=True))
+
+
+def test_mcp_env_values_are_not_written_to_disk(store, monkeypatch):
+    async def list_tools(**kwargs):
+        raise AssertionError("the MCP server should not be spawned")
+
+    monkeypatch.setattr(tools.mcp_session_pool, "list_tools", list_tools)
+    store.save_mcp_server("Keys", "keys-mcp", [], {"KEYS_API_KEY": "secret-value"}, [{"name": "lookup", "description": "Look up", "inputSchema": {"type": "object"}}])
+
+    assert store.get_mcp_server("Keys")["env_keys"] == ["KEYS_API_KEY"]
+    with open(store.backend.db_path, "rb") as file:
+        assert b"secret-value" not in file.read()
+    assert os.stat(store.backend.db_path).st_mode & 0o777 == 0o600
+
+    # The values are re-supplied from the environment of the tools server
+    monkeypatch.setenv("KEYS_API_KEY", "from-environment")
+    tools.restore_tools(store)
+    assert function_tools.registered_functions["Keys__lookup"]["function"].env == {"KEYS_API_KEY": "from-environment"}
+
+    # Adding the server again with its env reuses the stored schemas
+    asyncio.run(tools.add_mcp_tool_("Keys", "keys-mcp", [], {"KEYS_API_KEY": "secret-value"}))
+    assert function_tools.registered_functions["Keys__lookup"]["function"].env == {"KEYS_API_KEY": "secret-value"}
+
+
+def test_tools_are_restored_on_app_startup(store):
+    function = base64.b64encode(cloudpickle.dumps(multiply_numbers)).decode("utf-8")
+    store.save_tool("multiply_numbers", function, {"timeout": 7})
+
+    assert tools.restore_persisted_tools in app.router.on_startup
+    asyncio.run(tools.restore_persisted_tools())
+    assert function_tools.registered_functions["multiply_numbers"]["timeout"] == 7
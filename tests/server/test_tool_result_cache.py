@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import pytest
+from volairframework.storage.backends import SQLiteBackend
+from volairframework.tools_server.server.result_cache import ToolResultCache, argument_hash, function_version
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def runner(self, result, delay: float = 0.0):
+        async def run():
+            self.calls += 1
+            await asyncio.sleep(delay)
+            return result
+        return run
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "tool_cache.sqlite3"))
+
+
+def test_argument_hash_ignores_key_order():
+    assert argument_hash({"a": 1, "b": [1, 2]}) == argument_hash({"b": [1, 2], "a": 1})
+    assert argument_hash({"a": 1}) != argument_hash({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_hits_are_served_from_cache(backend):
+    cache = ToolResultCache(backend)
+    counter = Counter()
+    info = {"cacheable": True}
+
+    assert await cache.get_or_run("search", info, {"q": "x"}, counter.runner(["a"])) == ["a"]
+    assert await cache.get_or_run("search", info, {"q": "x"}, counter.runner(["b"])) == ["a"]
+    assert counter.calls == 1
+    assert cache.metrics()["search"] == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1}
+
+
+@pytest.mark.asyncio
+async def test_results_survive_restart(backend):
+    counter = Counter()
+    info = {"cacheable": True}
+    await ToolResultCache(backend).get_or_run("search", info, {"q": "x"}, counter.runner({"title": "a"}))
+
+    restarted = ToolResultCache(backend)
+    assert await restarted.get_or_run("search", info, {"q": "x"}, counter.runner({"title": "b"})) == {"title": "a"}
+    assert counter.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_max_entries(backend):
+    cache = ToolResultCache(backend)
+    counter = Counter()
+
+    info = {"cacheable": True, "ttl": 0.1}
+    await cache.get_or_run("short", info, {}, counter.runner(1))
+    await asyncio.sleep(0.2)
+    await cache.get_or_run("short", info, {}, counter.runner(2))
+    assert counter.calls == 2
+
+    info = {"cacheable": True, "max_entries": 2}
+    for number in range(3):
+        await cache.get_or_run("small", info, {"n": number}, counter.runner(number))
+    assert cache.metrics()["small"]["entries"] == 2
+    assert cache.metrics()["small"]["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached_and_calls_are_shared(backend):
+    cache = ToolResultCache(backend)
+    counter = Counter()
+    info = {"cacheable": True}
+
+    await cache.get_or_run("read", info, {"url": "x"}, counter.runner({"error": "failed"}))
+    await cache.get_or_run("read", info, {"url": "x"}, counter.runner({"error": "failed"}))
+    assert counter.calls == 2
+
+    results = await asyncio.gather(
+        *[cache.get_or_run("read", info, {"url": "y"}, counter.runner("page", delay=0.1)) for _ in range(3)]
+    )
+    assert results == ["page"] * 3
+    assert counter.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_results_with_failed_parts_are_cached_briefly(backend):
+    cache = ToolResultCache(backend)
+    counter = Counter()
+    partial = {"query": "x", "pages": [{"url": "a", "content": "page"}, {"url": "b", "error": "failed"}]}
+
+    info = {"cacheable": True, "ttl": 60 * 60}
+    await cache.get_or_run("search", info, {"q": "x"}, counter.runner(partial))
+    await cache.get_or_run("search", info, {"q": "x"}, counter.runner(partial))
+    assert counter.calls == 2
+
+    info = {"cacheable": True, "ttl": 60 * 60, "partial_ttl": 0.1}
+    await cache.get_or_run("search", info, {"q": "y"}, counter.runner(partial))
+    await cache.get_or_run("search", info, {"q": "y"}, counter.runner(partial))
+    assert counter.calls == 3
+    await asyncio.sleep(0.2)
+    await cache.get_or_run("search", info, {"q": "y"}, counter.runner(partial))
+    assert counter.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_results_of_a_replaced_function_are_not_served(backend):
+    counter = Counter()
+
+    def lookup(q):
+        return "old"
+
+    info = {"cacheable": True, "version": function_version(lookup)}
+    await ToolResultCache(backend).get_or_run("lookup", info, {"q": "x"}, counter.runner("old"))
+
+    def lookup(q):
+        return "new"
+
+    # The tool is registered again with other code after a restart
+    restarted = ToolResultCache(backend)
+    info = {"cacheable": True, "version": function_version(lookup)}
+    assert await restarted.get_or_run("lookup", info, {"q": "x"}, counter.runner("new")) == "new"
+    assert counter.calls == 2
+
+    # The old result is dropped instead of taking a slot
+    assert len(backend.get(ToolResultCache.INDEX_PREFIX + "lookup")) == 1
+    assert await ToolResultCache(backend).get_or_run("lookup", info, {"q": "x"}, counter.runner("newer")) == "new"
+
+
+@pytest.mark.asyncio
+async def test_a_miss_is_written_in_one_backend_call_off_the_loop(backend, monkeypatch):
+    cache = ToolResultCache(backend)
+    counter = Counter()
+    writes = []
+    write_many = backend.write_many
+
+    def recording_write_many(items, deletes=(), ttls=None):
+        writes.append((sorted(items), list(deletes), threading.current_thread()))
+        write_many(items, deletes=deletes, ttls=ttls)
+
+    monkeypatch.setattr(backend, "write_many", recording_write_many)
+    info = {"cacheable": True, "max_entries": 1}
+    await cache.get_or_run("small", info, {"n": 1}, counter.runner(1))
+    await cache.get_or_run("small", info, {"n": 2}, counter.runner(2))
+
+    assert len(writes) == 2
+    items, deletes, thread = writes[1]
+    assert items == sorted([f"small::{argument_hash({'n': 2})}", ToolResultCache.INDEX_PREFIX + "small"])
+    assert deletes == [f"small::{argument_hash({'n': 1})}"]
+    assert thread is not threading.current_thread()
@@ -30,8 +30,8 @@ async def test_list_tools():
     assert "available_tools" in data
     tools = data["available_tools"]["tools"]
 
-    # Should have add_numbers and concat_strings
-    assert len(tools) == 4
+    # Should have add_numbers, concat_strings, the Search tools and the result paging tool
+    assert len(tools) == 6
 
     # Verify add_numbers
     add_numbers = next(t for t in tools if t["name"] == "add_numbers")
@@ -44,6 +44,40 @@ async def test_list_tools():
     assert concat_strings["inputSchema"]["required"] == ["str1", "str2"]
 
 
+def test_list_tools_etag():
+    response = client.post("/functions/tools")
+    etag = response.headers["ETag"]
+
+    response = client.post("/functions/tools", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.post("/functions/tools", headers={"If-None-Match": '"stale-0"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_list_tools_filtering_and_pagination():
+    response = client.post("/functions/tools", params={"names": ["Search.*", "add_numbers", "missing"]})
+    data = response.json()
+    names = [t["name"] for t in data["available_tools"]["tools"]]
+    assert names == ["Search__google", "Search__read_website", "Search__search_and_read", "add_numbers"]
+    assert data["total"] == 4
+
+    response = client.post("/functions/tools", params={"fields": "names", "limit": 4})
+    data = response.json()
+    assert data["available_tools"]["tools"][0] == {"name": "add_numbers"}
+    assert len(data["available_tools"]["tools"]) == 4
+    assert data["next_offset"] == 4
+
+    response = client.post("/functions/tools", params={"fields": "names", "offset": data["next_offset"]})
+    data = response.json()
+    assert len(data["available_tools"]["tools"]) == 2
+    assert data["next_offset"] is None
+
+    response = client.post("/functions/tools", params={"fields": "everything"})
+    assert response.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_example_functions():
     # Test add_numbers
@@ -80,3 +114,24 @@ async def test_error_handling():
         json={"tool_name": "add_numbers", "arguments": {"a": "not_a_number", "b": 3}},
     )
     assert response.json()["status_code"] == 500
+
+
+def test_call_many():
+    response = client.post(
+        "/functions/call_many",
+        json={
+            "calls": [
+                {"tool_name": "add_numbers", "arguments": {"a": 1, "b": 2}},
+                {"tool_name": "non_existent", "arguments": {}},
+                {"tool_name": "concat_strings", "arguments": {"str1": "a", "str2": "b"}},
+                {"tool_name": "add_numbers", "arguments": {"a": "x"}},
+            ]
+        },
+    )
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert results[0] == {"result": 3}
+    assert results[1]["status_code"] == 404
+    assert results[2] == {"result": "ab"}
+    assert results[3]["status_code"] == 500
@@ -0,0 +1,67 @@
+import asyncio
+import inspect
+from collections import OrderedDict
+import pytest
+from volairframework.tools_server import function_client, transport
+from volairframework.tools_server.function_client import FunctionToolManager
+
+
+@pytest.fixture
+def in_process(monkeypatch):
+    monkeypatch.setattr(transport, "IN_PROCESS", True)
+    monkeypatch.setattr(FunctionToolManager, "_catalogs", OrderedDict())
+
+
+def test_in_process_tool_listing_and_calls(in_process):
+    client = FunctionToolManager()
+
+    tools = client.get_tools_by_name(["add_numbers", "concat_strings"])
+    assert [tool.__name__ for tool in tools] == ["add_numbers", "concat_strings"]
+    assert asyncio.run(tools[0](1, 2)) == {"result": 3}
+
+    assert client.call_tool("non_existent", {})["status_code"] == 404
+    assert client.call_many([
+        {"tool_name": "concat_strings", "arguments": {"str1": "a", "str2": "b"}},
+        {"tool_name": "add_numbers", "arguments": {"a": 2, "b": 2}},
+    ]) == [{"result": "ab"}, {"result": 4}]
+
+
+def test_in_process_transport_serves_http_endpoints(in_process):
+    with transport.http_client() as session:
+        response = session.post(f"{transport.TOOLS_SERVER_URL}/functions/tools", params={"fields": "names"})
+    assert response.status_code == 200
+    assert {"name": "add_numbers"} in response.json()["available_tools"]["tools"]
+
+
+def test_async_proxies(in_process):
+    from volairframework.server.level_utilized.utility import tool_wrapper
+
+    tool = tool_wrapper(FunctionToolManager().get_tools_by_name(["add_numbers"])[0])
+    assert inspect.iscoroutinefunction(tool)
+
+    async def run_agent_calls():
+        return await asyncio.gather(*[tool(number, 1) for number in range(5)])
+
+    assert asyncio.run(run_agent_calls()) == [{"result": number + 1} for number in range(5)]
+
+
+def test_empty_tool_selection_returns_no_tools(in_process):
+    assert FunctionToolManager().get_tools_by_name([]) == []
+    assert FunctionToolManager()._refresh_catalog([])["names"] == []
+
+    with transport.http_client() as session:
+        response = session.post(f"{transport.TOOLS_SERVER_URL}/functions/tools", params={"names": [""]})
+    assert response.json()["available_tools"]["tools"] == []
+    assert response.json()["total"] == 0
+
+
+def test_catalog_cache_keeps_the_recent_queries(in_process, monkeypatch):
+    monkeypatch.setattr(function_client, "MAX_CATALOGS", 2)
+    client = FunctionToolManager()
+
+    client.get_tools_by_name(["add_numbers"])
+    client.get_tools_by_name(["concat_strings"])
+    client.get_tools_by_name(["add_numbers"])
+    client.get_tools_by_name(["add_numbers", "concat_strings"])
+
+    assert list(FunctionToolManager._catalogs) == [("add_numbers",), ("add_numbers", "concat_strings")]
@@ -0,0 +1,106 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from volairframework.tools_server.server.web import WebFetcher, extract_page, read_pages, canonical_url, _extract_with_soup, _fit_to_budget
+
+
+PAGE = (
+    "<html><head><title> Example </title><meta name='description' content='An example page'>"
+    "<script>var x = 1;</script></head><body><p>Hello   world</p>"
+    + "".join(f"<a href='/page/{i}'>Page {i}</a>" for i in range(10))
+    + "</body></html>"
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        Handler.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/big":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            try:
+                for _ in range(200):
+                    self.wfile.write(b"<p>" + b"x" * 100_000 + b"</p>")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stops reading at its byte cap
+                pass
+            return
+
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_download_stops_at_byte_cap(base_url):
+    fetcher = WebFetcher(max_bytes=256 * 1024)
+    page = fetcher.fetch(f"{base_url}/big")
+    assert page.truncated
+    assert len(page.body) == 256 * 1024
+
+
+def test_conditional_get_reuses_cached_response(base_url):
+    fetcher = WebFetcher()
+    first = fetcher.fetch(f"{base_url}/page")
+    second = fetcher.fetch(f"{base_url}/page")
+    assert second is first
+    assert Handler.requests_seen[-1] == ("/page", '"v1"')
+
+
+@pytest.mark.parametrize("extract", [extract_page, _extract_with_soup])
+def test_extract_page(extract):
+    if extract is extract_page:
+        result = extract_page(PAGE, "http://example.com/", max_content_length=100, max_links=3)
+        meta, title, content, links = result["meta"], result["title"], result["content"], result["sub_links"]
+    else:
+        meta, title, content, links = extract(PAGE, "http://example.com/", 3)
+
+    assert meta == {"description": "An example page"}
+    assert title == "Example"
+    assert "Hello" in content and "var x" not in content
+    assert links == [{"title": f"Page {i}", "link": f"http://example.com/page/{i}"} for i in range(3)]
+
+
+def test_canonical_url():
+    assert canonical_url("HTTPS://www.Example.com/path/?utm_source=x&b=2&a=1#top") == "https://example.com/path?a=1&b=2"
+    assert canonical_url("http://example.com:8080/") == "http://example.com:8080"
+
+
+def test_fit_to_budget():
+    assert _fit_to_budget([100, 5000, 5000], 1100) == [100, 500, 500]
+    assert sum(_fit_to_budget([3000, 3000, 3000], 1000)) <= 1000
+
+
+def test_read_pages_deduplicates_and_fits_budget(base_url):
+    urls = [f"{base_url}/page", f"{base_url}/page/#section", f"{base_url}/missing-host".replace("127.0.0.1", "256.0.0.1")]
+    pages = read_pages(urls, max_total_characters=30, max_pages=2)
+
+    assert len(pages) == 2
+    assert pages[0]["title"] == "Example"
+    assert pages[0]["description"] == "An example page"
+    assert len(pages[0]["content"]) <= 33
+    assert "error" in pages[1]